@@ -0,0 +1,304 @@
+#!/usr/bin/env python3
+"""Offline backtest of trading on casts
+
+Runs the intent parser over historical casts and simulates the trades
+against local minute bars, for several reaction delays at once:
+
+- A trade enters at the open of the first bar starting at or after
+  `cast time + delay` and exits at the open of the first bar `hold`
+  seconds later. Each fill pays `slippage_bps` against the trade and
+  `fee_bps`.
+- Buys profit when the price rises. Sells profit when it falls: selling
+  avoided the loss.
+- Only casts the executor would trade without the agent become signals:
+  buys sized in USDC up to `trade_limit` (larger ones are rejected live),
+  and sells sized in the token, which are counted at `trade_limit` since
+  their live value depends on the wallet balance.
+
+Fills for every signal x delay are computed with NumPy array operations
+per token, so a year of minute bars and thousands of casts take seconds.
+
+Casts are JSONL (optionally .gz) of any of:
+- raw casts, e.g. from the farcaster_monitor fetchers
+- webhook events ({"type": "cast.created", "data": cast})
+- WebhookRecorder recordings
+
+Price files are CSV named after the token (WETH.csv, or ETH.csv for WETH)
+with a header and columns timestamp,open,high,low,close[,volume]. Prices
+are in USDC and timestamps are bar open times in epoch seconds or
+milliseconds.
+
+Usage:
+    python backtest.py --casts casts.jsonl --prices prices/ --delays 0 5 30 60 300 --hold 3600
+"""
+import os
+import sys
+import glob
+import json
+import argparse
+from typing import Any, Dict, Iterable, Iterator, List, NamedTuple, Optional, Sequence
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+sys.path.append(os.path.join(os.path.dirname(__file__), 'webhook-sdk'))
+from intent_parser import IntentParser, DEFAULT_ALIASES
+from event_priority import cast_time
+from trade_executor import TradeExecutor, TradeRejected, UnsupportedTrade
+from recorder import read_recording
+
+
+class Signal(NamedTuple):
+    """A trade intent extracted from a cast"""
+    time: float      # Epoch seconds the cast was posted
+    author: str
+    token: str
+    side: str
+    notional: float  # USDC traded
+    text: str
+
+
+class PriceSeries(NamedTuple):
+    """Minute bars of one token"""
+    times: Any  # Bar open times, epoch seconds, ascending
+    opens: Any
+
+
+def load_prices(path: str) -> PriceSeries:
+    """Read an OHLCV CSV file (header row, timestamp in the first column, open in the second)"""
+    data = np.loadtxt(path, delimiter=",", skiprows=1, usecols=(0, 1), ndmin=2)
+    times, opens = data[:, 0], data[:, 1]
+    if len(times) and times[0] > 1e11:
+        times = times / 1000.0  # Milliseconds
+    order = np.argsort(times, kind="stable")
+    return PriceSeries(times[order], opens[order])
+
+
+def load_price_dir(directory: str) -> Dict[str, PriceSeries]:
+    """Price series of every CSV file in a directory, keyed by symbol
+
+    A file named after an alias (ETH.csv) also serves the token it stands
+    for (WETH) unless that token has its own file.
+    """
+    prices = {}
+    for path in sorted(glob.glob(os.path.join(directory, "*.csv"))):
+        prices[os.path.splitext(os.path.basename(path))[0].upper()] = load_prices(path)
+    for alias, symbol in DEFAULT_ALIASES.items():
+        if alias in prices and symbol not in prices:
+            prices[symbol] = prices[alias]
+    return prices
+
+
+def read_casts(paths: Iterable[str]) -> Iterator[Dict[str, Any]]:
+    """Casts from JSONL files of casts, webhook events or webhook recordings"""
+    for path in paths:
+        for record in read_recording(path):
+            if "body" in record and "signature" in record:
+                try:
+                    record = json.loads(record["body"])
+                except ValueError:
+                    continue
+            cast = record.get("data") if isinstance(record.get("data"), dict) else record
+            if record.get("type", "cast.created") == "cast.created" and cast.get("text") is not None:
+                yield cast
+
+
+def extract_signals(casts: Iterable[Dict[str, Any]], parser: IntentParser, trade_limit: float = 1.0,
+                    min_confidence: float = 0.9) -> List[Signal]:
+    """Signals the live trader would have acted on without the agent
+
+    Intents the executor rejects or leaves to the agent (buys sized in the
+    token or over `trade_limit`, sells sized in USDC) are dropped.
+
+    Args:
+        casts: Cast objects
+        parser: Intent parser for the tokens with price data
+        trade_limit: Largest trade in USDC (also the size of sells)
+        min_confidence: Parser confidence needed to trade (FAST_PATH_MIN_CONFIDENCE)
+    """
+    # Only the rule checks are used, no tool is ever called
+    executor = TradeExecutor(None, dict.fromkeys(parser.symbols.values(), ''), trade_limit)
+    signals = []
+    for cast in casts:
+        intent = parser.parse(cast["text"])
+        if intent.side is None or intent.confidence < min_confidence:
+            continue
+        try:
+            executor.validate(intent)
+        except (TradeRejected, UnsupportedTrade):
+            continue
+        if intent.side == 'buy':
+            if intent.unit != executor.quote_token or intent.amount > trade_limit:
+                continue
+            notional = intent.amount
+        elif intent.unit == executor.quote_token:
+            continue  # Sells must be sized in the token
+        else:
+            notional = trade_limit
+        posted = cast_time({"data": cast})
+        if posted is None:
+            continue
+        author = (cast.get("author") or {}).get("username") or str((cast.get("author") or {}).get("fid"))
+        signals.append(Signal(posted, author, intent.token, intent.side, notional, cast["text"]))
+    return signals
+
+
+class BacktestResult:
+    """Returns and PnL of every signal at every delay
+
+    `returns` and `pnl` are (signals x delays) arrays; NaN where there was
+    no price data to fill or exit the trade.
+    """
+
+    def __init__(self, signals: List[Signal], delays: Any, returns: Any, pnl: Any):
+        self.signals = signals
+        self.delays = delays
+        self.returns = returns
+        self.pnl = pnl
+
+    def latency_curve(self, author: Optional[str] = None) -> List[Dict[str, float]]:
+        """Trades, hit rate, mean return and PnL per delay (for one author or all)"""
+        rows = self._rows(author)
+        curve = []
+        for j, delay in enumerate(self.delays):
+            returns = self.returns[rows, j]
+            filled = ~np.isnan(returns)
+            count = int(filled.sum())
+            curve.append({
+                "delay": float(delay),
+                "trades": count,
+                "hit_rate": float((returns[filled] > 0).mean()) if count else 0.0,
+                "mean_return_bps": float(returns[filled].mean() * 1e4) if count else 0.0,
+                "pnl": float(np.nansum(self.pnl[rows, j])),
+            })
+        return curve
+
+    def by_author(self, delay_index: int = 0) -> Dict[str, Dict[str, float]]:
+        """Hit rate, mean return and PnL per author at one delay"""
+        stats = {}
+        for author in sorted({signal.author for signal in self.signals}):
+            stats[author] = self.latency_curve(author)[delay_index]
+        return stats
+
+    def _rows(self, author: Optional[str]):
+        if author is None:
+            return np.arange(len(self.signals))
+        return np.array([i for i, signal in enumerate(self.signals) if signal.author == author], dtype=int)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "signals": len(self.signals),
+            "latency_curve": self.latency_curve(),
+            "by_author": self.by_author(),
+            "latency_curve_by_author": {author: self.latency_curve(author)
+                                        for author in sorted({signal.author for signal in self.signals})},
+        }
+
+
+def run_backtest(signals: List[Signal], prices: Dict[str, PriceSeries], delays: Sequence[float] = (0, 5, 30, 60, 300),
+                 hold: float = 3600.0, slippage_bps: float = 30.0, fee_bps: float = 5.0,
+                 max_gap: float = 300.0) -> BacktestResult:
+    """Simulate every signal at every delay
+
+    Args:
+        signals: Signals from extract_signals
+        prices: Price series per token symbol
+        delays: Reaction delays in seconds
+        hold: Seconds between entry and exit
+        slippage_bps: Price impact paid on each fill
+        fee_bps: Fee paid on each fill
+        max_gap: Fills more than this many seconds after the intended time (data gaps) don't count
+    """
+    if np is None:
+        raise RuntimeError("backtest requires numpy: pip install numpy")
+    delays = np.asarray(delays, dtype=float)
+    returns = np.full((len(signals), len(delays)), np.nan)
+    if not signals:
+        return BacktestResult(signals, delays, returns, returns.copy())
+
+    times = np.array([signal.time for signal in signals])
+    direction = np.array([1.0 if signal.side == 'buy' else -1.0 for signal in signals])
+    notional = np.array([signal.notional for signal in signals])
+    tokens = np.array([signal.token for signal in signals])
+    slippage = slippage_bps / 1e4
+    costs = 2 * fee_bps / 1e4
+
+    for token in np.unique(tokens):
+        series = prices.get(str(token))
+        if series is None or not len(series.times):
+            continue
+        rows = np.nonzero(tokens == token)[0]
+        bar_times, opens = series.times, series.opens
+        last = len(bar_times) - 1
+
+        # (signals x delays) bar indexes of the entry and exit fills
+        wanted_entry = times[rows, None] + delays[None, :]
+        entry = np.searchsorted(bar_times, wanted_entry, side="left")
+        entry_ok = entry <= last
+        entry = np.minimum(entry, last)
+        wanted_exit = bar_times[entry] + hold
+        exit_ = np.searchsorted(bar_times, wanted_exit, side="left")
+        exit_ok = exit_ <= last
+        exit_ = np.minimum(exit_, last)
+        valid = (entry_ok & exit_ok
+                 & (bar_times[entry] - wanted_entry <= max_gap)
+                 & (bar_times[exit_] - wanted_exit <= max_gap))
+
+        d = direction[rows, None]
+        entry_price = opens[entry] * (1 + d * slippage)
+        exit_price = opens[exit_] * (1 - d * slippage)
+        token_returns = d * (exit_price / entry_price - 1) - costs
+        returns[rows] = np.where(valid, token_returns, np.nan)
+
+    return BacktestResult(signals, delays, returns, returns * notional[:, None])
+
+
+def print_report(result: BacktestResult):
+    print(f"{len(result.signals)} signals\n")
+    print("Latency sensitivity (all authors)")
+    print(f"{'delay_s':>8} {'trades':>7} {'hit_rate':>8} {'mean_bps':>9} {'pnl_usdc':>10}")
+    for row in result.latency_curve():
+        print(f"{row['delay']:>8.0f} {row['trades']:>7} {row['hit_rate']:>8.1%} "
+              f"{row['mean_return_bps']:>9.1f} {row['pnl']:>10.4f}")
+
+    print(f"\nPer author (delay {result.delays[0]:.0f}s)")
+    print(f"{'author':>20} {'trades':>7} {'hit_rate':>8} {'mean_bps':>9} {'pnl_usdc':>10}")
+    for author, row in sorted(result.by_author().items(), key=lambda item: -item[1]["pnl"]):
+        print(f"{author[:20]:>20} {row['trades']:>7} {row['hit_rate']:>8.1%} "
+              f"{row['mean_return_bps']:>9.1f} {row['pnl']:>10.4f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Backtest trading on Farcaster casts")
+    parser.add_argument("--casts", nargs="+", required=True, help="JSONL(.gz) files of casts, events or recordings")
+    parser.add_argument("--prices", required=True, help="Directory of <SYMBOL>.csv minute bars")
+    parser.add_argument("--delays", type=float, nargs="+", default=[0, 5, 30, 60, 300], help="Reaction delays (s)")
+    parser.add_argument("--hold", type=float, default=3600, help="Seconds a position is held")
+    parser.add_argument("--slippage-bps", type=float, default=30)
+    parser.add_argument("--fee-bps", type=float, default=5)
+    parser.add_argument("--trade-limit", type=float, default=1.0, help="Largest trade in USDC")
+    parser.add_argument("--min-confidence", type=float, default=0.9, help="Parser confidence needed to trade")
+    parser.add_argument("--authors", nargs="*", help="Only casts from these usernames")
+    parser.add_argument("--json", help="Also write the results to this file")
+    args = parser.parse_args()
+
+    if np is None:
+        parser.error("backtest requires numpy: pip install numpy")
+    prices = load_price_dir(args.prices)
+    casts = read_casts(args.casts)
+    if args.authors:
+        authors = {name.lower() for name in args.authors}
+        casts = (cast for cast in casts if str((cast.get("author") or {}).get("username", "")).lower() in authors)
+    signals = extract_signals(casts, IntentParser({symbol: '' for symbol in [*prices, 'USDC']}),
+                              args.trade_limit, args.min_confidence)
+    result = run_backtest(signals, prices, args.delays, args.hold, args.slippage_bps, args.fee_bps)
+    print_report(result)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(result.to_dict(), f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""Time the backtest on a year of synthetic minute bars
+
+Writes random-walk minute bars for a few tokens and casts from many
+authors: "skilled" authors cast right before a move in their direction,
+the rest cast at random. Checks that the backtest tells them apart and
+that the edge decays with the reaction delay, and reports how long
+loading and simulating take.
+
+Usage:
+    python benchmarks/bench_backtest.py --days 365 --casts 20000 --authors 50
+"""
+import os
+import sys
+import time
+import random
+import argparse
+import tempfile
+
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+from backtest import load_price_dir, extract_signals, run_backtest, print_report
+from intent_parser import IntentParser
+
+TOKENS = {'WETH': 3000.0, 'WBTC': 60000.0, 'WMATIC': 0.7}
+START = 1704067200  # 2024-01-01
+
+
+def write_bars(directory, days, seed):
+    rng = np.random.default_rng(seed)
+    minutes = days * 24 * 60
+    times = START + 60 * np.arange(minutes)
+    series = {}
+    for symbol, price in TOKENS.items():
+        opens = price * np.exp(np.cumsum(rng.normal(0, 0.0008, minutes)))
+        series[symbol] = opens
+        closes = np.roll(opens, -1)
+        data = np.column_stack([times, opens, np.maximum(opens, closes), np.minimum(opens, closes), closes,
+                                rng.uniform(1, 100, minutes)])
+        np.savetxt(os.path.join(directory, f"{symbol}.csv"), data, delimiter=",", fmt="%.8g",
+                   header="timestamp,open,high,low,close,volume", comments="")
+    return times, series
+
+
+def make_casts(count, authors, skilled, times, series, hold):
+    casts = []
+    symbols = list(TOKENS)
+    names = {'WETH': 'eth', 'WBTC': 'wbtc', 'WMATIC': 'matic'}
+    for _ in range(count):
+        author = random.randrange(authors)
+        symbol = random.choice(symbols)
+        i = random.randrange(len(times) - hold // 60 - 10)
+        if author < skilled:
+            # Knows where the price goes over the next hour
+            side = "buy" if series[symbol][i + hold // 60] > series[symbol][i] else "sell"
+        else:
+            side = random.choice(("buy", "sell"))
+        posted = times[i] - random.uniform(0, 59)
+        casts.append({
+            "text": f"buy $1 of {names[symbol]}" if side == "buy" else f"sell all my {names[symbol]}",
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime(posted)) + ".000Z",
+            "author": {"username": f"{'skilled' if author < skilled else 'author'}{author}", "fid": author},
+        })
+    return casts
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Backtest speed on synthetic data")
+    parser.add_argument("--days", type=int, default=365)
+    parser.add_argument("--casts", type=int, default=20000)
+    parser.add_argument("--authors", type=int, default=50)
+    parser.add_argument("--skilled", type=int, default=5, help="Authors who cast ahead of real moves")
+    parser.add_argument("--hold", type=int, default=3600)
+    parser.add_argument("--slippage-bps", type=float, default=10)
+    parser.add_argument("--fee-bps", type=float, default=5)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+    random.seed(args.seed)
+
+    directory = tempfile.mkdtemp()
+    start = time.perf_counter()
+    times, series = write_bars(directory, args.days, args.seed)
+    casts = make_casts(args.casts, args.authors, args.skilled, times, series, args.hold)
+    print(f"generated {len(times)} bars x {len(TOKENS)} tokens, {len(casts)} casts "
+          f"in {time.perf_counter() - start:.1f}s\n")
+
+    start = time.perf_counter()
+    prices = load_price_dir(directory)
+    load = time.perf_counter() - start
+
+    start = time.perf_counter()
+    signals = extract_signals(casts, IntentParser({**{symbol: '' for symbol in prices}, 'USDC': ''}))
+    extract = time.perf_counter() - start
+
+    start = time.perf_counter()
+    result = run_backtest(signals, prices, delays=(0, 60, 300, 900, 1800, 3600), hold=args.hold,
+                          slippage_bps=args.slippage_bps, fee_bps=args.fee_bps)
+    simulate = time.perf_counter() - start
+
+    print_report(result)
+    print(f"\nload prices {load:.2f}s, extract signals {extract:.2f}s, "
+          f"simulate {len(signals)} signals x {len(result.delays)} delays {simulate * 1000:.0f} ms")
+
+
+if __name__ == "__main__":
+    main()
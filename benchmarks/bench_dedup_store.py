@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+"""Throughput of the webhook dedup stores
+
+Usage:
+    python benchmarks/bench_dedup_store.py [--ids 1000000] [--sqlite-ids 200000]
+
+Inserts unique cast ids, then replays them (every lookup is a duplicate),
+and reports operations per second and the resident size of the memory store.
+"""
+import os
+import sys
+import time
+import tempfile
+import argparse
+import tracemalloc
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'webhook-sdk'))
+from dedup_store import MemoryDedupStore, SQLiteDedupStore
+
+
+def cast_ids(n):
+    return [f"cast.created:0x{i:040x}" for i in range(n)]
+
+
+def run(store, ids):
+    start = time.perf_counter()
+    for key in ids:
+        store.add(key)
+    inserted = time.perf_counter() - start
+
+    start = time.perf_counter()
+    duplicates = sum(1 for key in ids if not store.add(key))
+    replayed = time.perf_counter() - start
+
+    assert duplicates == len(ids), "every replayed id must be reported as a duplicate"
+    return len(ids) / inserted, len(ids) / replayed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark webhook dedup stores")
+    parser.add_argument("--ids", type=int, default=1_000_000, help="Ids for the memory store")
+    parser.add_argument("--sqlite-ids", type=int, default=200_000, help="Ids for the SQLite store")
+    args = parser.parse_args()
+
+    ids = cast_ids(args.ids)
+    tracemalloc.start()
+    store = MemoryDedupStore(max_items=args.ids)
+    insert_rate, lookup_rate = run(store, ids)
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"Memory  ({args.ids:,} ids): {insert_rate:,.0f} inserts/s, {lookup_rate:,.0f} duplicate checks/s, "
+          f"{size / len(ids):.0f} bytes/id")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        store = SQLiteDedupStore(os.path.join(tmp, "dedup.db"))
+        insert_rate, lookup_rate = run(store, cast_ids(args.sqlite_ids))
+        store.close()
+    print(f"SQLite  ({args.sqlite_ids:,} ids): {insert_rate:,.0f} inserts/s, {lookup_rate:,.0f} duplicate checks/s")
+
+
+if __name__ == "__main__":
+    main()
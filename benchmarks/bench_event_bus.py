@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+"""Fan-in throughput and cross-source dedup of the event bus
+
+Several sources publish casts concurrently (the same cast reaches the bus
+from more than one source, like a webhook delivery and a poll), plus news
+items where the same story appears in several feeds under different ids.
+The bus hands new signals to a KeyedScheduler over a no-op handler, as in
+quantar.py. Reports published and handled events per second, duplicates
+dropped, and lag from publication to the consumer per source.
+
+Usage:
+    python benchmarks/bench_event_bus.py --events 50000 --sources 4 --overlap 0.3
+    # Steady 5000 events/s instead of saturating the bus
+    python benchmarks/bench_event_bus.py --rate 5000
+"""
+import os
+import sys
+import time
+import random
+import asyncio
+import logging
+import argparse
+from datetime import datetime, timezone
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'webhook-sdk'))
+from event_bus import EventBus, SignalEvent, NEWS
+from keyed_scheduler import KeyedScheduler
+from metrics import Metrics
+
+HEADLINES = ["SEC approves spot ether ETFs", "Bitcoin tops all time high as ETF inflows surge",
+             "Polygon announces POL migration date", "Major exchange halts withdrawals after hack"]
+
+
+def cast_event(i, fid):
+    return {"type": "cast.created", "data": {
+        "hash": f"0x{i:040x}", "text": f"buy {random.randint(1, 9) / 10} usdc of eth",
+        "author": {"fid": fid, "username": f"user{fid}"}}}
+
+
+async def run(args):
+    metrics = Metrics()
+    handled = 0
+
+    async def handle(event_data):
+        nonlocal handled
+        handled += 1
+
+    bus = EventBus(KeyedScheduler(handle, max_concurrency=args.in_flight, metrics=metrics),
+                   max_queue=args.queue, max_in_flight=args.in_flight, metrics=metrics)
+    await bus.start()
+
+    # Casts are split across sources; `overlap` of them also arrive from a second source
+    casts = [[] for _ in range(args.sources)]
+    for i in range(args.events):
+        owner = i % args.sources
+        event = cast_event(i, random.randrange(args.authors))
+        casts[owner].append(event)
+        if args.sources > 1 and random.random() < args.overlap:
+            casts[(owner + 1) % args.sources].append(event)
+    stories = args.events // 10
+    # Seconds between events of one source (0: as fast as the bus takes them)
+    interval = (args.sources + 2) / args.rate if args.rate else 0.0
+
+    async def pace(n, started):
+        """Sources wait on I/O between events; with --rate, also keep to their share of it"""
+        if n % 10 == 0:
+            await asyncio.sleep(max(0.0, started + n * interval - time.perf_counter()))
+
+    async def cast_source(index):
+        name = "webhook" if index == 0 else f"poll{index}"
+        started = time.perf_counter()
+        for n, event in enumerate(casts[index]):
+            # Posted when the first source sees it
+            event["data"].setdefault("timestamp", datetime.now(timezone.utc).isoformat().replace('+00:00', 'Z'))
+            signal = SignalEvent.from_cast_event(event, name)
+            if index == 0:
+                bus.offer(signal)  # Webhooks don't wait for the bus
+            else:
+                await bus.publish(signal)
+            await pace(n, started)
+
+    async def news_source(feed):
+        started = time.perf_counter()
+        for i in range(stories):
+            title = f"{random.choice(HEADLINES)} ({i})"
+            await bus.publish(SignalEvent(f"news:{feed}", NEWS, f"{feed}-{i}", title, {"source": feed},
+                                          time.time(), time.time(), url=f"https://example.com/{i}?ref={feed}"))
+            await pace(i, started)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(cast_source(i) for i in range(args.sources)), news_source("a"), news_source("b"))
+    published = time.perf_counter() - start
+    await bus.stop(drain=True)
+    elapsed = time.perf_counter() - start
+
+    stats = bus.get_stats()
+    total = sum(source["published"] for source in stats["sources"].values())
+    duplicates = sum(source["duplicates"] for source in stats["sources"].values())
+    dropped = sum(source["dropped"] for source in stats["sources"].values())
+    print(f"{total} signals from {len(stats['sources'])} sources in {elapsed:.2f}s: "
+          f"{total / published:,.0f} published/s, {handled / elapsed:,.0f} handled/s")
+    print(f"{handled} handled, {duplicates} duplicates dropped, {dropped} dropped (queue full)")
+    expected = args.events + stories
+    print(f"unique signals: {expected}, handled {handled} ({'ok' if handled + dropped >= expected >= handled else 'MISMATCH'})\n")
+    print(f"{'source':>10} {'published':>10} {'duplicates':>11} {'avg_lag_ms':>11} {'max_lag_ms':>11}")
+    for name, source in sorted(stats["sources"].items()):
+        print(f"{name:>10} {source['published']:>10} {source['duplicates']:>11} "
+              f"{source['avg_lag_ms']:>11.1f} {source['max_lag_ms']:>11.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Event bus fan-in throughput and dedup")
+    parser.add_argument("--events", type=int, default=50000, help="Unique casts")
+    parser.add_argument("--sources", type=int, default=4, help="Cast sources (the first one offers like a webhook)")
+    parser.add_argument("--overlap", type=float, default=0.3, help="Share of casts also published by a second source")
+    parser.add_argument("--rate", type=float, default=0, help="Events per second over all sources (0: saturate)")
+    parser.add_argument("--authors", type=int, default=500)
+    parser.add_argument("--queue", type=int, default=10000)
+    parser.add_argument("--in-flight", type=int, default=32)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+    random.seed(args.seed)
+    logging.getLogger("event-bus").setLevel(logging.ERROR)  # One warning per dropped signal
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+"""Compare per-cast and micro-batched LLM classification under bursts
+
+Casts from the intent corpus arrive in bursts; the ones the fast-path
+parser can't read are classified by a stub model, either one call per cast
+or through IntentBatcher. The stub model answers the batch prompt with
+JSON (using the parser as its "judgement") after a log-normal delay plus a
+cost per prompt kilobyte, and calls are limited to the agent pool size.
+
+Usage:
+    python benchmarks/bench_intent_batcher.py --bursts 20 --burst-size 30 --window 0.25
+"""
+import os
+import re
+import sys
+import json
+import time
+import random
+import asyncio
+import argparse
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+from intent_parser import IntentParser
+from intent_batcher import IntentBatcher, llm_classifier
+from token_registry import TokenRegistry
+from stubs import TOKEN_ADDRESSES, LatencyModel
+
+DECIMALS = {'USDC': 6, 'WETH': 18, 'WBTC': 8, 'MATIC': 18, 'WMATIC': 18}
+
+
+class StubClassifierModel:
+    """Answers batch classification prompts like a model would, with latency"""
+
+    def __init__(self, latency: LatencyModel, ms_per_kb: float, slots: int):
+        self.latency = latency
+        self.ms_per_kb = ms_per_kb
+        self.slots = asyncio.Semaphore(slots)
+        self.parser = IntentParser(TOKEN_ADDRESSES)
+        self.calls = 0
+        self.prompt_bytes = 0
+        self.reply_bytes = 0
+
+    async def send(self, prompt: str) -> str:
+        async with self.slots:
+            self.calls += 1
+            size = len(prompt.encode("utf-8"))
+            self.prompt_bytes += size
+            await asyncio.sleep(self.latency.sample() + size / 1024 * self.ms_per_kb / 1000)
+            messages = prompt.split("Messages:\n", 1)[1].split("\n\nAnswer", 1)[0]
+            answer = []
+            for line in messages.splitlines():
+                match = re.match(r"(\d+)\. (.*)", line)
+                if not match:
+                    continue
+                intent = self.parser.parse(json.loads(match.group(2)))
+                answer.append({"i": int(match.group(1)), "side": intent.side, "token": intent.token,
+                               "amount": intent.amount, "unit": intent.unit})
+            reply = json.dumps(answer)
+            self.reply_bytes += len(reply)
+            return reply
+
+
+async def run_mode(texts, args, window, max_batch):
+    model = StubClassifierModel(LatencyModel(args.llm_ms), args.ms_per_kb, args.agents)
+    registry = TokenRegistry.build(TOKEN_ADDRESSES, DECIMALS)
+    batcher = IntentBatcher(llm_classifier(model.send, registry), window=window, max_batch=max_batch)
+    parser = IntentParser(TOKEN_ADDRESSES)
+    latencies = []
+
+    async def handle(text):
+        start = time.perf_counter()
+        if parser.parse(text).confidence < args.threshold:
+            await batcher.classify(text)
+            latencies.append(time.perf_counter() - start)
+
+    tasks = []
+    for _ in range(args.bursts):
+        for _ in range(args.burst_size):
+            tasks.append(asyncio.create_task(handle(random.choice(texts))))
+            await asyncio.sleep(random.expovariate(args.burst_size / args.burst_spread))
+        await asyncio.sleep(args.gap)
+    await asyncio.gather(*tasks)
+
+    latencies.sort()
+    return {
+        "classified": len(latencies),
+        "llm_calls": model.calls,
+        "prompt_kb": model.prompt_bytes / 1024,
+        "reply_kb": model.reply_bytes / 1024,
+        "p50_ms": latencies[len(latencies) // 2] * 1000 if latencies else 0.0,
+        "p95_ms": latencies[int(len(latencies) * 0.95)] * 1000 if latencies else 0.0,
+        "mean_batch": batcher.get_stats()["mean_batch_size"],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Per-cast vs micro-batched LLM classification")
+    parser.add_argument("--bursts", type=int, default=10)
+    parser.add_argument("--burst-size", type=int, default=30, help="Casts per burst")
+    parser.add_argument("--burst-spread", type=float, default=1.0, help="Seconds a burst is spread over")
+    parser.add_argument("--gap", type=float, default=2.0, help="Seconds between bursts")
+    parser.add_argument("--window", type=float, default=0.25, help="Batching window in seconds")
+    parser.add_argument("--max-batch", type=int, default=16)
+    parser.add_argument("--agents", type=int, default=2, help="Concurrent model calls (agent pool size)")
+    parser.add_argument("--llm-ms", type=float, default=1500, help="Median model latency")
+    parser.add_argument("--ms-per-kb", type=float, default=50, help="Extra model latency per prompt kilobyte")
+    parser.add_argument("--threshold", type=float, default=0.9, help="Fast-path confidence threshold")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    corpus_path = os.path.join(os.path.dirname(__file__), "intent_corpus.jsonl")
+    with open(corpus_path) as f:
+        texts = [json.loads(line)["text"] for line in f if line.strip()]
+
+    print(f"{args.bursts} bursts of {args.burst_size} casts over {args.burst_spread}s, "
+          f"{args.agents} model slots, model median {args.llm_ms}ms\n")
+    print(f"{'mode':>12} {'classified':>10} {'llm_calls':>9} {'prompt_kb':>9} {'reply_kb':>8} "
+          f"{'p50_ms':>8} {'p95_ms':>8} {'batch':>6}")
+    for name, window, max_batch in (("per-cast", 0, 1), ("batched", args.window, args.max_batch)):
+        random.seed(args.seed)
+        r = asyncio.run(run_mode(texts, args, window, max_batch))
+        print(f"{name:>12} {r['classified']:>10} {r['llm_calls']:>9} {r['prompt_kb']:>9.1f} {r['reply_kb']:>8.1f} "
+              f"{r['p50_ms']:>8.0f} {r['p95_ms']:>8.0f} {r['mean_batch']:>6.1f}")
+
+
+if __name__ == "__main__":
+    main()
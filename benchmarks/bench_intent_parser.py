@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""Accuracy and throughput benchmark for the fast-path intent parser
+
+Usage:
+    python benchmarks/bench_intent_parser.py [--corpus FILE] [--threshold 0.9] [--iterations 2000]
+
+Each corpus line is {"text": ..., "intent": [side, token, amount, unit]} for
+casts the fast path should handle, or {"text": ..., "intent": "agent"} for
+casts that must fall back to the agent.
+"""
+import os
+import sys
+import json
+import time
+import argparse
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+from intent_parser import IntentParser
+
+# Same symbols as quantar.TOKEN_ADDRESSES (importing quantar would start Fast-Agent)
+TOKENS = ['USDC', 'USDC.e', 'WETH', 'WBTC', 'MATIC', 'WMATIC']
+
+
+def load_corpus(path):
+    with open(path) as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def evaluate(parser, corpus, threshold):
+    fast = correct = unsafe = 0
+    errors = []
+    for row in corpus:
+        intent = parser.parse(row['text'])
+        confident = intent.confidence >= threshold
+        expected = row['intent']
+
+        if expected == 'agent':
+            if confident:
+                unsafe += 1
+                errors.append((row['text'], 'agent', intent))
+            continue
+
+        if confident:
+            fast += 1
+            got = [intent.side, intent.token, intent.amount, intent.unit]
+            if got == expected:
+                correct += 1
+            else:
+                errors.append((row['text'], expected, intent))
+        else:
+            errors.append((row['text'], expected, intent))
+
+    labeled = sum(1 for row in corpus if row['intent'] != 'agent')
+    return {
+        'casts': len(corpus),
+        'fast_path_coverage': fast / labeled if labeled else 0.0,
+        'fast_path_precision': correct / fast if fast else 0.0,
+        'unsafe_fast_path': unsafe,
+        'errors': errors,
+    }
+
+
+def throughput(parser, corpus, iterations):
+    texts = [row['text'] for row in corpus]
+    start = time.perf_counter()
+    for _ in range(iterations):
+        for text in texts:
+            parser.parse(text)
+    elapsed = time.perf_counter() - start
+    return len(texts) * iterations / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the fast-path intent parser")
+    parser.add_argument("--corpus", default=os.path.join(os.path.dirname(__file__), "intent_corpus.jsonl"))
+    parser.add_argument("--threshold", type=float, default=0.9, help="Minimum confidence for the fast path")
+    parser.add_argument("--iterations", type=int, default=2000, help="Passes over the corpus for throughput")
+    args = parser.parse_args()
+
+    corpus = load_corpus(args.corpus)
+    intent_parser = IntentParser(dict.fromkeys(TOKENS))
+
+    result = evaluate(intent_parser, corpus, args.threshold)
+    for text, expected, intent in result['errors']:
+        print(f"MISS {text!r}: expected {expected}, got {tuple(intent)}")
+
+    print(f"\nCasts: {result['casts']}")
+    print(f"Fast-path coverage: {result['fast_path_coverage']:.1%}")
+    print(f"Fast-path precision: {result['fast_path_precision']:.1%}")
+    print(f"Unsafe fast-path decisions: {result['unsafe_fast_path']}")
+    print(f"Throughput: {throughput(intent_parser, corpus, args.iterations):,.0f} casts/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""Tail latency of model calls with and without hedging, and breaker behavior in an outage
+
+Stub models with log-normal latency: a primary with a long tail and a
+faster hedge model. Phase 1 compares classification latency (p50/p95/p99)
+of plain calls and of LatencyGuard calls hedged after the primary's p95.
+Phase 2 makes the primary hang for a while: calls time out at their
+deadline until the breaker opens, then fail fast (the caller degrades)
+until a probe finds the primary healthy again.
+
+Usage:
+    python benchmarks/bench_llm_guard.py --calls 300 --llm-ms 1500 --llm-p95-ms 6000 --hedge-ms 600
+"""
+import os
+import sys
+import time
+import random
+import asyncio
+import argparse
+import statistics
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+from llm_guard import LatencyGuard, CircuitBreaker, CircuitOpen, DeadlineExceeded
+from stubs import LatencyModel
+
+
+def percentile(values, q):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))] if ordered else 0.0
+
+
+def model(latency, name):
+    async def call():
+        await latency.sleep()
+        return name
+    return call
+
+
+async def timed(calls, concurrency, call):
+    latencies = []
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one():
+        async with semaphore:
+            start = time.perf_counter()
+            await call()
+            latencies.append(time.perf_counter() - start)
+
+    await asyncio.gather(*(one() for _ in range(calls)))
+    return latencies
+
+
+async def run(args):
+    primary = model(LatencyModel(args.llm_ms, args.llm_p95_ms), "primary")
+    hedge = model(LatencyModel(args.hedge_ms, args.hedge_ms * 2), "hedge")
+
+    print(f"{'':>8} {'p50_s':>7} {'p95_s':>7} {'p99_s':>7} {'hedged':>7} {'hedge_won':>9}")
+    plain = await timed(args.calls, args.concurrency, primary)
+    print(f"{'plain':>8} {statistics.median(plain):>7.2f} {percentile(plain, 0.95):>7.2f} "
+          f"{percentile(plain, 0.99):>7.2f} {'-':>7} {'-':>9}")
+
+    guard = LatencyGuard(slow_after=60.0)
+    await timed(50, args.concurrency, lambda: guard.call(primary))  # Learn the primary's p95
+    hedged = await timed(args.calls, args.concurrency, lambda: guard.call(primary, hedge))
+    stats = guard.get_stats()
+    print(f"{'hedged':>8} {statistics.median(hedged):>7.2f} {percentile(hedged, 0.95):>7.2f} "
+          f"{percentile(hedged, 0.99):>7.2f} {stats['hedges'] / args.calls:>7.1%} {stats['hedge_win_rate']:>9.1%}")
+    print(f"hedge delay (primary p95): {guard.hedge_delay('llm'):.2f}s")
+
+    # Outage: the primary hangs for `outage` seconds
+    outage_until = time.monotonic() + args.outage
+    healthy = LatencyModel(args.llm_ms / 10)
+
+    async def flaky():
+        if time.monotonic() < outage_until:
+            await asyncio.sleep(3600)
+        await healthy.sleep()
+        return "primary"
+
+    # A timeout counts against the model once the call ran longer than slow_after
+    guard = LatencyGuard(CircuitBreaker(failures=3, reset_after=1.0), slow_after=args.deadline / 2)
+    outcomes = {"ok": 0, "timeout": 0, "breaker_open": 0}
+    waited = {"timeout": 0.0, "breaker_open": 0.0}
+    start = time.monotonic()
+    while time.monotonic() - start < args.outage + 3:
+        began = time.monotonic()
+        try:
+            await guard.call(flaky, deadline=time.time() + args.deadline)
+            outcomes["ok"] += 1
+        except DeadlineExceeded:
+            outcomes["timeout"] += 1
+            waited["timeout"] += time.monotonic() - began
+        except CircuitOpen:
+            outcomes["breaker_open"] += 1
+            waited["breaker_open"] += time.monotonic() - began
+        await asyncio.sleep(0.05)
+    print(f"\n{args.outage:.0f}s outage, deadline {args.deadline:.1f}s: {outcomes['timeout']} calls timed out "
+          f"({waited['timeout']:.1f}s spent waiting), {outcomes['breaker_open']} failed fast while the breaker was open "
+          f"({waited['breaker_open'] * 1000:.1f} ms), {outcomes['ok']} answered; breaker {guard.breaker.state}, "
+          f"{guard.breaker.trips} trip(s)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Hedging and circuit breaker around model calls")
+    parser.add_argument("--calls", type=int, default=300)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--llm-ms", type=float, default=1500, help="Primary model median latency")
+    parser.add_argument("--llm-p95-ms", type=float, default=6000, help="Primary model p95 latency")
+    parser.add_argument("--hedge-ms", type=float, default=600, help="Hedge model median latency")
+    parser.add_argument("--deadline", type=float, default=1.0, help="Per-call deadline in the outage phase (s)")
+    parser.add_argument("--outage", type=float, default=5.0, help="Seconds the primary hangs in the outage phase")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+    random.seed(args.seed)
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""Throughput and latency of NeynarClient / AsyncNeynarClient against a local stub API
+
+Runs stub_neynar_api.py in its own process, answering user lookups after a
+fixed delay and, for a share of requests, with 429 + Retry-After or 503.
+Compares bare `requests.get` per call (a new connection each time) with the
+pooled clients: lookups per second, per-lookup p50/p95 latency (including
+retries), retries and connections opened. Correctness of retries and
+timeouts is covered by tests/test_neynar_client.py.
+
+Usage:
+    python benchmarks/bench_neynar_client.py --requests 300 --delay-ms 5 --fail-every 7
+"""
+import os
+import sys
+import json
+import time
+import asyncio
+import logging
+import argparse
+import subprocess
+import statistics
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'webhook-sdk'))
+import requests
+from neynar_client import NeynarClient, AsyncNeynarClient
+
+
+def start_stub(delay_ms, fail_every):
+    """Run stub_neynar_api.py in its own process, so serving doesn't compete with the clients for the GIL"""
+    process = subprocess.Popen(
+        [sys.executable, os.path.join(os.path.dirname(__file__), "stub_neynar_api.py"),
+         "--delay-ms", str(delay_ms), "--fail-every", str(fail_every)], stdout=subprocess.PIPE, text=True)
+    return process, f"http://127.0.0.1:{int(process.stdout.readline())}"
+
+
+def stub_call(base_url, path):
+    return json.loads(requests.post(f"{base_url}{path}").text if path == "/_reset"
+                      else requests.get(f"{base_url}{path}").text)
+
+
+def bench_bare(base_url, n):
+    headers = {"accept": "application/json", "api_key": "stub"}
+    latencies = []
+    for i in range(n):
+        started = time.perf_counter()
+        while True:
+            response = requests.get(f"{base_url}/user/by_username", params={"username": f"user{i}"}, headers=headers)
+            if response.status_code == 200:
+                break
+        latencies.append(time.perf_counter() - started)
+    return latencies
+
+
+def bench_pooled(base_url, n):
+    latencies = []
+    with NeynarClient(api_key="stub", backoff=0.01) as client:
+        client.BASE_URL = base_url
+        for i in range(n):
+            started = time.perf_counter()
+            result = client.lookup_user_by_username(f"user{i}")
+            latencies.append(time.perf_counter() - started)
+            assert result["user"]["username"] == f"user{i}"
+    return latencies
+
+
+async def bench_async(base_url, n, concurrency):
+    latencies = []
+    async with AsyncNeynarClient(api_key="stub", backoff=0.01, pool_size=concurrency) as client:
+        client.BASE_URL = base_url
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def lookup(i):
+            async with semaphore:
+                started = time.perf_counter()
+                result = await client.lookup_user_by_username(f"user{i}")
+                latencies.append(time.perf_counter() - started)
+                return result
+
+        results = await asyncio.gather(*(lookup(i) for i in range(n)))
+    assert all(result["user"]["username"] == f"user{i}" for i, result in enumerate(results))
+    return latencies
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the Neynar clients against a local stub API")
+    parser.add_argument("--requests", type=int, default=300)
+    parser.add_argument("--delay-ms", type=float, default=5, help="Server time per request")
+    parser.add_argument("--fail-every", type=int, default=7, help="Every Nth request gets 429 or 503 (0 = never)")
+    parser.add_argument("--concurrency", type=int, default=20, help="Concurrent requests for the async client")
+    args = parser.parse_args()
+    logging.getLogger("neynar-client").setLevel(logging.ERROR)
+
+    process, base_url = start_stub(args.delay_ms, args.fail_every)
+    n = args.requests
+    print(f"{n} lookups, {args.delay_ms}ms server time, every {args.fail_every}th request fails\n")
+    print(f"{'':>24}  {'lookups/s':>9}  {'p50_ms':>7}  {'p95_ms':>7}  {'retries':>7}  {'connections':>11}")
+    try:
+        for name, run in (
+            ("bare requests.get", lambda: bench_bare(base_url, n)),
+            ("NeynarClient", lambda: bench_pooled(base_url, n)),
+            (f"AsyncNeynarClient x{args.concurrency}", lambda: asyncio.run(bench_async(base_url, n, args.concurrency))),
+        ):
+            stub_call(base_url, "/_reset")
+            start = time.perf_counter()
+            latencies = run()
+            elapsed = time.perf_counter() - start
+            stats = stub_call(base_url, "/_stats")
+            cuts = statistics.quantiles(latencies, n=20)
+            print(f"{name:>24}  {n / elapsed:>9.0f}  {cuts[9] * 1000:>7.2f}  {cuts[18] * 1000:>7.2f}  "
+                  f"{stats['served'] - n:>7d}  {stats['connections'] - 1:>11d}")
+    finally:
+        process.terminate()
+        process.wait()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""Benchmark CastPoller following many fids against a simulated feed API
+
+Each simulated author posts as a Poisson process (a few very active
+accounts, most quiet). The fake client answers `fetch_user_casts` after a
+log-normal delay with the casts posted so far. Reports requests/s against
+the budget, CPU time per request, detection lag of new casts, and checks
+that no cast is emitted twice. Casts found on a fid's first poll only set
+its starting point, so use a duration of a few polling rounds.
+
+Usage:
+    python benchmarks/bench_poller.py --fids 1000 --duration 60 --rate 50
+"""
+import os
+import sys
+import time
+import random
+import asyncio
+import argparse
+from collections import Counter
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'farcaster_monitor'))
+from poller import CastPoller
+from stubs import LatencyModel
+
+
+class SimulatedFeed:
+    """fetch_user_casts over authors posting at random"""
+
+    def __init__(self, fids, posts_per_minute, latency: LatencyModel):
+        self.latency = latency
+        self.rates = {}
+        self.casts = {fid: [] for fid in fids}
+        self.next_post = {}
+        self.posted_at = {}
+        now = time.time()
+        for fid in fids:
+            # 5% of authors are very active, the rest rarely post
+            rate = posts_per_minute * (10 if random.random() < 0.05 else 0.2) / 60
+            self.rates[fid] = rate
+            self.next_post[fid] = now + random.expovariate(rate)
+
+    def _advance(self, fid):
+        now = time.time()
+        while self.next_post[fid] <= now:
+            posted = self.next_post[fid]
+            cast_hash = f"0x{random.getrandbits(160):040x}"
+            timestamp = time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime(posted)) + f".{int(posted % 1 * 1000):03d}Z"
+            self.casts[fid].insert(0, {"hash": cast_hash, "timestamp": timestamp, "text": "gm",
+                                       "author": {"fid": fid, "username": f"user{fid}"}})
+            self.posted_at[cast_hash] = posted
+            self.next_post[fid] = posted + random.expovariate(self.rates[fid])
+
+    async def fetch_user_casts(self, fid, limit=25, cursor=None):
+        await self.latency.sleep()
+        self._advance(fid)
+        start = int(cursor or 0)
+        page = self.casts[fid][start:start + limit]
+        has_more = start + limit < len(self.casts[fid])
+        return {"casts": page, "next": {"cursor": str(start + limit) if has_more else None}}
+
+
+async def run(args):
+    fids = list(range(1, args.fids + 1))
+    feed = SimulatedFeed(fids, args.posts_per_minute, LatencyModel(args.latency_ms))
+    emitted = Counter()
+    lags = []
+
+    async def callback(event_data):
+        cast = event_data["data"]
+        emitted[cast["hash"]] += 1
+        lags.append(time.time() - feed.posted_at[cast["hash"]])
+
+    poller = CastPoller(feed, callback, fids, state_path=None, rate=args.rate, concurrency=args.concurrency,
+                        min_interval=args.min_interval, max_interval=args.max_interval)
+    cpu_start = time.process_time()
+    task = asyncio.create_task(poller.run())
+    await asyncio.sleep(args.duration)
+    poller.stop()
+    await task
+    cpu = time.process_time() - cpu_start
+
+    lags.sort()
+    stats = poller.get_stats()
+    print(f"{args.fids} fids for {args.duration}s at a budget of {args.rate} requests/s\n")
+    print(f"          requests: {stats['requests']} ({stats['requests'] / args.duration:.1f}/s)")
+    print(f"   CPU per request: {cpu / max(stats['requests'], 1) * 1e6:.0f} us ({cpu / args.duration * 100:.1f}% of a core)")
+    print(f"     casts emitted: {stats['emitted']} (duplicates: {sum(1 for n in emitted.values() if n > 1)})")
+    if lags:
+        print(f"  detection lag p50: {lags[len(lags) // 2]:.1f}s  p95: {lags[int(len(lags) * 0.95)]:.1f}s")
+    print(f"     mean interval: {stats['mean_interval']:.1f}s (min {stats['min_interval']:.1f}s)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark CastPoller against a simulated feed")
+    parser.add_argument("--fids", type=int, default=1000)
+    parser.add_argument("--duration", type=float, default=30)
+    parser.add_argument("--rate", type=float, default=20, help="Request budget per second")
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--posts-per-minute", type=float, default=0.5, help="Mean posting rate of an author")
+    parser.add_argument("--latency-ms", type=float, default=80, help="Median API latency")
+    parser.add_argument("--min-interval", type=float, default=2.0)
+    parser.add_argument("--max-interval", type=float, default=120.0)
+    args = parser.parse_args()
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""Requests per second of the webhook endpoint for rejected vs accepted events
+
+Usage:
+    python benchmarks/bench_prefilter.py [--requests 2000]
+
+Rejected events come from an author outside the allowlist and should be
+dropped by the byte-level peek; accepted events go through parsing,
+logging, dedup and queueing. Requires fastapi and httpx (TestClient).
+"""
+import os
+import sys
+import io
+import json
+import time
+import logging
+import argparse
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'webhook-sdk'))
+from prefilter import EventPrefilter
+
+
+def make_event(i, username, fid):
+    """A cast.created payload shaped like Neynar's, with nested profile and embeds"""
+    return {
+        "created_at": 1712345678 + i,
+        "type": "cast.created",
+        "data": {
+            "object": "cast",
+            "hash": f"0x{i:040x}",
+            "thread_hash": f"0x{i:040x}",
+            "parent_hash": None,
+            "parent_url": None,
+            "root_parent_url": None,
+            "parent_author": {"fid": None},
+            "author": {
+                "object": "user",
+                "fid": fid,
+                "username": username,
+                "display_name": username.title(),
+                "custody_address": "0x" + "ab" * 20,
+                "pfp_url": "https://example.com/pfp.png",
+                "profile": {"bio": {"text": "building onchain " * 10, "mentioned_profiles": []}},
+                "follower_count": 12345,
+                "following_count": 321,
+                "verifications": ["0x" + "cd" * 20],
+                "verified_addresses": {"eth_addresses": ["0x" + "cd" * 20], "sol_addresses": []},
+                "power_badge": True,
+            },
+            "text": "buy 0.5 USDC of ETH",
+            "timestamp": "2025-04-06T12:00:00.000Z",
+            "embeds": [{"url": "https://example.com/article"}],
+            "reactions": {"likes_count": 0, "recasts_count": 0, "likes": [], "recasts": []},
+            "replies": {"count": 0},
+            "channel": None,
+            "mentioned_profiles": [],
+        },
+    }
+
+
+def bench_prefilter(prefilter, bodies):
+    start = time.perf_counter()
+    for body in bodies:
+        prefilter.check(body)
+    return len(bodies) / (time.perf_counter() - start)
+
+
+def bench_http(bodies, username):
+    from fastapi.testclient import TestClient
+    from webhook_server import WebhookServer
+
+    async def callback(event_data):
+        pass
+
+    server = WebhookServer(callback=callback, max_queue_size=len(bodies) + 1,
+                           prefilter=EventPrefilter(allowed_usernames=[username], event_types=["cast.created"]))
+    with TestClient(server.app) as client:
+        start = time.perf_counter()
+        for body in bodies:
+            client.post("/webhook", content=body)
+        return len(bodies) / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark webhook prefiltering")
+    parser.add_argument("--requests", type=int, default=2000)
+    args = parser.parse_args()
+
+    # Keep log formatting cost but don't flood the terminal
+    logging.getLogger().handlers = [logging.StreamHandler(io.StringIO())]
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+
+    accepted = [json.dumps(make_event(i, "0xhardman", 1)).encode() for i in range(args.requests)]
+    rejected = [json.dumps(make_event(i, "someone_else", 2)).encode() for i in range(args.requests)]
+    prefilter = EventPrefilter(allowed_usernames=["0xhardman"], event_types=["cast.created"])
+
+    print(f"Prefilter only, rejected: {bench_prefilter(prefilter, rejected):,.0f} events/s")
+    print(f"Prefilter only, accepted: {bench_prefilter(prefilter, accepted):,.0f} events/s")
+    print(f"HTTP /webhook, rejected:  {bench_http(rejected, '0xhardman'):,.0f} req/s")
+    print(f"HTTP /webhook, accepted:  {bench_http(accepted, '0xhardman'):,.0f} req/s")
+
+
+if __name__ == "__main__":
+    main()
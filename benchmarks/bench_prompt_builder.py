@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""Compare agent prompt size and cache use before and after PromptBuilder
+
+Replays the intent corpus as casts against a stub model that bills like
+Anthropic prompt caching:
+
+- before: the instruction as a plain system string and a per-cast prompt
+  restating the limit, the USDC.e ban and the mentioned tokens
+- after: the PromptBuilder prefix as a cache-marked system block and a
+  one-line message per cast
+
+Reports prompt bytes per event, input tokens per event (all and
+uncached), the cache hit rate and input cost in uncached-token
+equivalents (cache reads cost 0.1x, cache writes 1.25x).
+
+Usage:
+    python benchmarks/bench_prompt_builder.py --events 1000 --interval 20 --tokens 50
+"""
+import os
+import sys
+import json
+import random
+import argparse
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+from prompt_builder import PromptBuilder
+from token_registry import TokenRegistry
+from stubs import TOKEN_ADDRESSES, StubAnthropic
+
+TRADE_LIMIT_USDC = 1.0
+
+# quantar's agent instruction (importing quantar would start Fast-Agent)
+INSTRUCTION = """You are an AI assistant specialized in analyzing Farcaster messages and executing cryptocurrency trades.
+
+When you receive a Farcaster message, you need to:
+1. Analyze the message content to determine if it contains trading intent (buy/sell a token)
+2. If trading intent is detected, identify the trade type (buy/sell), token symbol, and amount (if specified)
+3. Execute the appropriate trading operation, ensuring the trade amount does not exceed 1 USDC
+4. Return the trade execution results
+
+Trading style:
+- Conservative: Do not execute trades unless explicitly instructed
+- Precise: Execute trades strictly according to the message instructions
+- Safe: Always adhere to trading limits
+- Transparent: Clearly report all trading details
+
+Important notes:
+- STRICTLY PROHIBITED from using USDC.e for any transactions, always use only native USDC (0x3c499c542cEF5E3811e1192ce70d8cC03d5c3359)
+- Use the token addresses and decimals listed in each message; they are verified, do not look them up again
+- Only messages from authorized users will trigger trades
+- PAY ATTENTION TO TOKEN DECIMALS when calculating amounts (e.g. USDC has 6 decimals: 1 USDC = 1,000,000 base units)
+- Only call get_token_decimals for a token whose decimals are not listed
+
+Always ensure trading safety and follow all restrictions."""
+
+
+def legacy_analysis_prompt(registry, text):
+    """The per-cast prompt quantar sent before PromptBuilder"""
+    return f"""Analyze this Farcaster message and decide whether to execute a trade (limit {TRADE_LIMIT_USDC} USDC): '{text}'
+
+Tokens mentioned (trade the wrapped token for a name written as an alias, e.g. ETH means WETH):
+{registry.prompt_table(registry.relevant(text))}
+
+Notes:
+1. STRICTLY PROHIBITED from using USDC.e for any transactions, always use only native USDC (address: {TOKEN_ADDRESSES['USDC']})
+2. PAY ATTENTION TO TOKEN DECIMALS when calculating amounts, using the decimals listed above
+"""
+
+
+def cost(usage):
+    return (usage["input_tokens"] + 0.1 * usage["cache_read_input_tokens"]
+            + 1.25 * usage["cache_creation_input_tokens"])
+
+
+def report(name, model, usages, events):
+    tokens = sum(u["input_tokens"] + u["cache_read_input_tokens"] + u["cache_creation_input_tokens"] for u in usages)
+    uncached = sum(u["input_tokens"] for u in usages)
+    hits = sum(1 for u in usages if u["cache_read_input_tokens"])
+    print(f"{name:>7} {model.prompt_bytes / events:>12.0f} {tokens / events:>13.0f} {uncached / events:>9.0f} "
+          f"{hits / events:>9.1%} {sum(cost(u) for u in usages) / events:>14.0f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Prompt bytes and cache hits before and after PromptBuilder")
+    parser.add_argument("--events", type=int, default=1000)
+    parser.add_argument("--interval", type=float, default=20.0, help="Mean seconds between casts")
+    parser.add_argument("--tokens", type=int, default=50, help="Synthetic tokens added to the registry")
+    parser.add_argument("--tool-tokens", type=int, default=1500, help="Size of the MCP tool definitions")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+    random.seed(args.seed)
+
+    corpus_path = os.path.join(os.path.dirname(__file__), "intent_corpus.jsonl")
+    with open(corpus_path) as f:
+        texts = [json.loads(line)["text"] for line in f if line.strip()]
+
+    addresses = dict(TOKEN_ADDRESSES)
+    decimals = {'USDC': 6, 'WETH': 18, 'WBTC': 8, 'MATIC': 18, 'WMATIC': 18}
+    for i in range(args.tokens):
+        addresses[f"TK{i}"] = f"0x{random.getrandbits(160):040x}"
+        decimals[f"TK{i}"] = 18
+    registry = TokenRegistry.build(addresses, decimals)
+    builder = PromptBuilder(INSTRUCTION, registry, TRADE_LIMIT_USDC, tool_tokens=args.tool_tokens)
+
+    before = StubAnthropic(tool_tokens=args.tool_tokens)
+    after = StubAnthropic(tool_tokens=args.tool_tokens)
+    before_usage, after_usage = [], []
+    now = 0.0
+    for _ in range(args.events):
+        now += random.expovariate(1 / args.interval)
+        text = random.choice(texts)
+        before_usage.append(before.create(INSTRUCTION, [{"role": "user", "content": legacy_analysis_prompt(registry, text)}], now))
+        message = builder.analysis(text)
+        usage = after.create(builder.system_blocks(), [{"role": "user", "content": message}], now)
+        builder.record(message, usage=usage, now=now)
+        after_usage.append(usage)
+
+    print(f"{args.events} casts, one every {args.interval:.0f}s on average, "
+          f"{len(registry.tokens)} tokens, {args.tool_tokens} tool definition tokens\n")
+    print(f"{'':>7} {'bytes/event':>12} {'tokens/event':>13} {'uncached':>9} {'cache hit':>9} {'cost/event':>14}")
+    report("before", before, before_usage, args.events)
+    report("after", after, after_usage, args.events)
+
+    stats = builder.get_stats()
+    print(f"\nPromptBuilder: message {stats['message_bytes_per_call']:.0f} bytes/call, "
+          f"cache hit rate {stats['cache_hit_rate']:.1%}, {stats['cached_token_share']:.1%} of input tokens cached")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""Trade latency with and without quote/allowance prefetching
+
+Sends casts (sells and buys of the tracked tokens) through TradeExecutor
+against the stub chain with simulated MCP tool latency, once fetching
+quotes and allowances after the decision and once with a QuotePrefetcher
+that refreshes in the background and starts fetching for the mentioned
+tokens when the cast arrives. Intent classification by the model is
+simulated with a delay (--classify-ms, 0 for fast-path casts), which the
+speculative fetch overlaps with.
+
+Reports time from cast arrival to swap submission and tool calls on the
+critical path per trade.
+
+Usage:
+    python benchmarks/bench_quote_prefetch.py --casts 200 --chain-ms 150 --classify-ms 800
+    # Against the stand-in stdio MCP server instead of the in-process stub
+    python benchmarks/bench_quote_prefetch.py --stdio --chain-ms 150
+"""
+import os
+import sys
+import time
+import random
+import asyncio
+import argparse
+import contextlib
+import statistics
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+from trade_executor import TradeExecutor, open_mcp_session
+from quote_prefetcher import QuotePrefetcher
+from intent_parser import IntentParser
+from token_registry import TokenRegistry
+from stubs import TOKEN_ADDRESSES, LatencyModel, StubChain, StubMCPSession
+
+TRADE_LIMIT_USDC = 1.0
+TRACKED = ['WETH', 'WBTC', 'WMATIC']
+CASTS = ["sell 0.0003 weth", "buy 0.5 usdc of wbtc", "sell 1 wmatic", "buy 1 usdc of eth", "sell 0.000015 wbtc"]
+
+
+class CountingSession:
+    """Counts tool calls made through a session"""
+
+    def __init__(self, session):
+        self.session = session
+        self.calls = 0
+
+    async def call_tool(self, name, arguments=None):
+        self.calls += 1
+        return await self.session.call_tool(name, arguments)
+
+
+async def run(session, registry, args, prefetch):
+    parser = IntentParser(TOKEN_ADDRESSES)
+    trading = CountingSession(session)
+    market = None
+    background = None
+    if prefetch:
+        market = QuotePrefetcher(session, TOKEN_ADDRESSES, TRADE_LIMIT_USDC, symbols=TRACKED,
+                                 ttl=args.ttl, registry=registry)
+        background = asyncio.create_task(market.run(args.refresh))
+        await asyncio.sleep(args.chain_ms / 1000 * 4)  # First round
+
+    latencies, calls = [], []
+    classify = LatencyModel(args.classify_ms)
+    try:
+        for _ in range(args.casts):
+            await asyncio.sleep(random.uniform(0, args.gap))
+            text = random.choice(CASTS)
+            arrived = time.perf_counter()
+            if market is not None:
+                market.prefetch(text)
+            await classify.sleep()
+            before = trading.calls
+            executor = TradeExecutor(trading, TOKEN_ADDRESSES, TRADE_LIMIT_USDC, registry=registry, market=market)
+            await executor.execute(parser.parse(text))
+            latencies.append(time.perf_counter() - arrived)
+            calls.append(trading.calls - before)
+    finally:
+        if background:
+            background.cancel()
+    return latencies, calls, market
+
+
+def report(name, latencies, calls):
+    ordered = sorted(latencies)
+    print(f"{name:>12} {statistics.median(ordered) * 1000:>8.0f} {ordered[int(0.95 * (len(ordered) - 1))] * 1000:>8.0f} "
+          f"{statistics.mean(calls):>11.2f}")
+
+
+async def main_async(args):
+    registry = TokenRegistry.build(TOKEN_ADDRESSES, {'USDC': 6, 'WETH': 18, 'WBTC': 8, 'MATIC': 18, 'WMATIC': 18})
+    async with contextlib.AsyncExitStack() as stack:
+        if args.stdio:
+            server = os.path.join(os.path.dirname(__file__), "stub_polygon_mcp.py")
+            session = await stack.enter_async_context(open_mcp_session(sys.executable, [server], env={
+                **os.environ, "STUB_LATENCY_MS": str(args.chain_ms), "STUB_P95_MS": str(args.chain_p95_ms)}))
+        else:
+            session = StubMCPSession(StubChain(LatencyModel(args.chain_ms, args.chain_p95_ms), balance=1_000_000))
+
+        print(f"{args.casts} casts, MCP tool median {args.chain_ms:.0f} ms, classification {args.classify_ms:.0f} ms\n")
+        print(f"{'':>12} {'p50_ms':>8} {'p95_ms':>8} {'tool_calls':>11}")
+        latencies, calls, _ = await run(session, registry, args, prefetch=False)
+        report("on demand", latencies, calls)
+        latencies, calls, market = await run(session, registry, args, prefetch=True)
+        report("prefetched", latencies, calls)
+        stats = market.get_stats()
+        print(f"\nquote hits {stats['quote_hits']}/{stats['quote_hits'] + stats['quote_misses']}, "
+              f"allowance hits {stats['allowance_hits']}/{stats['allowance_hits'] + stats['allowance_misses']}, "
+              f"{stats['refreshes']} refreshes ({stats['speculative']} triggered by casts)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Trade latency with and without quote prefetching")
+    parser.add_argument("--casts", type=int, default=200)
+    parser.add_argument("--chain-ms", type=float, default=150, help="MCP tool median latency")
+    parser.add_argument("--chain-p95-ms", type=float, default=400)
+    parser.add_argument("--classify-ms", type=float, default=0, help="Simulated model classification (0: fast path)")
+    parser.add_argument("--gap", type=float, default=1.0, help="Max seconds between casts")
+    parser.add_argument("--ttl", type=float, default=15.0)
+    parser.add_argument("--refresh", type=float, default=10.0)
+    parser.add_argument("--stdio", action="store_true", help="Use the stub_polygon_mcp.py server over stdio")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+    random.seed(args.seed)
+    asyncio.run(main_async(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+"""Cost of risk checks and of the trade ledger
+
+Fills the risk engine with trades from many authors over a rolling
+window, then times checks that pass and checks that are rejected, and
+compares with rejecting a cast by asking a (stub) model. Then appends
+decisions to the SQLite ledger with one commit per row and in batches, and
+times recent-activity queries on the filled ledger.
+
+Usage:
+    python benchmarks/bench_risk_engine.py [--trades 100000] [--authors 1000] [--rows 100000]
+"""
+import os
+import sys
+import time
+import random
+import asyncio
+import argparse
+import tempfile
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+from risk_engine import RiskEngine, RiskLimitExceeded
+from trade_ledger import TradeLedger
+from intent_parser import TradeIntent
+from stubs import LatencyModel
+
+WINDOW = 24 * 3600
+
+
+def bench_checks(args):
+    now = time.time()
+    # Trades spread over the last day, oldest first (the ledger returns them in this order)
+    trades = sorted((now - random.uniform(0, WINDOW), str(random.randrange(args.authors)), random.uniform(0.1, 1.0))
+                    for _ in range(args.trades))
+    by_author = {}
+    for _, author, value in trades:
+        by_author[author] = by_author.get(author, 0.0) + value
+    # Room for the reserve loop below on top of the busiest author and of everything loaded
+    reserved = 0.01 * args.checks
+    author_limit = max(by_author.values(), default=0.0) + reserved + 1
+    engine = RiskEngine(trade_limit=1.0, window_limit=sum(by_author.values()) + author_limit + reserved + 1,
+                        author_limit=author_limit, window=WINDOW)
+    engine.load(trades, now=now)
+    # One more author with no headroom left
+    full = str(args.authors)
+    while engine.headroom(full, now=now):
+        engine.reserve(full, engine.headroom(full, now=now), now=now)
+
+    authors = [str(random.randrange(args.authors)) for _ in range(args.checks)]
+    start = time.perf_counter()
+    for author in authors:
+        engine.headroom(author, now=now)
+    passed = (time.perf_counter() - start) / args.checks
+
+    start = time.perf_counter()
+    for _ in range(args.checks):
+        try:
+            engine.check(full, 0.5, now=now)
+        except RiskLimitExceeded:
+            pass
+    rejected = (time.perf_counter() - start) / args.checks
+
+    # Reserve and release as trades go through, with the window sliding forward
+    start = time.perf_counter()
+    for i in range(args.checks):
+        reservation = engine.reserve(authors[i], 0.01, now=now + i * 0.01)
+        if i % 2:
+            engine.release(reservation)
+    reserved = (time.perf_counter() - start) / args.checks
+
+    model = LatencyModel(args.llm_ms)
+    start = time.perf_counter()
+    for _ in range(5):
+        asyncio.run(model.sleep())
+    via_model = (time.perf_counter() - start) / 5
+
+    print(f"{args.trades} trades in the window, {args.authors} authors")
+    print(f"  headroom / passing check   {passed * 1e6:>9.2f} us")
+    print(f"  rejected check             {rejected * 1e6:>9.2f} us")
+    print(f"  reserve + release          {reserved * 1e6:>9.2f} us")
+    print(f"  rejected by the model      {via_model * 1e6:>9.0f} us ({args.llm_ms:.0f} ms stub model)")
+
+
+def bench_ledger(args):
+    intent = TradeIntent('buy', 'WETH', 0.5, 'USDC', 0.95)
+    timings = {"authorized": 0.0004, "intent_parsed": 0.0005, "tx_submitted": 0.61}
+    with tempfile.TemporaryDirectory() as tmp:
+        print(f"\nLedger, {args.rows} decisions:")
+        for name, batch_size in (("commit per row", 1), ("batched (100)", 100)):
+            ledger = TradeLedger(os.path.join(tmp, f"trades_{batch_size}.db"), batch_size=batch_size)
+            now = time.time() - WINDOW
+            rows = args.rows if batch_size > 1 else min(args.rows, 20000)
+            start = time.perf_counter()
+            for i in range(rows):
+                ledger.record(random.choice(('executed', 'rejected', 'no_trade')), intent=intent,
+                              event_id=f"cast.created:0x{i:040x}", author=str(i % args.authors), source="fast path",
+                              value_usdc=0.5, tx_hash="0x" + "ab" * 32, timings=timings, ts=now + i * WINDOW / rows)
+            ledger.flush()
+            elapsed = time.perf_counter() - start
+            print(f"  {name:<16} {rows / elapsed:>10.0f} rows/s ({elapsed / rows * 1e6:.1f} us/row)")
+            ledger.close()
+
+        ledger = TradeLedger(os.path.join(tmp, "trades_100.db"))
+        start = time.perf_counter()
+        for i in range(100):
+            ledger.recent(20, author=str(i % args.authors))
+        by_author = (time.perf_counter() - start) / 100
+        start = time.perf_counter()
+        for _ in range(100):
+            ledger.recent(20)
+        latest = (time.perf_counter() - start) / 100
+        start = time.perf_counter()
+        trades = ledger.traded_since(time.time() - WINDOW)
+        rebuild = time.perf_counter() - start
+        print(f"  recent 20                {latest * 1e3:>8.2f} ms")
+        print(f"  recent 20 of one author  {by_author * 1e3:>8.2f} ms")
+        print(f"  risk window on restart   {rebuild * 1e3:>8.2f} ms ({len(trades)} trades)")
+        ledger.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Risk check and trade ledger cost")
+    parser.add_argument("--trades", type=int, default=100000, help="Trades within the risk window")
+    parser.add_argument("--authors", type=int, default=1000)
+    parser.add_argument("--checks", type=int, default=100000)
+    parser.add_argument("--rows", type=int, default=100000, help="Decisions appended to the ledger")
+    parser.add_argument("--llm-ms", type=float, default=1500, help="Stub model latency")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+    random.seed(args.seed)
+    bench_checks(args)
+    bench_ledger(args)
+
+
+if __name__ == "__main__":
+    main()
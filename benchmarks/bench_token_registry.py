@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+"""Benchmark TokenRegistry lookups and prompt size as the token list grows
+
+Adds synthetic tokens to TOKEN_ADDRESSES and compares the size of the
+token table injected for a cast (only the tokens it mentions) with a full
+table, plus the cost of loading the cached registry and of lookups.
+
+Usage:
+    python benchmarks/bench_token_registry.py --tokens 500
+"""
+import os
+import sys
+import time
+import random
+import argparse
+import tempfile
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+from token_registry import TokenRegistry
+from stubs import TOKEN_ADDRESSES
+
+CASTS = [
+    "buy 0.5 USDC of ETH",
+    "sell all my $WBTC now",
+    "ape 1 usdc into matic",
+    "gm frens, what a day",
+]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark TokenRegistry")
+    parser.add_argument("--tokens", type=int, default=500, help="Synthetic tokens added to TOKEN_ADDRESSES")
+    parser.add_argument("--lookups", type=int, default=200000)
+    args = parser.parse_args()
+
+    addresses = dict(TOKEN_ADDRESSES)
+    decimals = {'USDC': 6, 'WETH': 18, 'WBTC': 8, 'MATIC': 18, 'WMATIC': 18}
+    for i in range(args.tokens):
+        symbol = f"TK{i}"
+        addresses[symbol] = f"0x{random.getrandbits(160):040x}"
+        decimals[symbol] = random.choice((6, 8, 18))
+
+    path = os.path.join(tempfile.mkdtemp(), "token_registry.json")
+    start = time.perf_counter()
+    registry = TokenRegistry.load_or_build(path, addresses, decimals)
+    build = time.perf_counter() - start
+    start = time.perf_counter()
+    registry = TokenRegistry.load_or_build(path, addresses, decimals)
+    load = time.perf_counter() - start
+
+    symbols = list(addresses)
+    start = time.perf_counter()
+    for i in range(args.lookups):
+        registry.decimals(symbols[i % len(symbols)])
+    lookup = time.perf_counter() - start
+
+    full_table = registry.prompt_table(registry.tokens.values())
+    print(f"{len(addresses)} tokens: build+save {build * 1000:.1f} ms, cached load {load * 1000:.1f} ms, "
+          f"{lookup / args.lookups * 1e9:.0f} ns/lookup\n")
+    print(f"full token table: {len(full_table.encode())} bytes")
+    for text in CASTS:
+        table = registry.prompt_table(registry.relevant(text))
+        print(f"{len(table.encode()):>6} bytes  {text}")
+
+
+if __name__ == "__main__":
+    main()
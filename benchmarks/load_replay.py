@@ -0,0 +1,329 @@
+#!/usr/bin/env python3
+"""Replay webhook traffic against quantar's webhook pipeline and report latency
+
+Builds quantar's pipeline in-process (webhook server, event bus, per-author
+scheduler and process_farcaster_event, see quantar.create_pipeline) with a
+stub agent pool in place of Fast-Agent: the stub agent answers
+classification prompts, agent analysis and Polygon MCP tool calls after a
+simulated latency. Fires recorded or synthetic webhook bodies at it over
+HTTP and reports end-to-end latency percentiles, throughput, queue depth
+and drops.
+
+Usage:
+    # Replay a recording made with WebhookServer(recorder=WebhookRecorder(...))
+    python benchmarks/load_replay.py --recording recordings/webhooks.jsonl.gz --rate 50
+
+    # Synthetic casts from the intent corpus, 20 concurrent senders
+    python benchmarks/load_replay.py --synthetic 2000 --concurrency 20 --llm-ms 2000 --chain-ms 300
+
+quantar's environment settings (LLM_BATCH_WINDOW, LLM_DEGRADED_MODE, ...)
+apply. Its ledger, token registry and identity index go to a scratch
+directory; casts are re-stamped when sent so they don't expire. Only the
+per-trade limit is enforced unless --risk-limits is given.
+
+Requires quantar's dependencies (fast-agent-mcp, fastapi, uvicorn) and httpx.
+"""
+import os
+import re
+import sys
+import json
+import time
+import random
+import asyncio
+import logging
+import argparse
+import tempfile
+import contextlib
+from types import SimpleNamespace
+from collections import Counter
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.append(ROOT)
+sys.path.append(os.path.join(ROOT, 'webhook-sdk'))
+import httpx
+from prefilter import EventPrefilter
+from metrics import current_trace
+from recorder import read_recording
+from intent_parser import IntentParser
+from risk_engine import RiskEngine
+from session_pool import SessionPool
+from stubs import TOKEN_ADDRESSES, LatencyModel, StubChain, StubMCPSession, StubAgent
+
+
+def import_quantar(workdir):
+    """Import quantar with its state files in `workdir`
+
+    Fast-Agent parses the command line when quantar creates its app, so it
+    gets none of this script's arguments.
+    """
+    argv, cwd = sys.argv, os.getcwd()
+    sys.argv = argv[:1]
+    os.chdir(workdir)
+    try:
+        import quantar
+    finally:
+        sys.argv = argv
+        os.chdir(cwd)
+    return quantar
+
+
+class StubFastAgent(StubAgent):
+    """Fast-Agent agent lookalike for quantar's agent pool
+
+    Classification prompts are answered with JSON (the parser standing in
+    for the model's judgement), agent prompts with `reply`, both after the
+    simulated LLM latency. Polygon MCP tools run on a StubChain.
+    """
+
+    def __init__(self, chain: StubChain, latency: LatencyModel = None, tool_prefix: str = "polygon-"):
+        super().__init__(latency)
+        self.session = StubMCPSession(chain)
+        self.tool_prefix = tool_prefix
+        self.parser = IntentParser(TOKEN_ADDRESSES)
+
+    async def send(self, prompt: str) -> str:
+        reply = await super().send(prompt)
+        if "Messages:\n" not in prompt:
+            return reply
+        messages = prompt.split("Messages:\n", 1)[1].split("\n\nAnswer", 1)[0]
+        answer = []
+        for line in messages.splitlines():
+            match = re.match(r"(\d+)\. (.*)", line)
+            if not match:
+                continue
+            intent = self.parser.parse(json.loads(match.group(2)))
+            answer.append({"i": int(match.group(1)), "side": intent.side, "token": intent.token,
+                           "amount": intent.amount, "unit": intent.unit})
+        return json.dumps(answer)
+
+    async def generate_str(self, prompt: str, request_params=None) -> str:
+        return await super().send(prompt)
+
+    async def call_tool(self, name: str, arguments=None):
+        if name.startswith(self.tool_prefix):
+            name = name[len(self.tool_prefix):]
+        return await self.session.call_tool(name, arguments)
+
+    async def list_tools(self):
+        return SimpleNamespace(tools=[name for name in dir(StubChain) if not name.startswith("_")])
+
+
+def install_stubs(quantar, agent, risk_limits):
+    """Swap quantar's agent pool (and unless `risk_limits`, its window limits) for the load test"""
+    @contextlib.asynccontextmanager
+    async def session():
+        yield {"default": agent, "hedge": agent}
+
+    quantar.agent_pool = SessionPool(session, size=quantar.AGENT_POOL_SIZE, max_uses=quantar.AGENT_MAX_USES,
+                                     health_check=quantar.check_agent_health)
+    if not risk_limits:
+        quantar.risk_engine = RiskEngine(quantar.TRADE_LIMIT_USDC, None, None,
+                                         window=quantar.RISK_WINDOW_SECONDS, metrics=quantar.METRICS)
+
+
+def synthetic_events(n, username):
+    """Cast events built from the intent corpus texts"""
+    corpus_path = os.path.join(os.path.dirname(__file__), "intent_corpus.jsonl")
+    with open(corpus_path) as f:
+        texts = [json.loads(line)['text'] for line in f if line.strip()]
+    for i in range(n):
+        yield {
+            "type": "cast.created",
+            "data": {
+                "object": "cast",
+                "hash": f"0x{random.getrandbits(160):040x}",
+                "author": {"object": "user", "fid": 1, "username": username},
+                "text": random.choice(texts),
+            },
+        }
+
+
+def recorded_events(path, repeat):
+    """Recorded events, with cast hashes made unique per repetition so dedup doesn't drop them"""
+    records = list(read_recording(path))
+    for round_index in range(repeat):
+        for record in records:
+            event = json.loads(record['body'])
+            data = event.get('data') or {}
+            if repeat > 1 and data.get('hash'):
+                data['hash'] = f"{data['hash']}-{round_index}"
+            yield event
+
+
+def body_at(event, now):
+    """Webhook body of an event posted at `now`, so the pipeline doesn't drop it as expired"""
+    event['created_at'] = int(now)
+    if isinstance(event.get('data'), dict):
+        event['data']['timestamp'] = time.strftime("%Y-%m-%dT%H:%M:%S.000Z", time.gmtime(now))
+    return json.dumps(event).encode("utf-8")
+
+
+def cast_hash(event):
+    return (event.get('data') or {}).get('hash')
+
+
+def percentile(values, q):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+
+async def run(args, quantar):
+    agent = StubFastAgent(StubChain(LatencyModel(args.chain_ms, args.chain_p95_ms), balance=1_000_000),
+                          LatencyModel(args.llm_ms, args.llm_p95_ms))
+    install_stubs(quantar, agent, args.risk_limits)
+
+    if args.recording:
+        events = list(recorded_events(args.recording, args.repeat))
+    else:
+        events = list(synthetic_events(args.synthetic, args.username))
+    # Authorized by username, like users whose fid isn't resolved yet
+    quantar.unresolved_users.clear()
+    quantar.unresolved_users.update(args.authorized if args.authorized is not None else
+                                    {(event.get('data') or {}).get('author', {}).get('username') for event in events})
+
+    completed = {}
+    outcomes = Counter()
+
+    async def timed(event_data):
+        """process_farcaster_event, noting when each cast is done and how it ended"""
+        trace = current_trace()
+        try:
+            await quantar.process_farcaster_event(event_data)
+        finally:
+            completed[cast_hash(event_data)] = time.perf_counter()
+            outcomes[trace.outcome if trace and trace.outcome else "error"] += 1
+
+    bus, webhook_source, server = quantar.create_pipeline(
+        EventPrefilter(event_types=["cast.created"]), handler=timed, workers=args.workers,
+        max_queue_size=args.queue_size, overflow=args.overflow)
+
+    await quantar.agent_pool.start()
+    ledger_task = asyncio.create_task(quantar.trade_ledger.run())
+    await bus.start([webhook_source])
+    serve_task = asyncio.create_task(server.serve("127.0.0.1", args.port, install_signal_handlers=False))
+    while not server.started:
+        await asyncio.sleep(0.01)
+
+    sent = {}
+    ack_latencies = []
+    statuses = Counter()
+    depths = []
+
+    async def sample_depth():
+        while True:
+            depths.append(server.queue.depth() + bus.depth())
+            await asyncio.sleep(0.005)
+
+    async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{args.port}",
+                                 limits=httpx.Limits(max_connections=max(args.concurrency, 100))) as client:
+        async def send(event):
+            key = cast_hash(event)
+            body = body_at(event, time.time())
+            start = time.perf_counter()
+            sent[key] = start
+            try:
+                response = await client.post("/webhook", content=body)
+                statuses[response.status_code] += 1
+            except httpx.HTTPError:
+                statuses["error"] += 1
+            ack_latencies.append(time.perf_counter() - start)
+
+        sampler = asyncio.create_task(sample_depth())
+        started = time.perf_counter()
+
+        if args.rate:
+            # Open loop: fixed arrival rate regardless of how fast the server answers
+            tasks = []
+            for i, event in enumerate(events):
+                delay = started + i / args.rate - time.perf_counter()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+                tasks.append(asyncio.create_task(send(event)))
+            await asyncio.gather(*tasks)
+        else:
+            # Closed loop: a fixed number of senders, each waiting for its ack
+            iterator = iter(events)
+
+            async def sender():
+                for event in iterator:
+                    await send(event)
+            await asyncio.gather(*(sender() for _ in range(args.concurrency)))
+
+        # Wait for queued casts to finish: server queue first, then the bus and the scheduler
+        while server.queue.depth() or server.queue.in_flight:
+            await asyncio.sleep(0.01)
+        await bus.stop(drain=True)
+        elapsed = time.perf_counter() - started
+        sampler.cancel()
+
+    server.shutdown()
+    await serve_task
+    await quantar.agent_pool.close()
+    ledger_task.cancel()
+    quantar.trade_ledger.close()
+
+    latencies = [completed[key] - sent[key] for key in sent if key in completed]
+    scheduler = bus.handler.stats()
+    return {
+        "events_sent": len(events),
+        "events_completed": len(latencies),
+        "elapsed_s": elapsed,
+        "throughput_eps": len(latencies) / elapsed if elapsed else 0.0,
+        "e2e_p50_ms": percentile(latencies, 0.50) * 1000,
+        "e2e_p95_ms": percentile(latencies, 0.95) * 1000,
+        "e2e_p99_ms": percentile(latencies, 0.99) * 1000,
+        "ack_p50_ms": percentile(ack_latencies, 0.50) * 1000,
+        "ack_p99_ms": percentile(ack_latencies, 0.99) * 1000,
+        "queue_depth_max": max(depths, default=0),
+        "queue_depth_mean": sum(depths) / len(depths) if depths else 0.0,
+        "dropped": server.queue.dropped + sum(stats.dropped for stats in bus.sources.values()),
+        "expired_queued": scheduler["expired"],
+        "http_status": {str(k): v for k, v in statuses.items()},
+        "outcomes": dict(outcomes),
+        "llm_calls": agent.calls,
+        "mcp_calls": agent.session.chain.calls,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay webhook traffic against a local WebhookServer")
+    source = parser.add_mutually_exclusive_group()
+    source.add_argument("--recording", help="Recording made by WebhookRecorder (.jsonl or .jsonl.gz)")
+    source.add_argument("--synthetic", type=int, default=500, help="Number of synthetic casts")
+    parser.add_argument("--repeat", type=int, default=1, help="Replay a recording this many times")
+    parser.add_argument("--username", default="0xhardman", help="Author of synthetic casts")
+    parser.add_argument("--authorized", nargs="*", help="Authorized usernames (default: every author)")
+    load = parser.add_mutually_exclusive_group()
+    load.add_argument("--rate", type=float, help="Open loop: events per second")
+    load.add_argument("--concurrency", type=int, default=10, help="Closed loop: concurrent senders")
+    parser.add_argument("--workers", type=int, default=32, help="WebhookServer worker tasks (quantar: 32)")
+    parser.add_argument("--queue-size", type=int, default=1000)
+    parser.add_argument("--overflow", default="reject", choices=["reject", "drop_oldest"])
+    parser.add_argument("--llm-ms", type=float, default=1500, help="Median stub LLM latency")
+    parser.add_argument("--llm-p95-ms", type=float, help="95th percentile (default: twice the median)")
+    parser.add_argument("--chain-ms", type=float, default=150, help="Median stub MCP tool latency")
+    parser.add_argument("--chain-p95-ms", type=float, help="95th percentile (default: twice the median)")
+    parser.add_argument("--risk-limits", action="store_true",
+                        help="Keep quantar's window and per-author limits (most casts then hit them)")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--json", help="Also write the results to this file")
+    args = parser.parse_args()
+
+    for name in ("webhook-server", "event-bus", "quantar"):
+        logging.getLogger(name).setLevel(logging.WARNING)
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+    logging.getLogger("uvicorn.error").setLevel(logging.WARNING)
+
+    with tempfile.TemporaryDirectory() as workdir:
+        results = asyncio.run(run(args, import_quantar(workdir)))
+    for key, value in results.items():
+        print(f"{key:>18}: {value:.1f}" if isinstance(value, float) else f"{key:>18}: {value}")
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
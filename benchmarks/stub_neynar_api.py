@@ -0,0 +1,194 @@
+#!/usr/bin/env python3
+"""Stand-in for the Neynar API on a localhost port
+
+Answers user lookups, bulk lookups, user casts and webhook calls after a
+fixed delay. Every `fail_every`-th request gets a 429 with Retry-After or a
+503 instead, and scripted responses can be queued ahead of the defaults.
+The stub records every request and the connections opened.
+
+From Python (tests):
+    with StubNeynarAPI() as api:
+        api.script(429, headers={"Retry-After": "0"})
+        client = NeynarClient(api_key="stub")
+        client.BASE_URL = api.base_url
+
+As a separate process (benchmarks), printing its port on the first line:
+    python benchmarks/stub_neynar_api.py --delay-ms 5 --fail-every 7
+Counters are read with GET /_stats and cleared with POST /_reset.
+"""
+import json
+import time
+import argparse
+import threading
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import urlparse, parse_qs
+
+
+def user(username: str) -> Dict[str, Any]:
+    """Deterministic stub user for a username"""
+    return {"fid": sum(ord(ch) * 31 ** i for i, ch in enumerate(username)) % 1_000_000, "username": username}
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive
+    wbufsize = 64 * 1024  # one write per response, avoids Nagle/delayed-ACK stalls on reused connections
+    disable_nagle_algorithm = True
+
+    def setup(self):
+        super().setup()
+        self.server.stub._connected()
+
+    def do_GET(self):
+        self._handle("GET")
+
+    def do_POST(self):
+        self._handle("POST")
+
+    def do_PUT(self):
+        self._handle("PUT")
+
+    def do_DELETE(self):
+        self._handle("DELETE")
+
+    def _handle(self, method: str):
+        length = int(self.headers.get("Content-Length") or 0)
+        body = json.loads(self.rfile.read(length)) if length else None
+        status, headers, payload = self.server.stub.respond(method, self.path, dict(self.headers), body)
+        data = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        for key, value in headers.items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, *args):
+        pass
+
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 128  # Concurrent clients open many connections at once (the default backlog is 5)
+
+
+class StubNeynarAPI:
+    """Threaded local HTTP server answering like the Neynar v2 API"""
+
+    def __init__(self, delay: float = 0.0, fail_every: int = 0, port: int = 0):
+        """Initialize the stub
+
+        Args:
+            delay: Seconds the server takes per request
+            fail_every: Every Nth request gets 429 (odd N) or 503 (even N), 0 = never
+            port: Port to listen on (0 = any free port)
+        """
+        self.delay = delay
+        self.fail_every = fail_every
+        self.requests: List[Tuple[str, str, Any]] = []
+        self.connections = 0
+        self._script: deque = deque()
+        self._lock = threading.Lock()
+        self._server = _Server(("127.0.0.1", port), _Handler)
+        self._server.stub = self
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def port(self) -> int:
+        return self._server.server_address[1]
+
+    @property
+    def base_url(self) -> str:
+        return f"http://127.0.0.1:{self.port}"
+
+    def start(self) -> "StubNeynarAPI":
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def script(self, status: int, payload: Any = None, headers: Optional[Dict[str, str]] = None,
+               delay: Optional[float] = None):
+        """Queue a response for the next request (before the default answers)"""
+        self._script.append((status, payload if payload is not None else {"message": "scripted"},
+                             headers or {}, delay))
+
+    def reset(self):
+        with self._lock:
+            self.requests.clear()
+            self.connections = 0
+            self._script.clear()
+
+    def stats(self) -> Dict[str, int]:
+        return {"served": len(self.requests), "connections": self.connections}
+
+    def _connected(self):
+        with self._lock:
+            self.connections += 1
+
+    def respond(self, method: str, path: str, headers: Dict[str, str], body: Any) -> Tuple[int, Dict[str, str], Any]:
+        url = urlparse(path)
+        if url.path == "/_stats":
+            return 200, {}, self.stats()
+        if url.path == "/_reset":
+            self.reset()
+            return 200, {}, {}
+        with self._lock:
+            self.requests.append((method, path, body))
+            n = len(self.requests)
+            scripted = self._script.popleft() if self._script else None
+        if scripted is not None:
+            status, payload, extra, delay = scripted
+            time.sleep(self.delay if delay is None else delay)
+            return status, extra, payload
+        time.sleep(self.delay)
+        if self.fail_every and n % self.fail_every == 0:
+            return (429, {"Retry-After": "0.01"}, {"message": "rate limited"}) if n % 2 \
+                else (503, {}, {"message": "unavailable"})
+        return 200, {}, self.answer(method, url.path, parse_qs(url.query), body)
+
+    def answer(self, method: str, path: str, query: Dict[str, List[str]], body: Any) -> Any:
+        """Default successful response of an endpoint"""
+        if path.endswith("/user/by_username"):
+            return {"user": user(query.get("username", ["user"])[0])}
+        if path.endswith("/user/bulk"):
+            fids = [int(fid) for fid in query.get("fids", [""])[0].split(",") if fid]
+            return {"users": [{"fid": fid, "username": f"user{fid}"} for fid in fids]}
+        if path.endswith("/feed/user/casts"):
+            fid = int(query.get("fid", ["0"])[0])
+            return {"casts": [{"hash": f"0x{fid:040x}", "text": "gm", "author": {"fid": fid}}], "next": {"cursor": None}}
+        if "/webhook" in path:
+            if method == "GET" and path.endswith("/webhook"):
+                return {"webhooks": []}
+            webhook = {"webhook_id": path.rsplit("/", 1)[-1] if method in ("GET", "DELETE") else "wh_1"}
+            return {"webhook": {**webhook, **(body or {})}, "success": True}
+        return {}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Stub Neynar API on localhost")
+    parser.add_argument("--port", type=int, default=0)
+    parser.add_argument("--delay-ms", type=float, default=0)
+    parser.add_argument("--fail-every", type=int, default=0)
+    args = parser.parse_args()
+    api = StubNeynarAPI(args.delay_ms / 1000, args.fail_every, args.port)
+    print(api.port, flush=True)
+    try:
+        api._server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
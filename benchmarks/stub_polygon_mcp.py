@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+"""Stand-in for the Polygon MCP server with simulated chain latency
+
+Exposes the tools TradeExecutor uses, answering from fixed prices and an
+in-memory wallet (see stubs.StubChain), so trades can be executed end to
+end without a seed phrase or network access.
+
+Usage (stdio MCP server):
+    STUB_LATENCY_MS=200 STUB_P95_MS=800 python benchmarks/stub_polygon_mcp.py
+
+From Python:
+    async with open_mcp_session("python", ["benchmarks/stub_polygon_mcp.py"]) as session:
+        executor = TradeExecutor(session, TOKEN_ADDRESSES, TRADE_LIMIT_USDC)
+"""
+import os
+import json
+
+from mcp.server.fastmcp import FastMCP
+
+from stubs import LatencyModel, StubChain
+
+# Median and 95th percentile of the simulated latency per tool call
+LATENCY_MS = float(os.getenv("STUB_LATENCY_MS", "50"))
+P95_MS = float(os.getenv("STUB_P95_MS", str(LATENCY_MS * 2)))
+
+chain = StubChain(LatencyModel(LATENCY_MS, P95_MS))
+
+mcp = FastMCP("stub-polygon")
+
+
+@mcp.tool()
+async def get_token_decimals(tokenAddress: str) -> str:
+    return json.dumps(await chain.call("get_token_decimals", {"tokenAddress": tokenAddress}))
+
+
+@mcp.tool()
+async def get_token_balance(tokenAddress: str) -> str:
+    return json.dumps(await chain.call("get_token_balance", {"tokenAddress": tokenAddress}))
+
+
+@mcp.tool()
+async def check_allowance(tokenAddress: str, spenderAddress: str) -> str:
+    return json.dumps(await chain.call("check_allowance", {
+        "tokenAddress": tokenAddress, "spenderAddress": spenderAddress}))
+
+
+@mcp.tool()
+async def approve_token(tokenAddress: str, spenderAddress: str, amount: str) -> str:
+    return json.dumps(await chain.call("approve_token", {
+        "tokenAddress": tokenAddress, "spenderAddress": spenderAddress, "amount": amount}))
+
+
+@mcp.tool()
+async def inch_quote(fromTokenAddress: str, toTokenAddress: str, amount: str) -> str:
+    return json.dumps(await chain.call("inch_quote", {
+        "fromTokenAddress": fromTokenAddress, "toTokenAddress": toTokenAddress, "amount": amount}))
+
+
+@mcp.tool()
+async def inch_swap(fromTokenAddress: str, toTokenAddress: str, amount: str, slippage: float = 1.0) -> str:
+    return json.dumps(await chain.call("inch_swap", {
+        "fromTokenAddress": fromTokenAddress, "toTokenAddress": toTokenAddress,
+        "amount": amount, "slippage": slippage}))
+
+
+if __name__ == "__main__":
+    mcp.run()
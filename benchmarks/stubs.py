@@ -0,0 +1,177 @@
+#!/usr/bin/env python3
+"""In-process stand-ins for the LLM agent and the Polygon MCP server
+
+Both simulate latency with a log-normal distribution (median and p95 in
+milliseconds), which is close to what model endpoints and RPC calls look
+like in practice: most calls near the median with a long tail.
+"""
+import os
+import json
+import math
+import random
+import asyncio
+from types import SimpleNamespace
+from typing import Any, Dict
+
+# Same addresses as quantar.TOKEN_ADDRESSES (importing quantar would start Fast-Agent)
+TOKEN_ADDRESSES = {
+    'USDC': '0x3c499c542cEF5E3811e1192ce70d8cC03d5c3359',
+    'USDC.e': 'DO_NOT_USE',
+    'WETH': '0x7ceB23fD6bC0adD59E62ac25578270cFf1b9f619',
+    'WBTC': '0x1BFD67037B42Cf73acF2047067bd4F2C47D9BfD6',
+    'MATIC': '0x0000000000000000000000000000000000001010',
+    'WMATIC': '0x0d500B1d8E8eF31E21C99d1Db9A6444d3ADf1270'
+}
+
+DECIMALS = {
+    TOKEN_ADDRESSES['USDC']: 6,
+    TOKEN_ADDRESSES['WETH']: 18,
+    TOKEN_ADDRESSES['WBTC']: 8,
+    TOKEN_ADDRESSES['MATIC']: 18,
+    TOKEN_ADDRESSES['WMATIC']: 18,
+}
+
+# USDC per whole token
+PRICES = {
+    TOKEN_ADDRESSES['USDC']: 1.0,
+    TOKEN_ADDRESSES['WETH']: 3000.0,
+    TOKEN_ADDRESSES['WBTC']: 60000.0,
+    TOKEN_ADDRESSES['MATIC']: 0.5,
+    TOKEN_ADDRESSES['WMATIC']: 0.5,
+}
+
+
+class LatencyModel:
+    """Log-normal latency given its median and 95th percentile in milliseconds"""
+
+    def __init__(self, median_ms: float, p95_ms: float = None):
+        self.median_ms = median_ms
+        p95_ms = p95_ms if p95_ms is not None else median_ms * 2
+        # p95 of a log-normal is median * exp(1.645 * sigma)
+        self.sigma = math.log(max(p95_ms, median_ms) / median_ms) / 1.645 if median_ms > 0 else 0.0
+
+    def sample(self) -> float:
+        """One latency in seconds"""
+        if self.median_ms <= 0:
+            return 0.0
+        return self.median_ms * math.exp(random.gauss(0, self.sigma)) / 1000
+
+    async def sleep(self):
+        await asyncio.sleep(self.sample())
+
+
+class StubChain:
+    """Polygon MCP tools answered from fixed prices and an in-memory wallet"""
+
+    def __init__(self, latency: LatencyModel = None, balance: float = 10):
+        self.latency = latency or LatencyModel(0)
+        self.balances = {address: int(balance * 10 ** decimals) for address, decimals in DECIMALS.items()}
+        self.allowances = {}
+        self.calls = 0
+
+    def _quote(self, from_token, to_token, amount):
+        value = int(amount) / 10 ** DECIMALS[from_token] * PRICES[from_token]
+        return int(value / PRICES[to_token] * 10 ** DECIMALS[to_token])
+
+    async def get_token_decimals(self, tokenAddress: str) -> Dict[str, Any]:
+        return {"decimals": DECIMALS[tokenAddress]}
+
+    async def get_token_balance(self, tokenAddress: str) -> Dict[str, Any]:
+        return {"balance": str(self.balances.get(tokenAddress, 0))}
+
+    async def check_allowance(self, tokenAddress: str, spenderAddress: str) -> Dict[str, Any]:
+        return {"allowance": str(self.allowances.get((tokenAddress, spenderAddress), 0))}
+
+    async def approve_token(self, tokenAddress: str, spenderAddress: str, amount: str) -> Dict[str, Any]:
+        self.allowances[(tokenAddress, spenderAddress)] = int(amount)
+        return {"txHash": "0x" + os.urandom(32).hex()}
+
+    async def inch_quote(self, fromTokenAddress: str, toTokenAddress: str, amount: str) -> Dict[str, Any]:
+        return {"toAmount": str(self._quote(fromTokenAddress, toTokenAddress, amount))}
+
+    async def inch_swap(self, fromTokenAddress: str, toTokenAddress: str, amount: str,
+                        slippage: float = 1.0) -> Dict[str, Any]:
+        if int(amount) > self.balances.get(fromTokenAddress, 0):
+            raise ValueError("Insufficient balance")
+        out = self._quote(fromTokenAddress, toTokenAddress, amount)
+        self.balances[fromTokenAddress] -= int(amount)
+        self.balances[toTokenAddress] = self.balances.get(toTokenAddress, 0) + out
+        return {"txHash": "0x" + os.urandom(32).hex(), "toAmount": str(out)}
+
+    async def call(self, name: str, arguments: Dict[str, Any]) -> Dict[str, Any]:
+        """Run a tool by name after the simulated latency"""
+        self.calls += 1
+        await self.latency.sleep()
+        return await getattr(self, name)(**arguments)
+
+
+class StubMCPSession:
+    """MCP-session lookalike over a StubChain, for TradeExecutor"""
+
+    def __init__(self, chain: StubChain):
+        self.chain = chain
+
+    async def call_tool(self, name: str, arguments: Dict[str, Any] = None):
+        try:
+            text = json.dumps(await self.chain.call(name, arguments or {}))
+            error = False
+        except Exception as e:
+            text = str(e)
+            error = True
+        return SimpleNamespace(content=[SimpleNamespace(type="text", text=text)], isError=error)
+
+
+class StubAgent:
+    """Agent lookalike whose send() takes a simulated LLM round-trip"""
+
+    def __init__(self, latency: LatencyModel = None, reply: str = "No trade executed."):
+        self.latency = latency or LatencyModel(0)
+        self.reply = reply
+        self.calls = 0
+        self.prompt_bytes = 0
+
+    async def send(self, prompt: str) -> str:
+        self.calls += 1
+        self.prompt_bytes += len(prompt.encode("utf-8"))
+        await self.latency.sleep()
+        return self.reply
+
+
+class StubAnthropic:
+    """messages.create lookalike that bills prompts like Anthropic prompt caching
+
+    A system prompt given as blocks is cached up to the last block with
+    cache_control (plus the tool definitions in front of it) when that
+    prefix reaches `min_cache_tokens`; a later call with the same prefix
+    within `ttl` seconds reads it from the cache. Tokens are estimated at
+    4 bytes each. Returns the usage fields of an Anthropic response.
+    """
+
+    def __init__(self, tool_tokens: int = 0, min_cache_tokens: int = 1024, ttl: float = 300.0):
+        self.tool_tokens = tool_tokens
+        self.min_cache_tokens = min_cache_tokens
+        self.ttl = ttl
+        self.cache: Dict[int, float] = {}
+        self.calls = 0
+        self.prompt_bytes = 0
+
+    def create(self, system: Any, messages: Any, now: float = 0.0) -> Dict[str, int]:
+        self.calls += 1
+        blocks = [{"type": "text", "text": system}] if isinstance(system, str) else list(system or [])
+        texts = [block["text"] for block in blocks] + [message["content"] for message in messages]
+        self.prompt_bytes += sum(len(text.encode("utf-8")) for text in texts)
+        tokens = [(len(text.encode("utf-8")) + 3) // 4 for text in texts]
+        total = self.tool_tokens + sum(tokens)
+
+        marked = [i for i, block in enumerate(blocks) if block.get("cache_control")]
+        cached = self.tool_tokens + sum(tokens[:marked[-1] + 1]) if marked else 0
+        if not marked or cached < self.min_cache_tokens:
+            return {"input_tokens": total, "cache_read_input_tokens": 0, "cache_creation_input_tokens": 0}
+        key = hash(tuple(texts[:marked[-1] + 1]))
+        hit = now - self.cache.get(key, float("-inf")) <= self.ttl
+        self.cache[key] = now
+        return {
+            "input_tokens": total - cached,
+            "cache_read_input_tokens": cached if hit else 0,
+            "cache_creation_input_tokens": 0 if hit else cached,
+        }
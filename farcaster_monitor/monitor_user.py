@@ -1,9 +1,13 @@
 import os
+import sys
 import json
 import requests
 from dotenv import load_dotenv
 from datetime import datetime
 
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'webhook-sdk'))
+from identity_index import IdentityIndex
+
 # 加载环境变量
 load_dotenv(dotenv_path='../.env')
 
@@ -21,23 +25,27 @@ HEADERS = {
     "x-api-key": NEYNAR_API_KEY
 }
 
+# 用户名 <-> FID 本地索引(缓存在磁盘上,已知用户无需请求API)
+identity_index = IdentityIndex('identity_index.json')
+
 
 def get_user_by_username(username):
-    """通过用户名获取用户信息"""
+    """通过用户名获取用户信息(优先查本地身份索引,未命中时精确查询并写入索引)"""
+    identity = identity_index.by_username(username)
+    if identity:
+        return identity.as_user()
+
     try:
-        # 搜索用户
-        url = f"{API_BASE_URL}/user/search?q={username}&limit=10"
-        response = requests.get(url, headers=HEADERS)
+        url = f"{API_BASE_URL}/user/by_username"
+        response = requests.get(url, headers=HEADERS, params={"username": username.lstrip('@')})
+        if response.status_code == 404:
+            return None
         response.raise_for_status()
-        data = response.json()
-
-        # 搜索匹配的用户
-        users = data.get('result', {}).get('users', [])
-        for user in users:
-            if user.get('username', '').lower() == username.lower():
-                return user
-
-        return None
+        user = response.json().get('user')
+        if user:
+            identity_index.update([user])
+            identity_index.save()
+        return user
     except Exception as e:
         print(f"获取用户信息失败: {str(e)}")
         if hasattr(e, 'response') and e.response:
@@ -0,0 +1,355 @@
+#!/usr/bin/env python3
+"""Incremental multi-user cast poller
+
+Follows many fids concurrently and passes only casts it hasn't seen before
+to a callback with the same signature and event shape as `WebhookServer`
+callbacks ({"type": "cast.created", "data": cast}), so it can back up or
+backfill the webhook path.
+
+- Per-fid state (recent cast hashes, newest timestamp, polling interval) is
+  persisted to a JSON file, so restarts pick up where they left off.
+- Authors who post often are polled more often: the interval halves when a
+  poll finds new casts and grows by half when it doesn't.
+- All requests draw from one token bucket, keeping the whole poller inside
+  the Neynar rate limit however many fids it follows.
+
+Usage:
+    python poller.py --usernames vitalik.eth dwr.eth --fids 3 --rate 5
+"""
+import os
+import sys
+import json
+import time
+import heapq
+import asyncio
+import logging
+import argparse
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'webhook-sdk'))
+from identity_index import IdentityIndex
+
+logger = logging.getLogger("farcaster-monitor")
+
+# Recent cast hashes remembered per fid
+SEEN_PER_FID = 100
+
+
+class RateLimiter:
+    """Token bucket shared by every request of the poller"""
+
+    def __init__(self, rate: float, burst: Optional[float] = None):
+        """Initialize the bucket
+
+        Args:
+            rate: Requests per second
+            burst: Bucket size, defaults to one second of requests
+        """
+        self.rate = rate
+        self.capacity = burst if burst is not None else max(rate, 1.0)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        """Wait for a token"""
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+class FidState:
+    """What the poller knows about one fid"""
+
+    __slots__ = ("fid", "seen", "last_timestamp", "interval", "next_poll", "polls", "new_casts", "errors")
+
+    def __init__(self, fid: int, interval: float, seen: Iterable[str] = (), last_timestamp: Optional[str] = None):
+        self.fid = fid
+        self.seen: List[str] = list(seen)[-SEEN_PER_FID:]
+        self.last_timestamp = last_timestamp
+        self.interval = interval
+        self.next_poll = 0.0
+        self.polls = 0
+        self.new_casts = 0
+        self.errors = 0
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"seen": self.seen, "last_timestamp": self.last_timestamp, "interval": self.interval}
+
+
+class CastPoller:
+    """Poll many fids' casts and emit new ones to a callback"""
+
+    def __init__(self,
+                 client: Any,
+                 callback: Callable[[Dict[str, Any]], Awaitable[None]],
+                 fids: Iterable[int] = (),
+                 state_path: Optional[str] = "poll_state.json",
+                 rate: float = 5.0,
+                 concurrency: int = 10,
+                 min_interval: float = 15.0,
+                 max_interval: float = 600.0,
+                 page_size: int = 25,
+                 max_pages: int = 4,
+                 backfill: bool = False,
+                 save_interval: float = 30.0):
+        """Initialize the poller
+
+        Args:
+            client: AsyncNeynarClient, or anything with an async `fetch_user_casts(fid, limit, cursor)`
+            callback: Coroutine function called with {"type": "cast.created", "data": cast} per new cast
+            fids: Fids to follow, in addition to those in the state file (more can be added with add_fid)
+            state_path: JSON file for per-fid state, None to keep it in memory only
+            rate: Global request budget in requests per second
+            concurrency: Maximum requests in flight
+            min_interval: Shortest time between polls of one fid in seconds
+            max_interval: Longest time between polls of one fid in seconds
+            page_size: Casts per request
+            max_pages: Pages followed when a fid posted more than one page since the last poll
+            backfill: Emit the casts found on a fid's first poll (otherwise they only mark the starting point)
+            save_interval: Seconds between state file writes
+        """
+        self.client = client
+        self.callback = callback
+        self.state_path = state_path
+        self.limiter = RateLimiter(rate)
+        self.concurrency = concurrency
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.page_size = page_size
+        self.max_pages = max_pages
+        self.backfill = backfill
+        self.save_interval = save_interval
+
+        self.states: Dict[int, FidState] = {}
+        self._heap: List = []
+        self._wakeup: Optional[asyncio.Event] = None
+        self._running = False
+
+        # Counters
+        self.requests = 0
+        self.emitted = 0
+        self.errors = 0
+
+        self.load()
+        for fid in fids:
+            self.add_fid(fid)
+
+    def add_fid(self, fid: int):
+        """Start following a fid (polled right away)"""
+        fid = int(fid)
+        if fid in self.states:
+            return
+        self.states[fid] = FidState(fid, self.min_interval)
+        if self._running:
+            heapq.heappush(self._heap, (time.monotonic(), fid))
+            self._wakeup.set()
+
+    def load(self):
+        """Restore per-fid state from the state file"""
+        if not self.state_path or not os.path.exists(self.state_path):
+            return
+        try:
+            with open(self.state_path) as f:
+                saved = json.load(f)
+        except (OSError, ValueError) as e:
+            logger.warning(f"Ignoring unreadable poll state {self.state_path}: {e}")
+            return
+        for fid, state in saved.get("fids", {}).items():
+            interval = min(max(state.get("interval", self.min_interval), self.min_interval), self.max_interval)
+            self.states[int(fid)] = FidState(int(fid), interval, state.get("seen", []), state.get("last_timestamp"))
+
+    def save(self):
+        """Write per-fid state to the state file (atomically)"""
+        if not self.state_path:
+            return
+        tmp_path = f"{self.state_path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump({"saved_at": time.time(),
+                       "fids": {str(fid): state.to_dict() for fid, state in self.states.items()}}, f)
+        os.replace(tmp_path, self.state_path)
+
+    async def run(self):
+        """Poll until stop() is called"""
+        self._running = True
+        self._wakeup = asyncio.Event()
+        semaphore = asyncio.Semaphore(self.concurrency)
+        pending = set()
+        last_save = time.monotonic()
+
+        # Fids restored from the state file are followed too
+        now = time.monotonic()
+        self._heap = [(now, fid) for fid in self.states]
+
+        async def poll(fid):
+            try:
+                await self.poll(self.states[fid])
+            finally:
+                semaphore.release()
+                heapq.heappush(self._heap, (self.states[fid].next_poll, fid))
+                self._wakeup.set()
+
+        try:
+            while self._running:
+                now = time.monotonic()
+                if now - last_save >= self.save_interval:
+                    self.save()
+                    last_save = now
+
+                if not self._heap or self._heap[0][0] > now:
+                    timeout = min(self._heap[0][0] - now if self._heap else self.save_interval, self.save_interval)
+                    self._wakeup.clear()
+                    try:
+                        await asyncio.wait_for(self._wakeup.wait(), timeout)
+                    except asyncio.TimeoutError:
+                        pass
+                    continue
+
+                _, fid = heapq.heappop(self._heap)
+                await semaphore.acquire()
+                await self.limiter.acquire()
+                task = asyncio.create_task(poll(fid))
+                pending.add(task)
+                task.add_done_callback(pending.discard)
+        finally:
+            for task in pending:
+                task.cancel()
+            await asyncio.gather(*pending, return_exceptions=True)
+            self.save()
+
+    def stop(self):
+        """Stop polling after the current iteration"""
+        self._running = False
+        if self._wakeup:
+            self._wakeup.set()
+
+    async def poll(self, state: FidState):
+        """Fetch a fid's newest casts and emit the unseen ones, oldest first"""
+        first_poll = state.polls == 0 and not state.seen
+        state.polls += 1
+        seen = set(state.seen)
+        new_casts = []
+        cursor = None
+        try:
+            for page in range(self.max_pages):
+                if page:
+                    await self.limiter.acquire()
+                self.requests += 1
+                response = await self.client.fetch_user_casts(state.fid, limit=self.page_size, cursor=cursor)
+                casts = response.get("casts", [])
+                caught_up = False
+                for cast in casts:
+                    if cast.get("hash") in seen or _is_older(cast.get("timestamp"), state.last_timestamp):
+                        caught_up = True
+                        break
+                    new_casts.append(cast)
+                cursor = (response.get("next") or {}).get("cursor")
+                # Stop at the first known cast; on a first poll, one page is enough to set the starting point
+                if caught_up or first_poll or not cursor or len(casts) < self.page_size:
+                    break
+        except Exception as e:
+            state.errors += 1
+            self.errors += 1
+            state.interval = min(state.interval * 2, self.max_interval)
+            state.next_poll = time.monotonic() + state.interval
+            logger.warning(f"Polling fid {state.fid} failed: {e}, next poll in {state.interval:.0f}s")
+            return
+
+        if new_casts:
+            state.seen = (state.seen + [cast.get("hash") for cast in reversed(new_casts)])[-SEEN_PER_FID:]
+            newest = new_casts[0].get("timestamp")
+            if newest and (state.last_timestamp is None or newest > state.last_timestamp):
+                state.last_timestamp = newest
+            state.interval = max(state.interval / 2, self.min_interval)
+        else:
+            state.interval = min(state.interval * 1.5, self.max_interval)
+        state.next_poll = time.monotonic() + state.interval
+
+        if first_poll and not self.backfill:
+            return
+        for cast in reversed(new_casts):
+            state.new_casts += 1
+            self.emitted += 1
+            try:
+                await self.callback({"type": "cast.created", "created_at": int(time.time()), "data": cast})
+            except Exception as e:
+                logger.error(f"Callback failed for cast {cast.get('hash')}: {e}")
+
+    def get_stats(self) -> Dict[str, Any]:
+        intervals = [state.interval for state in self.states.values()]
+        return {
+            "fids": len(self.states),
+            "requests": self.requests,
+            "emitted": self.emitted,
+            "errors": self.errors,
+            "min_interval": min(intervals, default=0.0),
+            "mean_interval": sum(intervals) / len(intervals) if intervals else 0.0,
+        }
+
+
+def _is_older(timestamp: Optional[str], last_timestamp: Optional[str]) -> bool:
+    """Whether a cast is at or before the newest cast already seen (ISO timestamps compare as strings)"""
+    return bool(timestamp and last_timestamp and timestamp <= last_timestamp)
+
+
+async def resolve_usernames(client: Any, usernames: Iterable[str], index: Optional[IdentityIndex] = None) -> List[int]:
+    """Fids of usernames, skipping unknown ones
+
+    With an IdentityIndex only usernames it doesn't know yet are looked up.
+    """
+    index = index if index is not None else IdentityIndex()
+    return list((await index.resolve_async(client, usernames)).values())
+
+
+async def print_cast(event_data: Dict[str, Any]):
+    cast = event_data["data"]
+    author = cast.get("author", {})
+    timestamp = datetime.fromisoformat(cast.get("timestamp").replace("Z", "+00:00")).strftime("%Y-%m-%d %H:%M:%S UTC")
+    print(f"[{timestamp}] @{author.get('username')}: {cast.get('text')}")
+
+
+async def main():
+    from dotenv import load_dotenv
+    from neynar_client import AsyncNeynarClient
+
+    parser = argparse.ArgumentParser(description="Poll Farcaster users for new casts")
+    parser.add_argument("--fids", type=int, nargs="*", default=[], help="Fids to follow")
+    parser.add_argument("--usernames", nargs="*", default=[], help="Usernames to follow")
+    parser.add_argument("--state", default="poll_state.json", help="State file")
+    parser.add_argument("--identity-index", default="identity_index.json", help="Username <-> fid cache file")
+    parser.add_argument("--rate", type=float, default=5.0, help="Requests per second for the whole poller")
+    parser.add_argument("--min-interval", type=float, default=15.0)
+    parser.add_argument("--max-interval", type=float, default=600.0)
+    parser.add_argument("--backfill", action="store_true", help="Print the latest casts on the first poll")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    load_dotenv(dotenv_path='../.env')
+
+    async with AsyncNeynarClient() as client:
+        index = IdentityIndex(args.identity_index)
+        fids = args.fids + await resolve_usernames(client, args.usernames, index)
+        refresh = asyncio.create_task(index.run_refresh(client))
+        poller = CastPoller(client, print_cast, fids, state_path=args.state, rate=args.rate,
+                            min_interval=args.min_interval, max_interval=args.max_interval,
+                            backfill=args.backfill)
+        logger.info(f"Following {len(poller.states)} fids at {args.rate} requests/s")
+        try:
+            await poller.run()
+        finally:
+            refresh.cancel()
+            logger.info(f"Poller stats: {poller.get_stats()}")
+
+
+if __name__ == "__main__":
+    try:
+        asyncio.run(main())
+    except KeyboardInterrupt:
+        pass
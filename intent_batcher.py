@@ -0,0 +1,189 @@
+#!/usr/bin/env python3
+import re
+import json
+import asyncio
+from typing import Any, Awaitable, Callable, List, Optional, Tuple
+
+from intent_parser import TradeIntent
+
+# Confidence given to an intent the model classified (below the parser's fast path,
+# above anything that needs a full agent analysis)
+LLM_CONFIDENCE = 0.8
+
+# Placeholder for casts the model's answer didn't cover
+UNCLASSIFIED = TradeIntent(None, None, None, None, 0.0)
+
+
+class IntentBatcher:
+    """Classify concurrent casts with one model call per batch
+
+    Casts arriving within `window` seconds of the first one (or until
+    `max_batch` are waiting) are sent to `classify` together; each caller
+    gets its own intent back. A cast waits at most `window` seconds longer
+    than it would alone.
+    """
+
+    def __init__(self,
+                 classify: Callable[[List[str]], Awaitable[List[TradeIntent]]],
+                 window: float = 0.25,
+                 max_batch: int = 16):
+        """Initialize the batcher
+
+        Args:
+            classify: Coroutine function mapping cast texts to one intent per text, in order
+            window: Seconds to wait for more casts after the first one of a batch
+            max_batch: Batch size that triggers classification right away
+        """
+        self.classify_batch = classify
+        self.window = window
+        self.max_batch = max_batch
+        self._pending: List[Tuple[str, asyncio.Future]] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+
+        # Counters
+        self.batches = 0
+        self.items = 0
+        self.failed_batches = 0
+
+    async def classify(self, text: str) -> TradeIntent:
+        """Classify one cast as part of the current batch
+
+        Raises:
+            Exception: Whatever `classify` raised for the batch
+        """
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((text, future))
+        if len(self._pending) >= self.max_batch or self.window <= 0:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.window, self._flush)
+        return await future
+
+    def _flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending = self._pending, []
+        if batch:
+            asyncio.ensure_future(self._run(batch))
+
+    async def _run(self, batch: List[Tuple[str, asyncio.Future]]):
+        self.batches += 1
+        self.items += len(batch)
+        try:
+            intents = await self.classify_batch([text for text, _ in batch])
+        except Exception as e:
+            self.failed_batches += 1
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        for i, (_, future) in enumerate(batch):
+            if not future.done():
+                future.set_result(intents[i] if i < len(intents) else UNCLASSIFIED)
+
+    def get_stats(self):
+        return {
+            "batches": self.batches,
+            "items": self.items,
+            "failed_batches": self.failed_batches,
+            "mean_batch_size": self.items / self.batches if self.batches else 0.0,
+            "llm_calls_saved": self.items - self.batches,
+        }
+
+
+def build_batch_prompt(texts: List[str], tokens: str) -> str:
+    """Prompt asking the model to classify several casts at once
+
+    Args:
+        texts: Cast texts, numbered in the prompt
+        tokens: Token table for the casts (e.g. TokenRegistry.prompt_table output)
+    """
+    casts = "\n".join(f"{i}. {json.dumps(text, ensure_ascii=False)}" for i, text in enumerate(texts))
+    return f"""Classify each Farcaster message below as a trade instruction or not. Do not call any tools and do not execute anything.
+
+Tokens:
+{tokens}
+
+Messages:
+{casts}
+
+Answer with only a JSON array, one object per message in the same order:
+[{{"i": 0, "side": "buy" | "sell" | null, "token": "<symbol from the token list>" | null, "amount": <number> | null, "unit": "<symbol>" | "all" | "%" | null}}]
+Use side null for anything that is not an explicit instruction to trade now. unit is the token the amount is given in ("USDC" for dollars).
+"""
+
+
+def parse_batch_response(response: str, count: int, resolve: Callable[[str], Optional[str]]) -> List[TradeIntent]:
+    """Turn the model's JSON answer into one intent per cast
+
+    Entries that are missing, malformed or name an unknown token come back
+    as UNCLASSIFIED (confidence 0), so the caller can fall back to a full
+    per-cast analysis.
+
+    Args:
+        response: Model output containing a JSON array
+        count: Number of casts in the batch
+        resolve: Maps a token name from the answer to a known symbol, or None
+    """
+    intents = [UNCLASSIFIED] * count
+    match = re.search(r"\[.*\]", response, re.DOTALL)
+    if match is None:
+        return intents
+    try:
+        items = json.loads(match.group())
+    except ValueError:
+        return intents
+
+    for position, item in enumerate(items):
+        if not isinstance(item, dict):
+            continue
+        i = item.get("i", position)
+        if not isinstance(i, int) or not 0 <= i < count:
+            continue
+        intents[i] = _to_intent(item, resolve)
+    return intents
+
+
+def _to_intent(item: Any, resolve: Callable[[str], Optional[str]]) -> TradeIntent:
+    side = item.get("side")
+    if side not in ("buy", "sell"):
+        return TradeIntent(None, None, None, None, LLM_CONFIDENCE)
+    token = resolve(str(item.get("token") or ""))
+    if token is None:
+        return UNCLASSIFIED
+    unit = item.get("unit")
+    if unit not in (None, "all", "%"):
+        unit = resolve(str(unit))
+        if unit is None:
+            return UNCLASSIFIED
+    try:
+        amount = float(item["amount"]) if item.get("amount") is not None else None
+    except (TypeError, ValueError):
+        return UNCLASSIFIED
+    return TradeIntent(side, token, amount, unit, LLM_CONFIDENCE)
+
+
+def llm_classifier(send: Callable[[str], Awaitable[str]], registry: Any) -> Callable[[List[str]], Awaitable[List[TradeIntent]]]:
+    """Batch classify function for IntentBatcher backed by a model
+
+    Args:
+        send: Coroutine function sending a prompt to the model and returning its answer
+        registry: TokenRegistry used for the token table and to resolve token names
+    """
+    def resolve(name):
+        # Prohibited tokens resolve too, so the executor rejects them instead of the cast going to the agent
+        token = registry.get(name) if name else None
+        return token.symbol if token else None
+
+    async def classify(texts: List[str]) -> List[TradeIntent]:
+        mentioned = []
+        for text in texts:
+            for token in registry.relevant(text):
+                if token not in mentioned:
+                    mentioned.append(token)
+        response = await send(build_batch_prompt(texts, registry.prompt_table(mentioned)))
+        return parse_batch_response(str(response), len(texts), resolve)
+
+    return classify
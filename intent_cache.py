@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+import re
+import time
+import unicodedata
+from collections import OrderedDict
+from decimal import Decimal, InvalidOperation
+from typing import Dict, Optional, Tuple
+
+from intent_parser import TradeIntent
+
+_URL = re.compile(r"https?://\S+|www\.\S+")
+_MENTION = re.compile(r"(?<!\w)@[\w.-]+")
+_NUMBER = re.compile(r"(?<![\w.])(\d[\d,]*(?:\.\d+)?|\.\d+)(?![\w])")
+_SPACE = re.compile(r"\s+")
+_CASHTAG = re.compile(r"\$(?=[a-z])")
+# Variation selectors and the keycap mark that follow emoji (combining marks, not symbols)
+_EMOJI_MARKS = {"\ufe0e", "\ufe0f", "\u20e3"}
+# Punctuation that can change an instruction ("50%", "-1", "eth/usdc", "buy eth?", "don't");
+# "." is kept inside words and numbers
+_KEEP_PUNCTUATION = set("%-/#&?'")
+_APOSTROPHES = re.compile(r"[\u2018\u2019\u02bc`]")
+# Negations written without the apostrophe ("dont") share a key with the usual spelling
+_NEGATION = re.compile(r"\b(don|won|can|shouldn|isn|didn)'?t\b")
+
+
+def normalize_text(text: str) -> str:
+    """Cache key for a cast: the text with everything that doesn't change its meaning removed
+
+    Lowercases, drops URLs, mentions, cashtag signs, emoji and sentence punctuation, writes
+    numbers in one form ("1,000.50" -> "1000.5", ".5" -> "0.5") and collapses whitespace,
+    so reposts and light edits of the same instruction share a key. Math and currency
+    symbols ("+", "<", "=", "$"), question marks and negations are kept, since texts
+    differing in them mean different things.
+    """
+    text = unicodedata.normalize("NFKC", text).lower()
+    text = _APOSTROPHES.sub("'", text)
+    text = _NEGATION.sub(r"\1't", text)
+    text = _URL.sub(" ", text)
+    text = _MENTION.sub(" ", text)
+    text = _NUMBER.sub(_canonical_number, text)
+    text = "".join(" " if _ignored(text, i) else ch for i, ch in enumerate(text))
+    text = _CASHTAG.sub("", text)
+    text = _SPACE.sub(" ", text).strip()
+    return text.strip(" !.")
+
+
+def _ignored(text: str, i: int) -> bool:
+    """Emoji, invisible formatting and punctuation that doesn't change what a cast asks for"""
+    ch = text[i]
+    category = unicodedata.category(ch)
+    if category in ("So", "Sk") or category[0] == "C" or ch in _EMOJI_MARKS:
+        return True
+    if category[0] != "P" or ch in _KEEP_PUNCTUATION:
+        return False
+    if ch == ".":
+        # Decimal points and symbols like "usdc.e"
+        return not (0 < i < len(text) - 1 and text[i - 1].isalnum() and text[i + 1].isalnum())
+    return True
+
+
+def _canonical_number(match: re.Match) -> str:
+    raw = match.group(1).replace(",", "")
+    try:
+        value = Decimal(raw).normalize()
+    except InvalidOperation:
+        return match.group(1)
+    return format(value, "f")
+
+
+class IntentCache:
+    """LRU cache with TTL from normalized cast text to the intent derived for it
+
+    Only the interpretation is cached: the executor still checks limits and
+    balances for every trade, and the webhook dedup still drops redelivered
+    casts, so a cached intent never bypasses either.
+    """
+
+    def __init__(self, max_items: int = 1000, ttl: float = 3600.0):
+        """Initialize the cache
+
+        Args:
+            max_items: Entries kept before the least recently used is evicted
+            ttl: Seconds an entry stays valid
+        """
+        self.max_items = max_items
+        self.ttl = ttl
+        # key -> (intent, stored at, seconds it took to derive)
+        self._entries: "OrderedDict[str, Tuple[TradeIntent, float, float]]" = OrderedDict()
+
+        # Counters
+        self.hits = 0
+        self.misses = 0
+        self.saved_seconds = 0.0
+
+    def get(self, text: str) -> Optional[TradeIntent]:
+        """Cached intent for a cast, or None"""
+        key = normalize_text(text)
+        entry = self._entries.get(key)
+        if entry is None or time.monotonic() - entry[1] > self.ttl:
+            if entry is not None:
+                del self._entries[key]
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        self.saved_seconds += entry[2]
+        return entry[0]
+
+    def put(self, text: str, intent: TradeIntent, cost: float = 0.0):
+        """Remember the intent derived for a cast
+
+        Args:
+            text: Raw cast text
+            intent: Intent derived for it
+            cost: Seconds it took to derive (reported as saved on later hits)
+        """
+        key = normalize_text(text)
+        self._entries[key] = (intent, time.monotonic(), cost)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_items:
+            self._entries.popitem(last=False)
+
+    @property
+    def hit_rate(self) -> float:
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def get_stats(self) -> Dict[str, float]:
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hit_rate,
+            "saved_seconds": self.saved_seconds,
+        }
@@ -0,0 +1,177 @@
+#!/usr/bin/env python3
+import re
+from typing import Dict, NamedTuple, Optional
+
+# Symbols people write in casts, mapped to the token we actually trade
+DEFAULT_ALIASES = {
+    'ETH': 'WETH',
+    'BTC': 'WBTC',
+    'MATIC': 'WMATIC',
+    'POL': 'WMATIC',
+    'ETHEREUM': 'WETH',
+    'BITCOIN': 'WBTC',
+}
+
+# Words that denominate an amount in (native) USDC
+USD_WORDS = ('usd', 'usdc', 'dollar', 'dollars', 'bucks')
+
+SIDES = {
+    'buy': 'buy', 'long': 'buy', 'ape': 'buy', 'ape into': 'buy', 'purchase': 'buy',
+    'sell': 'sell', 'short': 'sell', 'dump': 'sell', 'exit': 'sell',
+}
+
+# Any of these makes the instruction ambiguous enough to leave it to the agent
+NEGATIONS = re.compile(r"\b(?:don'?t|do not|never|not|no|shouldn'?t|won'?t|if|maybe|should i|would you)\b|\?")
+
+AMOUNT = r"(?P<amount>\d+(?:\.\d+)?|\.\d+)"
+
+
+class TradeIntent(NamedTuple):
+    """Structured trade instruction extracted from a cast
+
+    side is None when the cast has no trading intent. unit is the token the
+    amount is denominated in, "all" to trade the whole balance, "%" for a
+    share of the balance, or None when no amount was given.
+    """
+    side: Optional[str]
+    token: Optional[str]
+    amount: Optional[float]
+    unit: Optional[str]
+    confidence: float
+
+
+NO_TRADE = TradeIntent(None, None, None, None, 0.95)
+
+
+class IntentParser:
+    """Deterministic trade-intent extractor for formulaic casts
+
+    Commands like "buy 0.5 USDC of ETH" or "sell all WBTC" are matched by a
+    small set of compiled patterns. Anything the patterns can't read with
+    certainty gets a low confidence so the caller can fall back to the agent.
+    """
+
+    def __init__(self, tokens: Dict[str, str], aliases: Optional[Dict[str, str]] = None):
+        """Initialize the parser
+
+        Args:
+            tokens: Tradable token symbols (e.g. TOKEN_ADDRESSES)
+            aliases: Extra symbol aliases, merged over DEFAULT_ALIASES
+        """
+        self.symbols = {}
+        for symbol in tokens:
+            self.symbols[symbol.lower()] = symbol
+        for alias, symbol in {**DEFAULT_ALIASES, **(aliases or {})}.items():
+            if symbol in tokens:
+                self.symbols[alias.lower()] = symbol
+
+        # Longest symbols first so "usdc.e" wins over "usdc"
+        names = sorted(self.symbols, key=len, reverse=True)
+        token = "|".join(re.escape(name) for name in names)
+        unit = "|".join(re.escape(name) for name in sorted(set(names) | set(USD_WORDS), key=len, reverse=True))
+        side = "|".join(sorted(SIDES, key=len, reverse=True))
+
+        # A symbol ends at a non-word character, but "usdc" must not match the start of "usdc.e"
+        end = r"(?!\w|\.\w)"
+        self._side_word = re.compile(rf"\b(?:{side})\b")
+        self._token_word = re.compile(rf"(?<![\w.])\$?(?:{token}){end}")
+
+        side = rf"(?<!\w)(?P<side>{side})"
+        tok = rf"\$?(?P<token>{token}){end}"
+        unit = rf"(?P<unit>{unit}){end}"
+        my = r"(?:(?:of )?(?:my|our) )?"
+
+        # (pattern, default unit) - a None default means the unit group is used
+        templates = [
+            # buy 0.5 usdc of eth / buy 0.5 usdc worth of eth
+            (rf"{side} \$?{AMOUNT} ?{unit} (?:worth )?(?:of|in|into) {tok}", None),
+            # buy $5 of eth / buy $5 worth of eth / buy $5 eth
+            (rf"{side} \${AMOUNT} (?:(?:worth )?(?:of|in|into) )?{tok}", 'USDC'),
+            # buy eth with 0.5 usdc / sell eth for 1 usdc
+            (rf"{side} {tok} (?:with|for|using) \$?{AMOUNT} ?{unit}", None),
+            # sell 0.001 wbtc for usdc
+            (rf"{side} {AMOUNT} ?{tok} (?:for|to|into) \$?(?:usdc|usd){end}", 'token'),
+            # sell 0.001 wbtc
+            (rf"{side} {AMOUNT} ?{tok}", 'token'),
+            # sell all my wbtc / sell everything in eth
+            (rf"{side} (?:all|everything)(?: (?:of|in))? {my}{tok}", 'all'),
+            # sell 50% of my eth
+            (rf"{side} {AMOUNT} ?% (?:of )?{my}{tok}", '%'),
+            # buy eth / buy some eth
+            (rf"{side} (?:some )?{tok}", None),
+        ]
+        self._patterns = [(re.compile(pattern), default) for pattern, default in templates]
+
+    def normalize(self, text: str) -> str:
+        """Lowercase, drop mentions and thousands separators, collapse whitespace"""
+        text = text.lower()
+        text = re.sub(r"(?<!\w)@[\w.-]+", " ", text)
+        text = re.sub(r"(?<=\d),(?=\d{3}\b)", "", text)
+        text = re.sub(r"\s+", " ", text).strip()
+        return text.strip(" !.")
+
+    def parse(self, text: str) -> TradeIntent:
+        """Extract a trade intent from cast text
+
+        Args:
+            text: Raw cast text
+
+        Returns:
+            The intent with a confidence between 0 and 1
+        """
+        text = self.normalize(text)
+
+        has_side = self._side_word.search(text) is not None
+        has_token = self._token_word.search(text) is not None
+        if not has_side and not has_token:
+            return NO_TRADE
+        if not has_side or not has_token:
+            # Opinion about a token, or a command without a token: needs the agent
+            return TradeIntent(None, None, None, None, 0.2)
+
+        intent = self._match(text)
+        if intent is None:
+            return TradeIntent(None, None, None, None, 0.2)
+
+        if NEGATIONS.search(text):
+            intent = intent._replace(confidence=min(intent.confidence, 0.3))
+        elif len(self._side_word.findall(text)) > 1 or len(self._token_word.findall(text)) > 2:
+            # Several commands in one cast
+            intent = intent._replace(confidence=min(intent.confidence, 0.4))
+        return intent
+
+    def _match(self, text: str) -> Optional[TradeIntent]:
+        # The whole cast is a command
+        for pattern, default_unit in self._patterns:
+            match = pattern.fullmatch(text)
+            if match:
+                return self._build(match, default_unit, 1.0)
+        # The command is embedded in a longer message
+        for pattern, default_unit in self._patterns:
+            match = pattern.search(text)
+            if match:
+                return self._build(match, default_unit, 0.6)
+        return None
+
+    def _build(self, match: re.Match, default_unit: Optional[str], confidence: float) -> TradeIntent:
+        groups = match.groupdict()
+        side = SIDES[groups['side']]
+        token = self.symbols[groups['token']]
+        amount = float(groups['amount']) if groups.get('amount') else None
+
+        if default_unit == 'token':
+            unit = token
+        elif default_unit is not None:
+            unit = default_unit
+        elif groups.get('unit'):
+            unit = 'USDC' if groups['unit'] in USD_WORDS else self.symbols[groups['unit']]
+        else:
+            # No amount given: the size has to be decided elsewhere
+            unit = None
+            confidence = min(confidence, 0.7)
+
+        if token == unit and default_unit != 'token':
+            # "buy 1 usdc of usdc" and similar nonsense
+            confidence = min(confidence, 0.3)
+
+        return TradeIntent(side, token, amount, unit, confidence)
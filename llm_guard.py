@@ -0,0 +1,287 @@
+#!/usr/bin/env python3
+"""Deadlines, hedging and a circuit breaker around model calls
+
+A slow model endpoint makes every signal wait, and by the time the
+answer comes the trade is stale. LatencyGuard bounds each call:
+
+- a deadline (usually the event's expiry): the call is cancelled when it
+  passes and DeadlineExceeded is raised; it only counts against the
+  model if the call had run for longer than the slow threshold
+- an optional hedge: if the primary call hasn't answered after the p95 of
+  its recent latencies, the same request goes to a second (faster) model
+  and the first answer wins; only for calls without side effects
+- a circuit breaker: after `failures` consecutive slow or failed calls it
+  opens and calls fail fast with CircuitOpen for `reset_after` seconds,
+  then a single probe call decides whether it closes again
+
+Callers treat LLMUnavailable as the signal to degrade (e.g. trade only on
+what the deterministic parser can read).
+"""
+import time
+import asyncio
+import logging
+from collections import deque
+from typing import Any, Awaitable, Callable, Deque, Dict, Optional, TypeVar
+
+logger = logging.getLogger("llm-guard")
+
+T = TypeVar("T")
+
+# Breaker state values of the llm_breaker_state gauge
+BREAKER_STATES = {"closed": 0, "half_open": 1, "open": 2}
+
+
+class LLMUnavailable(Exception):
+    """The model didn't answer (in time), callers should degrade"""
+
+
+class CircuitOpen(LLMUnavailable):
+    """The breaker is open, the call wasn't made"""
+
+
+class DeadlineExceeded(LLMUnavailable):
+    """The deadline passed before the model answered"""
+
+
+class CircuitBreaker:
+    """Opens after consecutive failures, lets one probe through after `reset_after` seconds"""
+
+    def __init__(self, failures: int = 3, reset_after: float = 30.0, metrics: Any = None):
+        """Initialize the breaker
+
+        Args:
+            failures: Consecutive slow or failed calls that open the breaker
+            reset_after: Seconds the breaker stays open before a probe call is allowed
+            metrics: Optional Metrics registry for the state gauge and trip counter
+        """
+        self.failures = failures
+        self.reset_after = reset_after
+        self.metrics = metrics
+        self.consecutive_failures = 0
+        self.trips = 0
+        self._opened_at: Optional[float] = None
+        self._probing = False
+
+        if metrics is not None:
+            metrics.gauge("llm_breaker_state", lambda: BREAKER_STATES[self.state],
+                          "Model circuit breaker: 0 closed, 1 half-open, 2 open")
+            metrics.describe("llm_breaker_trips_total", "Times the model circuit breaker opened")
+
+    @property
+    def state(self) -> str:
+        if self._opened_at is None:
+            return "closed"
+        if time.monotonic() - self._opened_at >= self.reset_after:
+            return "half_open"
+        return "open"
+
+    def allow(self) -> bool:
+        """Whether a call may be made now (in half-open state, only one probe at a time)"""
+        state = self.state
+        if state == "closed":
+            return True
+        if state == "half_open" and not self._probing:
+            self._probing = True
+            return True
+        return False
+
+    def release(self):
+        """Give back an allowed call that wasn't made"""
+        self._probing = False
+
+    def success(self):
+        if self._opened_at is not None:
+            logger.info("Model circuit breaker closed")
+        self.consecutive_failures = 0
+        self._opened_at = None
+        self._probing = False
+
+    def failure(self):
+        self.consecutive_failures += 1
+        if self._probing or (self._opened_at is None and self.consecutive_failures >= self.failures):
+            self._trip()
+        self._probing = False
+
+    def _trip(self):
+        self._opened_at = time.monotonic()
+        self.trips += 1
+        if self.metrics is not None:
+            self.metrics.inc("llm_breaker_trips_total")
+        logger.warning(f"Model circuit breaker open after {self.consecutive_failures} slow or failed calls, "
+                       f"retrying in {self.reset_after:.0f}s")
+
+
+class LatencyGuard:
+    """Runs model calls under a deadline, with optional hedging and a shared circuit breaker"""
+
+    def __init__(self,
+                 breaker: Optional[CircuitBreaker] = None,
+                 slow_after: float = 10.0,
+                 hedge_quantile: float = 0.95,
+                 min_hedge_delay: float = 0.5,
+                 default_hedge_delay: float = 3.0,
+                 window: int = 200,
+                 metrics: Any = None):
+        """Initialize the guard
+
+        Args:
+            breaker: Circuit breaker shared by all calls to the endpoint (default: 3 failures, 30s)
+            slow_after: Calls taking longer than this count as failures for the breaker
+            hedge_quantile: Latency quantile of the primary after which the hedge is sent
+            min_hedge_delay: Lower bound of the hedge delay
+            default_hedge_delay: Hedge delay until 20 latencies have been seen
+            window: Recent latencies kept per call name
+            metrics: Optional Metrics registry
+        """
+        self.breaker = breaker or CircuitBreaker(metrics=metrics)
+        self.slow_after = slow_after
+        self.hedge_quantile = hedge_quantile
+        self.min_hedge_delay = min_hedge_delay
+        self.default_hedge_delay = default_hedge_delay
+        self.window = window
+        self.metrics = metrics
+        self._latencies: Dict[str, Deque[float]] = {}
+
+        # Counters
+        self.calls = 0
+        self.timeouts = 0
+        self.expired = 0
+        self.rejected = 0
+        self.hedges = 0
+        self.hedge_wins = 0
+
+        if metrics is not None:
+            metrics.describe("llm_calls_total", "Model calls by name and outcome")
+            metrics.describe("llm_call_seconds", "Model call latency, by name and the model that answered")
+            metrics.describe("llm_hedges_total", "Hedged requests sent to the second model")
+            metrics.describe("llm_hedge_wins_total", "Hedged requests that answered first")
+            metrics.gauge("llm_hedge_win_rate", lambda: self.hedge_wins / self.hedges if self.hedges else 0.0,
+                          "Share of hedged requests that answered before the primary")
+
+    def available(self) -> bool:
+        """False while the breaker is open (a call would fail fast)"""
+        return self.breaker.state != "open"
+
+    def hedge_delay(self, name: str) -> float:
+        """Seconds to wait for the primary before hedging: its recent p95 latency"""
+        latencies = self._latencies.get(name)
+        if not latencies or len(latencies) < 20:
+            return self.default_hedge_delay
+        ordered = sorted(latencies)
+        index = min(len(ordered) - 1, int(self.hedge_quantile * len(ordered)))
+        return max(self.min_hedge_delay, ordered[index])
+
+    async def call(self, primary: Callable[[], Awaitable[T]], hedge: Optional[Callable[[], Awaitable[T]]] = None,
+                   deadline: Optional[float] = None, name: str = "llm", slow_after: Optional[float] = None) -> T:
+        """Run `primary()` under the deadline, hedging with `hedge()` if it is slow
+
+        Args:
+            primary: Coroutine function making the model call
+            hedge: Coroutine function making the same call to another model; only pass one for
+                calls without side effects, since both may run to completion
+            deadline: Epoch seconds by which the answer is needed (None: no deadline)
+            name: Call name for latency tracking and metrics
+            slow_after: Slow threshold for this call (default: the guard's)
+
+        Raises:
+            CircuitOpen: The breaker is open
+            DeadlineExceeded: The deadline passed (also if it already had)
+            Exception: Whatever the call raised, if the hedge didn't answer either
+        """
+        timeout = deadline - time.time() if deadline is not None else None
+        if timeout is not None and timeout <= 0:
+            self._count(name, "expired")
+            raise DeadlineExceeded(f"{name}: deadline passed {-timeout:.1f}s ago")
+        if not self.breaker.allow():
+            self.rejected += 1
+            self._count(name, "breaker_open")
+            raise CircuitOpen(f"{name}: model circuit breaker is open")
+
+        self.calls += 1
+        start = time.monotonic()
+        end = start + timeout if timeout is not None else None
+        hedge_at = start + self.hedge_delay(name) if hedge is not None else None
+        tasks = {asyncio.ensure_future(primary()): "primary"}
+        error: Optional[BaseException] = None
+        try:
+            while tasks:
+                now = time.monotonic()
+                wake = min((t for t in (end, hedge_at) if t is not None), default=None)
+                done, _ = await asyncio.wait(tasks, timeout=max(0.0, wake - now) if wake is not None else None,
+                                             return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    model = tasks.pop(task)
+                    if task.exception() is not None:
+                        error = task.exception()
+                        logger.warning(f"{name}: {model} model call failed: {error}")
+                        continue
+                    self._answered(name, model, time.monotonic() - start,
+                                   slow_after if slow_after is not None else self.slow_after)
+                    return task.result()
+                now = time.monotonic()
+                if end is not None and now >= end:
+                    break
+                # Hedge once the primary is slow, or right away if it failed
+                if hedge_at is not None and (now >= hedge_at or not tasks):
+                    hedge_at = None
+                    self.hedges += 1
+                    if self.metrics is not None:
+                        self.metrics.inc("llm_hedges_total", {"name": name})
+                    tasks[asyncio.ensure_future(hedge())] = "hedge"
+        except asyncio.CancelledError:
+            self.breaker.release()
+            raise
+        finally:
+            for task in tasks:
+                task.cancel()
+                # Retrieve the outcome so cancelled calls don't log "exception never retrieved"
+                task.add_done_callback(lambda t: t.cancelled() or t.exception())
+
+        elapsed = time.monotonic() - start
+        if error is not None and (end is None or elapsed < timeout):
+            self.breaker.failure()
+            self._count(name, "error")
+            raise error
+        if error is None and elapsed < (slow_after if slow_after is not None else self.slow_after):
+            # The event ran out of time before the model could be called slow (it arrived late or
+            # waited in the scheduler): no verdict on the model, the breaker isn't touched
+            self.breaker.release()
+            self.expired += 1
+            self._count(name, "expired")
+            raise DeadlineExceeded(f"{name}: deadline passed after {elapsed:.2f}s")
+        self.breaker.failure()
+        self.timeouts += 1
+        self._count(name, "timeout")
+        raise DeadlineExceeded(f"{name}: no answer within {timeout:.2f}s")
+
+    def _answered(self, name: str, model: str, elapsed: float, slow_after: float):
+        if model == "primary":
+            self._latencies.setdefault(name, deque(maxlen=self.window)).append(elapsed)
+        else:
+            self.hedge_wins += 1
+            if self.metrics is not None:
+                self.metrics.inc("llm_hedge_wins_total", {"name": name})
+        if elapsed > slow_after:
+            self.breaker.failure()
+        else:
+            self.breaker.success()
+        self._count(name, "ok")
+        if self.metrics is not None:
+            self.metrics.observe("llm_call_seconds", elapsed, {"name": name, "model": model})
+
+    def _count(self, name: str, outcome: str):
+        if self.metrics is not None:
+            self.metrics.inc("llm_calls_total", {"name": name, "outcome": outcome})
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "breaker": self.breaker.state,
+            "breaker_trips": self.breaker.trips,
+            "calls": self.calls,
+            "timeouts": self.timeouts,
+            "expired": self.expired,
+            "rejected": self.rejected,
+            "hedges": self.hedges,
+            "hedge_wins": self.hedge_wins,
+            "hedge_win_rate": self.hedge_wins / self.hedges if self.hedges else 0.0,
+        }
@@ -0,0 +1,193 @@
+#!/usr/bin/env python3
+"""Agent prompts split into a cached prefix and a per-cast suffix
+
+Everything that is the same for every cast (trading rules, the USDC.e
+ban, the token table) goes into one system prompt prefix, marked for
+Anthropic prompt caching; each cast only adds a short user message:
+
+    builder = PromptBuilder(RULES, token_registry, trade_limit=1.0)
+    system = builder.system_blocks()     # cache_control on the prefix
+    message = builder.analysis(text)     # ~100 bytes instead of ~1.5 KB
+    stats = builder.record(message, usage=response.usage)
+
+The prefix only changes when the registry does (a token added or its
+decimals resolved), so after the first call each one reads it from the
+cache at a tenth of the input price. Anthropic only caches prefixes
+above a minimum size (1024 tokens for Sonnet, counting the tool
+definitions in front of the system prompt) and keeps them for 5 minutes
+after the last hit. Without the API usage, cache hits are estimated
+from both rules.
+"""
+import time
+import hashlib
+from typing import Any, Dict, List, Optional
+
+# How long Anthropic keeps a cached prefix after its last use
+CACHE_TTL_SECONDS = 300
+
+# Shortest prefix Anthropic caches, tool definitions included (Sonnet and Opus; 2048 for Haiku).
+# A shorter prefix marked with cache_control is billed as plain input on every call
+MIN_CACHEABLE_TOKENS = 1024
+
+# Rough bytes per token of English prompt text, for estimates when the API reports no usage
+BYTES_PER_TOKEN = 4
+
+
+def estimate_tokens(text: str) -> int:
+    return (len(text.encode("utf-8")) + BYTES_PER_TOKEN - 1) // BYTES_PER_TOKEN
+
+
+def _usage_field(usage: Any, name: str) -> int:
+    value = usage.get(name) if isinstance(usage, dict) else getattr(usage, name, None)
+    return value or 0
+
+
+class PromptBuilder:
+    """Builds the cached system prefix and per-cast messages, and counts prompt sizes and cache hits"""
+
+    def __init__(self, rules: str, registry: Any, trade_limit: float, cache_ttl: float = CACHE_TTL_SECONDS,
+                 min_cache_tokens: int = MIN_CACHEABLE_TOKENS, tool_tokens: int = 0):
+        """Initialize the builder
+
+        Args:
+            rules: Static trading rules (the agent instruction)
+            registry: TokenRegistry whose full table goes into the prefix
+            trade_limit: Largest trade in USDC
+            cache_ttl: Seconds a prefix stays cached after its last use
+            min_cache_tokens: Shortest prefix the model caches
+            tool_tokens: Tokens of the tool definitions sent in front of the prefix
+        """
+        self.rules = rules.strip()
+        self.registry = registry
+        self.trade_limit = trade_limit
+        self.cache_ttl = cache_ttl
+        self.min_cache_tokens = min_cache_tokens
+        self.tool_tokens = tool_tokens
+        self._prefix = None
+        self._prefix_key = None
+        self._fingerprint = None
+        self._last_used: Dict[str, float] = {}
+
+        # Counters
+        self.calls = 0
+        self.prefix_bytes = 0
+        self.suffix_bytes = 0
+        self.input_tokens = 0
+        self.cache_read_tokens = 0
+        self.cache_write_tokens = 0
+        self.cache_hits = 0
+        self.measured_calls = 0
+
+    def prefix(self) -> str:
+        """System prompt shared by every cast, rebuilt only when the registry changes"""
+        key = tuple(self.registry.tokens.values())
+        if key != self._prefix_key:
+            usdc = self.registry.get('USDC')
+            ban = f" ({usdc.address})" if usdc else ""
+            tokens = sorted(self.registry.tokens.values(), key=lambda token: token.symbol)
+            self._prefix = f"""{self.rules}
+
+Trade limit: {self.trade_limit} USDC per trade. Never execute a trade worth more.
+STRICTLY PROHIBITED from using USDC.e for any transactions, always use only native USDC{ban}.
+
+Tokens (verified, do not look them up again; a name written as an alias means the wrapped token, e.g. ETH means WETH):
+{self.registry.prompt_table(tokens)}"""
+            self._prefix_key = key
+            self._fingerprint = hashlib.sha256(self._prefix.encode("utf-8")).hexdigest()[:12]
+        return self._prefix
+
+    def fingerprint(self) -> str:
+        """Short digest of the prefix; calls with the same fingerprint can share the cache"""
+        self.prefix()
+        return self._fingerprint
+
+    def cacheable(self) -> bool:
+        """Whether the prefix (with the tool definitions) is long enough to be cached"""
+        return self.tool_tokens + estimate_tokens(self.prefix()) >= self.min_cache_tokens
+
+    def system_blocks(self) -> List[Dict[str, Any]]:
+        """The prefix as Anthropic system content blocks, marked for prompt caching"""
+        return [{"type": "text", "text": self.prefix(), "cache_control": {"type": "ephemeral"}}]
+
+    def analysis(self, text: str) -> str:
+        """Message asking the agent to analyze a cast and decide on a trade"""
+        return f"Analyze this Farcaster message and decide whether to execute a trade: '{text}'"
+
+    def execution(self, intent: Any) -> str:
+        """Message asking the agent to execute an already parsed trade, skipping analysis"""
+        if intent.unit == 'all':
+            size = f"the entire {intent.token} balance"
+        elif intent.unit == '%':
+            size = f"{intent.amount}% of the {intent.token} balance"
+        else:
+            size = f"{intent.amount} {intent.unit}"
+        return f"Execute this trade without further analysis: {intent.side} {intent.token} against native USDC, size {size}."
+
+    def record(self, message: str, usage: Any = None, now: Optional[float] = None) -> Dict[str, Any]:
+        """Count one call and return its prompt size and cache result
+
+        Args:
+            message: The per-cast message sent with the prefix
+            usage: Anthropic usage of the response (object or dict) if available; without it
+                tokens are estimated from bytes, and a hit is a call within cache_ttl of the
+                last call with the same prefix, if the prefix is cacheable at all
+            now: Current time (for tests and replays)
+        """
+        now = now if now is not None else time.time()
+        prefix = self.prefix()
+        fingerprint = self.fingerprint()
+        prefix_bytes = len(prefix.encode("utf-8"))
+        suffix_bytes = len(message.encode("utf-8"))
+
+        if usage is not None:
+            cache_read = _usage_field(usage, "cache_read_input_tokens")
+            cache_write = _usage_field(usage, "cache_creation_input_tokens")
+            uncached = _usage_field(usage, "input_tokens")
+            self.measured_calls += 1
+            self._last_used[fingerprint] = now
+        elif not self.cacheable():
+            # Too short to be cached: the whole prompt is billed as input
+            cache_read = cache_write = 0
+            uncached = self.tool_tokens + estimate_tokens(prefix) + estimate_tokens(message)
+        else:
+            last_used = self._last_used.get(fingerprint)
+            prefix_tokens = self.tool_tokens + estimate_tokens(prefix)
+            if last_used is not None and now - last_used <= self.cache_ttl:
+                cache_read, cache_write = prefix_tokens, 0
+            else:
+                cache_read, cache_write = 0, prefix_tokens
+            uncached = estimate_tokens(message)
+            self._last_used[fingerprint] = now
+
+        hit = cache_read > 0
+        self.calls += 1
+        self.prefix_bytes += prefix_bytes
+        self.suffix_bytes += suffix_bytes
+        self.input_tokens += uncached + cache_read + cache_write
+        self.cache_read_tokens += cache_read
+        self.cache_write_tokens += cache_write
+        self.cache_hits += hit
+        return {
+            "prefix": fingerprint,
+            "prompt_bytes": prefix_bytes + suffix_bytes,
+            "message_bytes": suffix_bytes,
+            "input_tokens": uncached + cache_read + cache_write,
+            "cache_read_tokens": cache_read,
+            "cache_write_tokens": cache_write,
+            "cache_hit": hit,
+            "estimated": usage is None,
+        }
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "calls": self.calls,
+            "prefix_bytes": self.prefix_bytes,
+            "message_bytes": self.suffix_bytes,
+            "message_bytes_per_call": self.suffix_bytes / self.calls if self.calls else 0.0,
+            "input_tokens": self.input_tokens,
+            "cache_read_tokens": self.cache_read_tokens,
+            "cache_write_tokens": self.cache_write_tokens,
+            "cache_hit_rate": self.cache_hits / self.calls if self.calls else 0.0,
+            "cached_token_share": self.cache_read_tokens / self.input_tokens if self.input_tokens else 0.0,
+            "measured_calls": self.measured_calls,
+        }
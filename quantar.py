@@ -1,27 +1,143 @@
 #!/usr/bin/env python3
 import os
+import time
 import asyncio
 import sys
 import json
+import logging
+import contextlib
 from dotenv import load_dotenv
 from mcp_agent.core.fastagent import FastAgent
+from mcp_agent.core.request_params import RequestParams
 
-# Add webhook-sdk to Python path
+# Add webhook-sdk and farcaster_monitor to Python path
 sys.path.append(os.path.join(os.path.dirname(__file__), 'webhook-sdk'))
+sys.path.append(os.path.join(os.path.dirname(__file__), 'farcaster_monitor'))
 from webhook_server import WebhookServer
+from event_bus import EventBus
+from signal_sources import WebhookSource, PollingSource, NewsFileSource, ReplaySource
+from poller import CastPoller
+from dedup_store import SQLiteDedupStore
+from prefilter import EventPrefilter
+from metrics import METRICS, current_trace
+from event_log import log_event, setup_logging
+from recorder import WebhookRecorder
+from keyed_scheduler import KeyedScheduler
+from event_priority import EventPriority
+from identity_index import IdentityIndex
+from neynar_client import AsyncNeynarClient
+from session_pool import SessionPool
+from intent_parser import IntentParser
+from trade_executor import (TradeExecutor, TradeRejected, UnsupportedTrade, SwapUnconfirmed, ToolError,
+                            open_mcp_session)
+from token_registry import TokenRegistry
+from intent_batcher import IntentBatcher, llm_classifier
+from intent_cache import IntentCache
+from prompt_builder import PromptBuilder, estimate_tokens
+from quote_prefetcher import QuotePrefetcher
+from trade_ledger import TradeLedger, tx_hash
+from risk_engine import RiskEngine, RiskLimitExceeded
+from llm_guard import LatencyGuard, CircuitBreaker, LLMUnavailable, DeadlineExceeded
 
 # Load environment variables
 load_dotenv()
 
+# Per-event log lines go through a background thread to JSON lines in LOG_FILE (rotated, gzip-compressed);
+# only a sample of unauthorized casts is kept, every trade line is
+LOG_FILE = os.getenv('LOG_FILE', 'logs/quantar.jsonl')
+LOG_SAMPLE_RATES = {'rejected': 0.01, 'unauthorized': 0.1, 'duplicate': 0.1, 'trade': 1.0}
+logger = logging.getLogger("quantar")
+
 # Create Fast-Agent application
 fast = FastAgent("Farcaster Event Trader")
 
 # Define trading limit (in USDC)
 TRADE_LIMIT_USDC = 1.0
 
+# Webhook worker pool: casts are acknowledged immediately and processed by these workers
+WEBHOOK_WORKERS = 32
+WEBHOOK_QUEUE_SIZE = 100
+
+# Casts from one author run in order; different authors run concurrently, up to this many at once
+EXECUTION_CONCURRENCY = 4
+
+# Free execution slots go to the highest-priority cast: author weight (fid or username) plus keyword boosts
+AUTHOR_PRIORITIES = {'0xhardman': 10}
+KEYWORD_BOOSTS = {'now': 2, 'urgent': 2}
+# A signal older than this (since the cast was posted) is dropped instead of traded on
+MAX_SIGNAL_AGE_SECONDS = 30.0
+event_priority = EventPriority(authors=AUTHOR_PRIORITIES, keywords=KEYWORD_BOOSTS, max_age=MAX_SIGNAL_AGE_SECONDS)
+
+# Processed cast ids survive restarts, so redeliveries after a deploy don't re-trigger trades
+DEDUP_DB_PATH = 'processed_events.db'
+DEDUP_TTL_SECONDS = 24 * 3600
+
+# Set RECORD_WEBHOOKS=recordings/webhooks.jsonl.gz to keep raw webhook bodies for benchmarks/load_replay.py
+RECORD_WEBHOOKS = os.getenv('RECORD_WEBHOOKS')
+
+# Warm agent sessions (each one keeps a Polygon MCP server process alive)
+AGENT_POOL_SIZE = 2
+AGENT_MAX_USES = 50  # Recycle a session after this many casts
+
+# Model calls give up when the signal expires. After LLM_BREAKER_FAILURES consecutive calls
+# that failed or took over LLM_SLOW_SECONDS, the breaker opens for LLM_BREAKER_RESET_SECONDS
+# and casts that need the model are handled in LLM_DEGRADED_MODE:
+#   'parser': trade on intents the parser reads with at least DEGRADED_MIN_CONFIDENCE and an explicit
+#             amount and unit, skip the rest
+#   'skip':   skip them (fast path trades go on as usual)
+LLM_SLOW_SECONDS = 10.0
+LLM_AGENT_SLOW_SECONDS = 20.0  # Agent calls take several model turns (quote, approve, swap)
+LLM_BREAKER_FAILURES = 3
+LLM_BREAKER_RESET_SECONDS = 30.0
+LLM_DEGRADED_MODE = os.getenv('LLM_DEGRADED_MODE', 'parser')
+# Optional faster model (e.g. HEDGE_MODEL=haiku) that batch classification is also sent to
+# when the primary model takes longer than its recent p95; first answer wins. Agent calls
+# using tools are never hedged, both models could execute the trade.
+HEDGE_MODEL = os.getenv('HEDGE_MODEL')
+llm_guard = LatencyGuard(CircuitBreaker(LLM_BREAKER_FAILURES, LLM_BREAKER_RESET_SECONDS, metrics=METRICS),
+                         slow_after=LLM_SLOW_SECONDS, metrics=METRICS)
+METRICS.describe("llm_degraded_total", "Casts handled in degraded mode because the model was unavailable")
+
+# Every trade decision (intent, outcome, tx hash, stage timings) is appended to a SQLite ledger,
+# written in batches; `python trade_ledger.py` shows recent activity
+TRADE_LEDGER_PATH = 'trades.db'
+trade_ledger = TradeLedger(TRADE_LEDGER_PATH)
+
+# Risk limits, checked in process before any model or chain call: TRADE_LIMIT_USDC per trade,
+# notional of all trades and of trades on one author's casts within a rolling window (None: no limit).
+# Agent calls count as a trade of TRADE_LIMIT_USDC unless the response has no tx hash.
+RISK_WINDOW_SECONDS = 24 * 3600
+RISK_WINDOW_LIMIT_USDC = 10.0
+RISK_AUTHOR_LIMIT_USDC = 5.0
+risk_engine = RiskEngine(TRADE_LIMIT_USDC, RISK_WINDOW_LIMIT_USDC, RISK_AUTHOR_LIMIT_USDC,
+                         window=RISK_WINDOW_SECONDS, metrics=METRICS)
+
 # Define authorized trading users
 AUTHORIZED_USERS = ['0xhardman']
 
+# Signals from every source go through one event bus, which drops a cast or news story already
+# seen from another source before it reaches the scheduler. Sources besides the Neynar webhook:
+#   POLL_CASTS=1                  poll the authorized users' casts, a backup for missed webhooks
+#   NEWS_FILES=news.jsonl,feed.xml  local news files (JSON, JSON lines, RSS/Atom), read as they change
+#   REPLAY_FILE=recordings/webhooks.jsonl.gz  replay recorded webhooks (REPLAY_SPEED=0: as fast as possible)
+# News items are only traded on for sources listed in AUTHORIZED_SOURCES (e.g. "news:feed")
+POLL_CASTS = os.getenv('POLL_CASTS') == '1'
+POLL_STATE_PATH = 'poll_state.json'
+NEWS_FILES = [path for path in os.getenv('NEWS_FILES', '').split(',') if path]
+REPLAY_FILE = os.getenv('REPLAY_FILE')
+REPLAY_SPEED = float(os.getenv('REPLAY_SPEED', '1'))
+AUTHORIZED_SOURCES = {name for name in os.getenv('AUTHORIZED_SOURCES', '').split(',') if name}
+BUS_QUEUE_SIZE = 10000
+
+# Username <-> fid index cached on disk: authorized usernames are resolved to fids once,
+# then casts are authorized by fid (usernames can be changed or re-registered)
+IDENTITY_INDEX_PATH = 'identity_index.json'
+IDENTITY_REFRESH_SECONDS = 600
+identity_index = IdentityIndex(IDENTITY_INDEX_PATH)
+authorized_fids = set()
+# Authorized users whose fid couldn't be resolved yet, matched by username
+unresolved_users = set(AUTHORIZED_USERS)
+
 # Define common token addresses
 TOKEN_ADDRESSES = {
     'USDC': '0x3c499c542cEF5E3811e1192ce70d8cC03d5c3359',  # Native USDC
@@ -33,16 +149,59 @@ TOKEN_ADDRESSES = {
     'WMATIC': '0x0d500B1d8E8eF31E21C99d1Db9A6444d3ADf1270'
 }
 
-# Define agent using Polygon MCP server
+# Known token decimals; tokens missing here are looked up once at startup and cached
+TOKEN_DECIMALS = {
+    'USDC': 6,
+    'WETH': 18,
+    'WBTC': 8,
+    'MATIC': 18,
+    'WMATIC': 18,
+}
 
+# Token metadata (addresses, decimals, aliases) cached on disk, so prompts and the
+# executor never need to look up decimals per trade
+TOKEN_REGISTRY_PATH = 'token_registry.json'
+token_registry = TokenRegistry.load_or_build(TOKEN_REGISTRY_PATH, TOKEN_ADDRESSES, TOKEN_DECIMALS)
 
-@fast.agent(
-    instruction="""You are an AI assistant specialized in analyzing Farcaster messages and executing cryptocurrency trades.
+# Quotes and router allowances for USDC <-> PREFETCH_TOKENS at the trade size are kept warm
+# over a dedicated Polygon MCP session, and refreshed for the tokens a cast mentions as soon as
+# it arrives, while its intent is worked out. The executor uses quotes up to QUOTE_TTL_SECONDS
+# old instead of fetching them after the decision. PREFETCH_QUOTES=0 turns this off.
+PREFETCH_QUOTES = os.getenv('PREFETCH_QUOTES', '1') != '0'
+PREFETCH_TOKENS = ['WETH', 'WBTC', 'WMATIC']
+QUOTE_TTL_SECONDS = 15.0
+QUOTE_REFRESH_SECONDS = 10.0
+market = None  # QuotePrefetcher, started in main()
+
+# Formulaic casts ("buy 0.5 USDC of ETH") are parsed without the LLM;
+# anything below this confidence goes through full agent analysis
+FAST_PATH_MIN_CONFIDENCE = 0.9
+# Without the model, no lower bar than the fast path: commands embedded in longer text (0.6) go to the agent normally
+DEGRADED_MIN_CONFIDENCE = FAST_PATH_MIN_CONFIDENCE
+intent_parser = IntentParser(TOKEN_ADDRESSES)
+
+# Model classification: casts the parser can't read are classified by the model into
+# structured intents, cached by text, and executed directly. LLM_BATCH_WINDOW is how long to
+# wait to classify a burst in one LLM call (default 0 = one call per cast, e.g. 0.25 to batch).
+# LLM_BATCH_WINDOW=off gives each such cast its own full agent analysis instead (uncached).
+_batch_window = os.getenv('LLM_BATCH_WINDOW') or '0'
+LLM_BATCH_WINDOW = None if _batch_window.lower() == 'off' else float(_batch_window)
+LLM_BATCH_MAX = 16
+
+# Classified intents are reused for reposts and light edits of the same text
+# (limits are still checked for every trade, dedup still drops redeliveries)
+INTENT_CACHE_SIZE = 1000
+INTENT_CACHE_TTL_SECONDS = 3600
+intent_cache = IntentCache(max_items=INTENT_CACHE_SIZE, ttl=INTENT_CACHE_TTL_SECONDS)
+
+# Static trading rules. They open the system prompt prefix shared by every cast (see
+# prompt_builder.py), followed by the trade limit, the USDC.e ban and the token table
+AGENT_RULES = """You are an AI assistant specialized in analyzing Farcaster messages and executing cryptocurrency trades.
 
 When you receive a Farcaster message, you need to:
 1. Analyze the message content to determine if it contains trading intent (buy/sell a token)
 2. If trading intent is detected, identify the trade type (buy/sell), token symbol, and amount (if specified)
-3. Execute the appropriate trading operation, ensuring the trade amount does not exceed 1 USDC
+3. Execute the appropriate trading operation, ensuring the trade amount does not exceed the trade limit
 4. Return the trade execution results
 
 Trading style:
@@ -52,18 +211,24 @@ Trading style:
 - Transparent: Clearly report all trading details
 
 Important notes:
-- STRICTLY PROHIBITED from using USDC.e for any transactions, always use only native USDC (0x3c499c542cEF5E3811e1192ce70d8cC03d5c3359)
-- Use token addresses defined in the TOKEN_ADDRESSES dictionary
+- Use the token addresses and decimals listed below; they are verified, do not look them up again
 - Only messages from authorized users will trigger trades
-- PAY ATTENTION TO TOKEN DECIMALS when calculating amounts:
-  * USDC: 6 decimals (1 USDC = 1,000,000 wei)
-  * WBTC: 8 decimals (1 WBTC = 100,000,000 wei)
-  * WETH/WMATIC: 18 decimals (1 token = 1,000,000,000,000,000,000 wei)
-- Always use get_token_decimals tool to verify token decimals before calculating amounts
+- PAY ATTENTION TO TOKEN DECIMALS when calculating amounts (e.g. USDC has 6 decimals: 1 USDC = 1,000,000 base units)
+- Only call get_token_decimals for a token whose decimals are not listed
+
+Always ensure trading safety and follow all restrictions."""
+prompt_builder = PromptBuilder(AGENT_RULES, token_registry, TRADE_LIMIT_USDC)
+
+# Define agent using Polygon MCP server
+
 
-Always ensure trading safety and follow all restrictions.""",
+@fast.agent(
+    # Agent calls replace it with the same prefix marked for prompt caching (agent_request_params)
+    instruction=prompt_builder.prefix(),
     # Use Polygon MCP server defined in fastagent.config.yaml
     servers=["polygon"],
+    # Sessions are reused across casts, so every cast starts a fresh conversation
+    use_history=False,
 )
 # Callback function to process Farcaster messages
 async def process_farcaster_event(event_data):
@@ -72,6 +237,9 @@ async def process_farcaster_event(event_data):
     Args:
         event_data: Neynar webhook event data
     """
+    # Stage trace started by the webhook server, or a fresh one when called directly
+    trace = current_trace() or METRICS.trace()
+
     if event_data.get('type') == 'cast.created':
         # Get cast data from data field
         cast_data = event_data.get('data', {})
@@ -81,68 +249,484 @@ async def process_farcaster_event(event_data):
         username = author.get('username', 'unknown')
 
         # Check if user is authorized
-        if username not in AUTHORIZED_USERS:
-            print(
-                f"Received message from unauthorized user @{username}, ignoring")
+        if not is_authorized(author):
+            log_event(logger, f"Received message from unauthorized user @{username}, ignoring",
+                      stage="authorized", category="unauthorized", fid=author.get('fid'))
+            trace.outcome = "unauthorized"
             return
+        trace.mark("authorized")
 
         # Get cast text
         text = cast_data.get('text', '')
-        print(f"\nReceived message from @{username}: {text}")
-
-        # Use Fast-Agent to analyze message and execute trade
-        async with fast.run() as agent:
-            # Send message to agent for analysis
-            prompt = f"""Analyze this Farcaster message and decide whether to execute a trade (limit {TRADE_LIMIT_USDC} USDC): '{text}'
-
-Notes:
-1. STRICTLY PROHIBITED from using USDC.e for any transactions, always use only native USDC (address: {TOKEN_ADDRESSES['USDC']})
-2. If trading BTC is needed, use WBTC (address: {TOKEN_ADDRESSES['WBTC']})
-3. If trading ETH is needed, use WETH (address: {TOKEN_ADDRESSES['WETH']})
-4. If trading MATIC is needed, use WMATIC (address: {TOKEN_ADDRESSES['WMATIC']})
-5. PAY ATTENTION TO TOKEN DECIMALS when calculating amounts:
-   - USDC uses 6 decimals (1 USDC = 1,000,000 wei)
-   - WBTC uses 8 decimals (1 WBTC = 100,000,000 wei)
-   - WETH uses 18 decimals (1 WETH = 1,000,000,000,000,000,000 wei)
-   - WMATIC uses 18 decimals (1 WMATIC = 1,000,000,000,000,000,000 wei)
-6. Always use get_token_decimals tool to verify token decimals before calculating amounts
-"""
-            response = await agent.send(prompt)
-
-            print(f"\nAgent response: {response}\n")
+        log_event(logger, f"Received message from @{username}: {text}", stage="authorized", category="trade")
+
+        # Every decision from here on goes to the trade ledger
+        author_id = author_key(author)
+        intent = source = reason = result = reservation = None
+        try:
+            deadline = event_priority.deadline(event_data)
+            intent = parsed = intent_parser.parse(text)
+            trace.mark("intent_parsed")
+            source = "fast path"
+            trusted = intent.confidence >= FAST_PATH_MIN_CONFIDENCE
+            if intent.side is not None or not trusted:
+                # Risk limits first: a cast over them costs microseconds, not a model or chain call
+                try:
+                    risk_engine.check(author_id, estimated_value(intent) if trusted else None)
+                except RiskLimitExceeded as e:
+                    reason = str(e)
+                    log_event(logger, f"Risk limit: {reason}, not trading", stage="intent_parsed", category="trade",
+                              outcome="risk_rejected", limit=e.limit)
+                    trace.outcome = "risk_rejected"
+                    return
+            if market is not None:
+                # Runs in the background, in parallel with classification
+                market.prefetch(text)
+            if not trusted:
+                # Reposts and light edits of a classified cast don't need the model (even while it is down)
+                cached = intent_cache.get(text)
+                if cached is not None:
+                    intent, source, trusted = cached, "cached", True
+                    trace.mark("intent_cached")
+                    stats = intent_cache.get_stats()
+                    log_event(logger, f"Intent cache hit: hit rate {stats['hit_rate']:.0%}, "
+                                      f"{stats['saved_seconds']:.1f}s of classification saved so far",
+                              stage="classified", category="trade")
+            if not trusted and not llm_guard.available():
+                # Don't queue casts behind a model that is down or too slow
+                intent = degrade(parsed, "circuit breaker open", trace)
+                if intent is None:
+                    return
+                source, trusted = "degraded parser", True
+            if not trusted and intent_batcher is not None:
+                # Let the model classify the cast (together with the rest of the burst when batching)
+                try:
+                    started = time.perf_counter()
+                    timeout = deadline - time.time() if deadline is not None else None
+                    intent = await asyncio.wait_for(intent_batcher.classify(text), timeout)
+                    trace.mark("llm_classified")
+                    source = "model classification"
+                    trusted = intent.confidence > 0
+                    if trusted:
+                        intent_cache.put(text, intent, time.perf_counter() - started)
+                except asyncio.TimeoutError:
+                    pass  # Past the deadline, dropped as expired below
+                except LLMUnavailable as e:
+                    intent = degrade(parsed, str(e), trace)
+                    if intent is None:
+                        return
+                    source, trusted = "degraded parser", True
+                except Exception as e:
+                    log_event(logger, f"Classification failed ({str(e)}), asking agent", logging.WARNING,
+                              stage="classified", category="trade")
+
+            # Classification can take seconds: don't spend gas or agent turns on a signal that went stale meanwhile
+            if event_priority.expired(event_data):
+                log_event(logger, f"Signal older than {MAX_SIGNAL_AGE_SECONDS:.0f}s, not trading on it",
+                          stage="classified", category="trade", outcome="expired")
+                METRICS.inc("events_expired_total", {"stage": "classified"})
+                trace.outcome = "expired"
+                return
+
+            if trusted:
+                if intent.side is None:
+                    log_event(logger, f"No trading intent detected ({source}), ignoring",
+                              stage="classified", category="trade", outcome="no_trade")
+                    trace.outcome = "no_trade"
+                    return
+                log_event(logger, f"Intent ({source}): {intent.side} {intent.token} amount={intent.amount} unit={intent.unit}",
+                          stage="classified", category="trade", side=intent.side, token=intent.token,
+                          amount=intent.amount, unit=intent.unit, source=source)
+                try:
+                    # Call the Polygon MCP tools directly, no further LLM turns
+                    result = await execute_intent(intent, trace, author_id)
+                    log_event(logger, f"Trade executed: {result}", stage="executed", category="trade", outcome="executed")
+                    trace.outcome = "executed"
+                    return
+                except TradeRejected as e:
+                    reason = str(e)
+                    outcome = "risk_rejected" if isinstance(e, RiskLimitExceeded) else "rejected"
+                    log_event(logger, f"Trade rejected: {reason}", stage="executed", category="trade", outcome=outcome)
+                    trace.outcome = outcome
+                    return
+                except SwapUnconfirmed as e:
+                    # The reservation stays: the ledger counts the trade at its value, also after a restart
+                    reason, result = str(e), {'value_usdc': e.value}
+                    log_event(logger, f"{reason}; counting it as executed", logging.WARNING,
+                              stage="executed", category="trade", outcome="executed_unknown")
+                    trace.outcome = "executed_unknown"
+                    return
+                except UnsupportedTrade as e:
+                    log_event(logger, f"Can't execute intent directly ({str(e)}), asking agent",
+                              stage="executed", category="trade")
+                    prompt = prompt_builder.execution(intent)
+            else:
+                prompt = prompt_builder.analysis(text)
+
+            # The agent trades on its own, up to the trade limit: count that much while it runs
+            try:
+                reservation = risk_engine.reserve(author_id, TRADE_LIMIT_USDC)
+            except RiskLimitExceeded as e:
+                reason = str(e)
+                log_event(logger, f"Risk limit: {reason}, not asking agent", stage="agent", category="trade",
+                          outcome="risk_rejected", limit=e.limit)
+                trace.outcome = "risk_rejected"
+                return
+            try:
+                response = await send_to_agent(prompt, trace, deadline)
+            except LLMUnavailable as e:
+                reason = str(e)
+                if isinstance(e, DeadlineExceeded):
+                    # The reservation stays: the ledger counts it as a trade at the limit, also after a restart
+                    log_event(logger, f"Agent didn't answer before the signal expired ({str(e)}); "
+                                      f"a swap it already submitted can't be recalled", logging.WARNING,
+                              stage="agent", category="trade", outcome="agent_unknown")
+                    trace.outcome = "agent_unknown"
+                else:
+                    log_event(logger, f"Agent unavailable ({str(e)}), not trading", logging.WARNING,
+                              stage="agent", category="trade", outcome="degraded")
+                    trace.outcome = "degraded"
+                    risk_engine.release(reservation)
+                return
+            trace.outcome = "agent"
+            result = response
+            if tx_hash(response) is None:
+                risk_engine.release(reservation)  # No swap in the response
+
+            log_event(logger, f"Agent response: {response}", stage="agent", category="trade", outcome="agent")
+        except (Exception, asyncio.CancelledError) as e:
+            reason = str(e) or type(e).__name__
+            stages = {stage for stage, _ in trace.stages}
+            if 'reserved' in stages and not isinstance(e, ToolError):
+                trace.outcome = "executed_unknown"  # Cut off after reserving: the swap may have been sent
+            elif reservation is not None:
+                trace.outcome = "agent_unknown"  # The agent may have swapped before it failed
+            else:
+                trace.outcome = "failed"
+            raise
+        finally:
+            record_decision(trace, event_data, author_id, intent, source, reason, result)
+
+
+if HEDGE_MODEL:
+    @fast.agent(
+        name="hedge",
+        instruction="You classify Farcaster messages into trade intents and answer with JSON only.",
+        model=HEDGE_MODEL,
+        use_history=False,
+    )
+    async def hedge_classifier():
+        """Second, faster model for hedged classification requests (no tools)"""
+
+
+def degrade(intent, reason, trace):
+    """Intent to trade on while the model is unavailable, or None to skip the cast (see LLM_DEGRADED_MODE)"""
+    METRICS.inc("llm_degraded_total", {"mode": LLM_DEGRADED_MODE})
+    if (LLM_DEGRADED_MODE == 'parser' and intent.side is not None and intent.confidence >= DEGRADED_MIN_CONFIDENCE
+            and intent.amount is not None and intent.unit is not None):
+        log_event(logger, f"Model unavailable ({reason}), trading on the parsed intent", logging.WARNING,
+                  stage="classified", category="trade", confidence=intent.confidence)
+        return intent
+    log_event(logger, f"Model unavailable ({reason}), skipping cast", logging.WARNING,
+              stage="classified", category="trade", outcome="degraded")
+    trace.outcome = "degraded"
+    return None
+
+
+def is_authorized(author):
+    """Authorize a cast author by fid (fast path), or by username if their fid is unknown; news by source"""
+    if author.get('fid') in authorized_fids:
+        return True
+    return author.get('username') in unresolved_users or author.get('source') in AUTHORIZED_SOURCES
+
+
+def authorize_users():
+    """Switch authorized users whose fid is in the identity index from username to fid matching"""
+    for username in AUTHORIZED_USERS:
+        fid = identity_index.fid(username)
+        if fid is not None:
+            authorized_fids.add(fid)
+            unresolved_users.discard(username)
+
+
+def author_key(author):
+    """Author id the risk limits and the ledger count trades by: the fid, else the username (news: the source)"""
+    return str(author.get('fid') or author.get('username') or author.get('source'))
+
+
+def estimated_value(intent):
+    """USDC notional of an intent known without a quote (buys sized in USDC), or None"""
+    if intent.side == 'buy' and intent.unit == 'USDC' and intent.amount:
+        return intent.amount
+    return None
+
+
+def record_decision(trace, event_data, author_id, intent, source, reason, result):
+    """Append the outcome of a cast to the trade ledger"""
+    if trace.outcome is None:
+        return
+    decision, value, tx = trace.outcome, None, None
+    if decision == 'executed':
+        value, tx = result.get('value_usdc'), tx_hash(result.get('result'))
+    elif decision == 'agent':
+        tx = tx_hash(result) if result else None
+        if tx:
+            decision, value = 'agent_traded', TRADE_LIMIT_USDC  # Counted at the limit, like the risk engine
+    elif decision == 'agent_unknown':
+        value = TRADE_LIMIT_USDC  # Cut off mid-call: it may have swapped, so it keeps counting
+    elif decision == 'executed_unknown':
+        value = result['value_usdc'] if result else TRADE_LIMIT_USDC  # The swap may have been sent
+    trade_ledger.record(decision, intent=intent, event_id=trace.event_id or event_data.get('data', {}).get('hash'),
+                        author=author_id, source=source, value_usdc=value, reason=reason, tx_hash=tx,
+                        timings=dict(trace.stages), sync=value is not None)
+
+
+def agent_request_params():
+    """Request params sending the system prompt prefix as a cache-marked block
+
+    fast-agent sends the instruction as a plain string; the Anthropic provider
+    merges metadata into the API arguments, so this replaces it with the same
+    text carrying cache_control.
+    """
+    return RequestParams(metadata={"system": prompt_builder.system_blocks()})
+
+
+async def send_to_agent(prompt, trace, deadline=None):
+    """Lease a warm agent to analyze message and execute trade, giving up at the deadline
+
+    Raises:
+        LLMUnavailable: The circuit breaker is open or the deadline passed
+    """
+    async def call():
+        async with agent_pool.lease() as agent:
+            trace.mark("agent_leased")
+            response = await agent["default"].generate_str(prompt, agent_request_params())
+            trace.mark("llm")
+            return response
+
+    response = await llm_guard.call(call, deadline=deadline, name="agent", slow_after=LLM_AGENT_SLOW_SECONDS)
+    usage = prompt_builder.record(prompt)
+    hit_rate = prompt_builder.get_stats()["cache_hit_rate"]
+    log_event(logger, f"Agent prompt: {usage['prompt_bytes']} bytes, ~{usage['input_tokens']} input tokens "
+                      f"({usage['cache_read_tokens']} cached), cache hit rate {hit_rate:.0%}",
+              stage="llm", category="trade", cache_hit_rate=round(hit_rate, 4), **usage)
+    return response
+
+
+async def execute_intent(intent, trace, author_id):
+    """Lease a warm session and execute a parsed intent through its MCP connection"""
+    async with agent_pool.lease() as agent:
+        trace.mark("agent_leased")
+        executor = TradeExecutor(agent["default"], TOKEN_ADDRESSES, TRADE_LIMIT_USDC,
+                                 tool_prefix="polygon-", metrics=METRICS, trace=trace, registry=token_registry,
+                                 market=market, risk=risk_engine, author=author_id)
+        try:
+            return await executor.execute(intent)
+        except (TradeRejected, UnsupportedTrade) as e:
+            # Rule violations say nothing about the session's health, raise outside the lease
+            error = e
+    raise error
+
+
+async def send_classification(prompt):
+    """Send a batch classification prompt to a leased agent, hedged to HEDGE_MODEL when it is slow"""
+    async def ask(agent_name):
+        async with agent_pool.lease() as agent:
+            return await agent[agent_name].send(prompt)
+
+    hedge = (lambda: ask("hedge")) if HEDGE_MODEL else None
+    return await llm_guard.call(lambda: ask("default"), hedge, deadline=time.time() + MAX_SIGNAL_AGE_SECONDS,
+                                name="classification")
+
+
+async def fetch_token_decimals(symbol):
+    """Ask the Polygon MCP server for a token's decimals (used once per new token)"""
+    async with agent_pool.lease() as agent:
+        executor = TradeExecutor(agent["default"], TOKEN_ADDRESSES, TRADE_LIMIT_USDC, tool_prefix="polygon-")
+        return await executor.decimals(symbol)
+
+
+async def check_agent_health(agent):
+    """Health check for pooled sessions: the agent must still expose the Polygon tools"""
+    result = await agent["default"].list_tools()
+    return bool(result.tools)
+
+
+def agent_session():
+    """Run the agents on a FastAgent of their own, so each pooled session has its own MCP app
+
+    The `run()` contexts of one FastAgent share its MCP app and connection
+    manager: recycling one session would disconnect the Polygon MCP server
+    and clear the app context under every other session.
+    """
+    app = FastAgent(fast.name, ignore_unknown_args=True)
+    app.agents = dict(fast.agents)
+    return app.run()
+
+
+# Long-lived agent sessions, started once in main()
+agent_pool = SessionPool(agent_session, size=AGENT_POOL_SIZE, max_uses=AGENT_MAX_USES,
+                         health_check=check_agent_health)
+
+intent_batcher = IntentBatcher(llm_classifier(send_classification, token_registry),
+                               window=LLM_BATCH_WINDOW, max_batch=LLM_BATCH_MAX) if LLM_BATCH_WINDOW is not None else None
+
+
+def create_pipeline(prefilter, handler=None, workers=WEBHOOK_WORKERS, **server_options):
+    """Webhook server -> event bus -> per-author scheduler -> process_farcaster_event
+
+    Args:
+        prefilter: EventPrefilter run on raw webhook bodies
+        handler: Coroutine function handling each cast instead of process_farcaster_event
+            (benchmarks/load_replay.py wraps it to time each cast)
+        workers: Webhook server workers, also the bus's handler calls in flight
+        **server_options: Further WebhookServer arguments (queue size, dedup store, recorder, ...)
+
+    Returns:
+        The bus, the webhook source to start it with, and the webhook server
+    """
+    # Casts from one author run in order, different authors concurrently
+    scheduler = KeyedScheduler(handler or process_farcaster_event, max_concurrency=EXECUTION_CONCURRENCY,
+                               urgency=event_priority, metrics=METRICS)
+    # Every source publishes to the bus; it hands each new signal to the scheduler
+    bus = EventBus(scheduler, max_queue=BUS_QUEUE_SIZE, max_in_flight=workers, metrics=METRICS)
+    webhook_source = WebhookSource(bus)
+    webhook_server = WebhookServer(callback=webhook_source, workers=workers, prefilter=prefilter, **server_options)
+    # A cast the full bus drops was already acknowledged: forget it so Neynar's redelivery gets through
+    webhook_source.on_drop = webhook_server.forget
+    return bus, webhook_source, webhook_server
+
 
 # Define main function
 
 
 async def main():
+    global market
+    log_listener = setup_logging(LOG_FILE, sample_rates=LOG_SAMPLE_RATES)
+
     print("\n=== Farcaster Event Trader ===\n")
     print("Starting Fast-Agent and Polygon MCP server...\n")
 
-    # Create and start webhook server (run in background)
-    webhook_server = WebhookServer(callback=process_farcaster_event)
-    webhook_task = asyncio.create_task(
-        asyncio.to_thread(webhook_server.run)
-    )
+    # Warm up agent sessions before accepting events
+    await agent_pool.start()
+    print(f"Agent pool ready: {AGENT_POOL_SIZE} sessions")
+
+    # The Polygon tool definitions go in front of the system prompt and count toward the cacheable prefix
+    async with agent_pool.lease() as agent:
+        tools = (await agent["default"].list_tools()).tools
+    prompt_builder.tool_tokens = estimate_tokens(json.dumps(
+        [{"name": tool.name, "description": tool.description or "", "input_schema": tool.inputSchema} for tool in tools]))
+    print(f"Agent prompt prefix: ~{prompt_builder.tool_tokens + estimate_tokens(prompt_builder.prefix())} tokens "
+          f"with {len(tools)} tool definitions" + ("" if prompt_builder.cacheable() else
+                                                   f", too short to be cached (min {prompt_builder.min_cache_tokens})"))
 
-    print(f"Webhook server started, listening on port 8000")
-    print(f"Authorized users: {', '.join(AUTHORIZED_USERS)}")
-    print(f"Trading limit: {TRADE_LIMIT_USDC} USDC")
+    # Resolve decimals of tokens added since the registry was cached
+    resolved = await token_registry.resolve_missing(fetch_token_decimals, TOKEN_REGISTRY_PATH)
+    print(f"Token registry: {len(token_registry.tokens)} tokens" + (f", resolved {', '.join(resolved)}" if resolved else ""))
+
+    # Trades still within the risk window count against the limits after a restart
+    loaded = risk_engine.load(trade_ledger.traded_since(time.time() - RISK_WINDOW_SECONDS))
+    ledger_task = asyncio.create_task(trade_ledger.run())
+    print(f"Trade ledger: {TRADE_LEDGER_PATH}, {loaded} trades in the last {RISK_WINDOW_SECONDS / 3600:g}h "
+          f"({risk_engine.notional()} USDC)")
+
+    # Quotes and allowances over their own MCP session, so prefetching never waits for a pooled agent
+    prefetch_stack = contextlib.AsyncExitStack()
+    prefetch_task = None
+    if PREFETCH_QUOTES:
+        try:
+            session = await prefetch_stack.enter_async_context(open_mcp_session())
+            market = QuotePrefetcher(session, TOKEN_ADDRESSES, TRADE_LIMIT_USDC, symbols=PREFETCH_TOKENS,
+                                     ttl=QUOTE_TTL_SECONDS, registry=token_registry, metrics=METRICS)
+            prefetch_task = asyncio.create_task(market.run(QUOTE_REFRESH_SECONDS))
+            print(f"Prefetching quotes and allowances for {', '.join(PREFETCH_TOKENS)} every {QUOTE_REFRESH_SECONDS:.0f}s")
+        except Exception as e:
+            print(f"Quote prefetching disabled ({str(e)})")
+
+    # Authorize by fid: resolved from the cached identity index, only unknown usernames hit the API
+    authorize_users()
+    neynar = None
+    refresh_task = None
+    if os.getenv('NEYNAR_API_KEY'):
+        try:
+            neynar = AsyncNeynarClient()
+            await identity_index.resolve_async(neynar, unresolved_users)
+            authorize_users()
+        except Exception as e:
+            print(f"Couldn't resolve authorized users ({str(e)}), matching them by username")
+
+    # Drop casts from other authors before they are parsed or logged
+    prefilter = EventPrefilter(secret=os.getenv('NEYNAR_WEBHOOK_SECRET'),
+                               allowed_fids=authorized_fids,
+                               allowed_usernames=unresolved_users or None,
+                               event_types=['cast.created'])
+
+    # The webhook server runs in this event loop, next to the agent pool
+    bus, webhook_source, webhook_server = create_pipeline(
+        prefilter, max_queue_size=WEBHOOK_QUEUE_SIZE,
+        dedup_store=SQLiteDedupStore(DEDUP_DB_PATH, ttl=DEDUP_TTL_SECONDS),
+        recorder=WebhookRecorder(RECORD_WEBHOOKS) if RECORD_WEBHOOKS else None)
+    sources = [webhook_source]
+    poller = None
+    if POLL_CASTS and neynar:
+        poller = CastPoller(neynar, None, fids=authorized_fids, state_path=POLL_STATE_PATH)
+        sources.append(PollingSource(bus, poller))
+    sources += [NewsFileSource(bus, path) for path in NEWS_FILES]
+    if REPLAY_FILE:
+        sources.append(ReplaySource(bus, REPLAY_FILE, speed=REPLAY_SPEED))
+
+    def identities_changed():
+        """Match users the background refresh resolved by fid in the prefilter and the poller too"""
+        authorize_users()
+        prefilter.update(allowed_fids=authorized_fids, allowed_usernames=unresolved_users or None)
+        if poller is not None:
+            for fid in authorized_fids:
+                poller.add_fid(fid)
+
+    if neynar:
+        # Keep the index fresh in the background (renames, new verified addresses, users not resolved yet)
+        refresh_task = asyncio.create_task(identity_index.run_refresh(
+            neynar, IDENTITY_REFRESH_SECONDS, usernames=AUTHORIZED_USERS, on_change=identities_changed))
+
+    print(f"Webhook server starting, listening on port 8000")
+    print(f"Authorized users: {', '.join(AUTHORIZED_USERS)} (fids: {', '.join(str(fid) for fid in sorted(authorized_fids)) or 'none'})")
+    print(f"Trading limit: {TRADE_LIMIT_USDC} USDC per trade, {RISK_WINDOW_LIMIT_USDC} USDC overall and "
+          f"{RISK_AUTHOR_LIMIT_USDC} USDC per author every {RISK_WINDOW_SECONDS / 3600:g}h")
+    print(f"Workers: {WEBHOOK_WORKERS} (queue size {WEBHOOK_QUEUE_SIZE}), {EXECUTION_CONCURRENCY} authors at a time")
+    print(f"Signals expire {MAX_SIGNAL_AGE_SECONDS:.0f}s after posting")
+    print(f"Signal sources: {', '.join(source.name for source in sources)}")
+    if intent_batcher:
+        print((f"LLM classification: batched, {LLM_BATCH_WINDOW}s window, up to {LLM_BATCH_MAX} casts"
+               if LLM_BATCH_WINDOW > 0 else "LLM classification: one call per cast")
+              + (f", hedged to {HEDGE_MODEL}" if HEDGE_MODEL else "") + f", cached for {INTENT_CACHE_TTL_SECONDS / 60:g}min")
+    else:
+        print("LLM classification: off, full agent analysis per cast")
+    print(f"Model breaker: opens after {LLM_BREAKER_FAILURES} slow (>{LLM_SLOW_SECONDS:.0f}s) or failed calls, "
+          f"degraded mode '{LLM_DEGRADED_MODE}'")
     print("\nWaiting for Farcaster messages...\n")
 
+    await bus.start(sources)
     try:
-        # Keep program running
-        while True:
-            await asyncio.sleep(1)
-    except KeyboardInterrupt:
+        # Serve until Ctrl+C / SIGTERM; queued webhooks are passed to the bus before this returns
+        await webhook_server.serve(port=8000)
         print("\nShutting down services...")
     finally:
-        # Cancel webhook task
-        webhook_task.cancel()
-        try:
-            await webhook_task
-        except asyncio.CancelledError:
-            pass
+        # Stop the other sources and drain queued and in-flight trades
+        await bus.stop(drain=True, timeout=30)
+        if refresh_task:
+            refresh_task.cancel()
+        if prefetch_task:
+            prefetch_task.cancel()
+            await asyncio.gather(prefetch_task, return_exceptions=True)
+        market = None
+        await prefetch_stack.aclose()
+        if neynar:
+            await neynar.close()
+        await agent_pool.close()
+        ledger_task.cancel()
+        trade_ledger.close()
         print("Services shut down")
+        log_listener.stop()
 
 # Run main function
 if __name__ == "__main__":
@@ -0,0 +1,245 @@
+#!/usr/bin/env python3
+import time
+import asyncio
+import logging
+from decimal import Decimal
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+from trade_executor import TradeExecutor, ONEINCH_ROUTER
+
+logger = logging.getLogger("quote-prefetcher")
+
+
+class Quote(NamedTuple):
+    """A 1inch quote: `amount_in` of one token (smallest unit) buys `amount_out` of the other"""
+    amount_in: int
+    amount_out: int
+    fetched_at: float
+
+
+class QuotePrefetcher:
+    """Short-lived cache of quotes and allowances for the tracked token pairs
+
+    Keeps a quote in both directions between the quote token (USDC) and
+    every tracked token at the trade size, plus the router allowance of
+    each token, refreshed in the background (`run`). When a cast arrives,
+    `prefetch` refreshes the tokens it mentions while its intent is still
+    being worked out, so by the time the executor needs a quote or
+    allowance it is already there.
+
+    TradeExecutor (with `market=`) values a sell from a cached quote up to
+    `ttl` seconds old and skips the allowance check when a fresh cached
+    allowance covers the amount; otherwise it calls the tools as usual.
+    The swap itself always gets its own route from 1inch.
+    """
+
+    def __init__(self,
+                 session: Any,
+                 tokens: Dict[str, str],
+                 trade_size: float,
+                 symbols: Optional[Iterable[str]] = None,
+                 quote_token: str = 'USDC',
+                 spender: str = ONEINCH_ROUTER,
+                 ttl: float = 15.0,
+                 tool_prefix: str = '',
+                 tools: Optional[Dict[str, str]] = None,
+                 registry: Any = None,
+                 metrics: Any = None):
+        """Initialize the prefetcher
+
+        Args:
+            session: MCP session for the Polygon tools (best a dedicated one, not a pooled agent)
+            tokens: Token symbol to address mapping (e.g. TOKEN_ADDRESSES)
+            trade_size: Trade size in the quote token that quotes are fetched at
+            symbols: Tokens to track (default: every token in `tokens` except the quote token and prohibited ones)
+            quote_token: Symbol every trade is made against
+            spender: Address allowances are checked for
+            ttl: Seconds a quote or allowance is used for
+            tool_prefix: Prefix for tool names (see TradeExecutor)
+            tools: Overrides for trade_executor.DEFAULT_TOOLS
+            registry: Optional TokenRegistry answering decimals and token mentions
+            metrics: Optional Metrics registry
+        """
+        self.executor = TradeExecutor(session, tokens, trade_size, quote_token=quote_token, spender=spender,
+                                      tool_prefix=tool_prefix, tools=tools, metrics=metrics, registry=registry)
+        self.tokens = tokens
+        self.trade_size = trade_size
+        self.quote_token = quote_token
+        self.spender = spender
+        self.ttl = ttl
+        self.registry = registry
+        self.metrics = metrics
+        self.symbols = list(symbols) if symbols is not None else [
+            symbol for symbol, address in tokens.items() if symbol != quote_token and address != 'DO_NOT_USE']
+        self._quotes: Dict[Tuple[str, str], Quote] = {}
+        self._allowances: Dict[str, Tuple[int, float]] = {}
+        self._inflight: Dict[str, asyncio.Task] = {}
+        self._quote_decimals: Optional[int] = None
+
+        # Counters
+        self.refreshes = 0
+        self.speculative = 0
+        self.errors = 0
+        self.quote_hits = 0
+        self.quote_misses = 0
+        self.allowance_hits = 0
+        self.allowance_misses = 0
+
+        if metrics is not None:
+            metrics.describe("prefetch_total", "Quote and allowance prefetches by trigger")
+            metrics.describe("prefetch_cache_total", "Executor lookups of prefetched data by kind and result")
+
+    def _fresh(self, fetched_at: float) -> bool:
+        return time.monotonic() - fetched_at <= self.ttl
+
+    async def refresh(self, symbol: str):
+        """Fetch both quotes and the allowance of one tracked token (and of the quote token if it is aging)"""
+        self.refreshes += 1
+        token, quote = self.tokens[symbol], self.tokens[self.quote_token]
+        if self._quote_decimals is None:
+            self._quote_decimals = await self.executor.decimals(self.quote_token)
+
+        async def quotes():
+            size = await self.executor.to_base_units(self.quote_token, self.trade_size)
+            bought = await self._quote(quote, token, size)
+            # Sell quote for the amount the trade size buys
+            await self._quote(token, quote, bought)
+
+        fetches = [quotes(), self.refresh_allowance(token)]
+        cached = self._allowances.get(quote)
+        if quote not in self._inflight and (cached is None or time.monotonic() - cached[1] > self.ttl / 2):
+            # Buys spend the quote token; one refresh of its allowance serves every token
+            fetches.append(self._track(quote, self._guarded(self.refresh_allowance(quote), self.quote_token)))
+        await asyncio.gather(*fetches)
+
+    async def _quote(self, from_address: str, to_address: str, amount: int) -> int:
+        out = await self.executor.quote(from_address, to_address, amount)
+        self._quotes[(from_address, to_address)] = Quote(amount, out, time.monotonic())
+        return out
+
+    async def refresh_allowance(self, token_address: str):
+        self._allowances[token_address] = (await self.executor.allowance(token_address), time.monotonic())
+
+    def fetch(self, symbol: str) -> asyncio.Task:
+        """Refresh a token in the background, joining a refresh already in flight"""
+        address = self.tokens[symbol]
+        return self._inflight.get(address) or self._track(address, self._guarded(self.refresh(symbol), symbol))
+
+    def _track(self, address: str, coroutine: Any) -> asyncio.Task:
+        task = asyncio.ensure_future(coroutine)
+        self._inflight[address] = task
+        task.add_done_callback(lambda _: self._inflight.pop(address, None))
+        return task
+
+    async def _guarded(self, coroutine: Any, symbol: str):
+        try:
+            await coroutine
+        except Exception as e:
+            self.errors += 1
+            logger.warning(f"Prefetch of {symbol} failed: {e}")
+
+    async def refresh_all(self):
+        """Refresh every tracked token"""
+        await asyncio.gather(*(self.fetch(symbol) for symbol in self.symbols))
+
+    def mentioned(self, text: str) -> List[str]:
+        """Tracked tokens a cast mentions (by symbol, or by alias with a registry)"""
+        if self.registry is not None:
+            symbols = [token.symbol for token in self.registry.relevant(text, always=())]
+        else:
+            words = {word.strip("$.,!?").upper() for word in text.split()}
+            symbols = [symbol for symbol in self.symbols if symbol.upper() in words]
+        return [symbol for symbol in symbols if symbol in self.symbols]
+
+    def prefetch(self, text: str) -> List[asyncio.Task]:
+        """Start refreshing the tokens a cast mentions unless their cache is still fresh for a while
+
+        Returns right away; the tasks can be awaited but don't have to be.
+        """
+        tasks = []
+        for symbol in self.mentioned(text):
+            sell = self._quotes.get((self.tokens[symbol], self.tokens[self.quote_token]))
+            # Data older than half the TTL could expire before the trade needs it
+            stale = sell is None or time.monotonic() - sell.fetched_at > self.ttl / 2
+            if stale or self.tokens[symbol] in self._inflight:
+                self.speculative += 1
+                if self.metrics is not None:
+                    self.metrics.inc("prefetch_total", {"trigger": "cast"})
+                tasks.append(self.fetch(symbol))
+        return tasks
+
+    async def run(self, interval: float = 10.0):
+        """Refresh every tracked token every `interval` seconds until cancelled"""
+        while True:
+            try:
+                await self.refresh_all()
+                if self.metrics is not None:
+                    self.metrics.inc("prefetch_total", {"trigger": "background"})
+            except Exception as e:
+                self.errors += 1
+                logger.warning(f"Prefetch round failed: {e}")
+            await asyncio.sleep(interval)
+
+    async def wait(self, token_address: str):
+        """Wait for a refresh of the token that is in flight, if any (it started before any fresh call would)"""
+        task = self._inflight.get(token_address)
+        if task is not None:
+            await asyncio.shield(task)
+
+    def quote_value(self, symbol: str, amount: int) -> Optional[Decimal]:
+        """Value of `amount` of a token in the quote token from a fresh cached quote, or None
+
+        The cached quote is scaled to the amount, so it is only used for
+        amounts within 4x of the size it was fetched at.
+        """
+        quote = self._quotes.get((self.tokens.get(symbol), self.tokens[self.quote_token]))
+        if (quote is None or not self._fresh(quote.fetched_at) or self._quote_decimals is None
+                or quote.amount_in <= 0 or not quote.amount_in / 4 <= amount <= quote.amount_in * 4):
+            self._count("quote", False)
+            return None
+        self._count("quote", True)
+        out = quote.amount_out * amount // quote.amount_in
+        return Decimal(out) / (Decimal(10) ** self._quote_decimals)
+
+    def allowance_covers(self, token_address: str, spender: str, amount: int) -> bool:
+        """Whether a fresh cached allowance for the spender covers the amount"""
+        cached = self._allowances.get(token_address)
+        hit = spender == self.spender and cached is not None and self._fresh(cached[1]) and cached[0] >= amount
+        self._count("allowance", hit)
+        return hit
+
+    def set_allowance(self, token_address: str, spender: str, allowance: int):
+        """Record an allowance the executor just approved or checked"""
+        if spender == self.spender:
+            self._allowances[token_address] = (allowance, time.monotonic())
+
+    def spent(self, token_address: str, spender: str, amount: int):
+        """A swap used `amount` of the allowance"""
+        cached = self._allowances.get(token_address)
+        if spender == self.spender and cached is not None:
+            self._allowances[token_address] = (max(0, cached[0] - amount), cached[1])
+
+    def _count(self, kind: str, hit: bool):
+        if kind == "quote":
+            if hit:
+                self.quote_hits += 1
+            else:
+                self.quote_misses += 1
+        elif hit:
+            self.allowance_hits += 1
+        else:
+            self.allowance_misses += 1
+        if self.metrics is not None:
+            self.metrics.inc("prefetch_cache_total", {"kind": kind, "result": "hit" if hit else "miss"})
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "tracked": len(self.symbols),
+            "refreshes": self.refreshes,
+            "speculative": self.speculative,
+            "errors": self.errors,
+            "quote_hits": self.quote_hits,
+            "quote_misses": self.quote_misses,
+            "allowance_hits": self.allowance_hits,
+            "allowance_misses": self.allowance_misses,
+        }
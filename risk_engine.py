@@ -0,0 +1,194 @@
+#!/usr/bin/env python3
+import time
+from collections import deque
+from decimal import Decimal
+from typing import Any, Deque, Dict, Iterable, Optional, Tuple
+
+from trade_executor import TradeRejected
+
+
+class RiskLimitExceeded(TradeRejected):
+    """The trade would break a risk limit (`limit` names which one)"""
+
+    def __init__(self, message: str, limit: str):
+        super().__init__(message)
+        self.limit = limit
+
+
+class Reservation:
+    """Notional counted against the limits for one trade, until released"""
+    __slots__ = ("ts", "author", "value")
+
+    def __init__(self, ts: float, author: Any, value: Decimal):
+        self.ts = ts
+        self.author = author
+        self.value = value
+
+
+class RiskEngine:
+    """Per-trade, rolling-window and per-author notional limits, checked in process
+
+    Trades are kept in time order together with running totals (overall and
+    per author); trades leaving the window are subtracted as they expire, so
+    a check is amortized O(1) and needs no I/O or model call. Limits of None
+    are not enforced.
+
+    A trade reserves its notional before the swap (`reserve`), so concurrent
+    trades can't pass the same headroom twice, and gives it back if it
+    didn't go through (`release`).
+    """
+
+    def __init__(self,
+                 trade_limit: Optional[float] = None,
+                 window_limit: Optional[float] = None,
+                 author_limit: Optional[float] = None,
+                 window: float = 24 * 3600,
+                 metrics: Any = None):
+        """Initialize the engine
+
+        Args:
+            trade_limit: Maximum notional of one trade in USDC
+            window_limit: Maximum notional of all trades within the window
+            author_limit: Maximum notional of trades on one author's casts within the window
+            window: Rolling window in seconds
+            metrics: Optional Metrics registry
+        """
+        self.trade_limit = _decimal(trade_limit)
+        self.window_limit = _decimal(window_limit)
+        self.author_limit = _decimal(author_limit)
+        self.window = window
+        self.metrics = metrics
+        self._trades: Deque[Reservation] = deque()
+        self._total = Decimal(0)
+        self._by_author: Dict[Any, Decimal] = {}
+
+        # Counters
+        self.reserved = 0
+        self.released = 0
+        self.rejected: Dict[str, int] = {}
+
+        if metrics is not None:
+            metrics.describe("risk_rejections_total", "Trades rejected by the risk engine, by limit")
+            metrics.gauge("risk_window_notional_usdc", lambda: float(self.notional()),
+                          "Notional traded within the risk window")
+
+    def _expire(self, now: float):
+        trades = self._trades
+        cutoff = now - self.window
+        while trades and trades[0].ts <= cutoff:
+            self._subtract(trades.popleft())
+
+    def _subtract(self, trade: Reservation):
+        if not trade.value:
+            return
+        self._total -= trade.value
+        left = self._by_author[trade.author] - trade.value
+        if left > 0:
+            self._by_author[trade.author] = left
+        else:
+            del self._by_author[trade.author]
+        trade.value = Decimal(0)
+
+    def notional(self, author: Any = None, now: Optional[float] = None) -> Decimal:
+        """Notional traded within the window, overall or on one author's casts"""
+        self._expire(now if now is not None else time.time())
+        return self._total if author is None else self._by_author.get(author, Decimal(0))
+
+    def headroom(self, author: Any = None, now: Optional[float] = None) -> Optional[Decimal]:
+        """Largest trade the window limits still allow (None if unlimited)"""
+        self._expire(now if now is not None else time.time())
+        room = [limit - used for limit, used in (
+            (self.trade_limit, 0),
+            (self.window_limit, self._total),
+            (self.author_limit, self._by_author.get(author, Decimal(0)) if author is not None else None),
+        ) if limit is not None and used is not None]
+        return max(Decimal(0), min(room)) if room else None
+
+    def check(self, author: Any, value: Any = None, now: Optional[float] = None):
+        """Raise RiskLimitExceeded unless a trade of `value` USDC would fit the limits
+
+        With value None (size not known yet), only checks that some headroom is left.
+
+        Raises:
+            RiskLimitExceeded: Which limit the trade would break
+        """
+        self._expire(now if now is not None else time.time())
+        value = _decimal(value)
+        if value is not None and self.trade_limit is not None and value > self.trade_limit:
+            self._reject("trade", f"Trade value {value} USDC exceeds limit of {self.trade_limit} USDC")
+        needed = value if value is not None else Decimal(0)
+        if self.window_limit is not None and (self._total + needed > self.window_limit
+                                              or (value is None and self._total >= self.window_limit)):
+            self._reject("window", f"{self._total} USDC traded in the last {self._window_text()}, "
+                                   f"limit {self.window_limit} USDC")
+        if self.author_limit is not None:
+            used = self._by_author.get(author, Decimal(0))
+            if used + needed > self.author_limit or (value is None and used >= self.author_limit):
+                self._reject("author", f"{used} USDC traded on casts of {author} in the last "
+                                       f"{self._window_text()}, limit {self.author_limit} USDC")
+
+    def reserve(self, author: Any, value: Any, now: Optional[float] = None) -> Reservation:
+        """Check a trade and count its notional against the limits
+
+        Raises:
+            RiskLimitExceeded: Which limit the trade would break
+        """
+        now = now if now is not None else time.time()
+        self.check(author, value, now)
+        return self._add(author, _decimal(value), now)
+
+    def _add(self, author: Any, value: Decimal, ts: float) -> Reservation:
+        if self._trades and ts < self._trades[-1].ts:
+            ts = self._trades[-1].ts  # Keep the window ordered
+        trade = Reservation(ts, author, value)
+        self._trades.append(trade)
+        self._total += value
+        self._by_author[author] = self._by_author.get(author, Decimal(0)) + value
+        self.reserved += 1
+        return trade
+
+    def release(self, reservation: Reservation):
+        """Give back the notional of a trade that didn't go through"""
+        if reservation.value:
+            self.released += 1
+            self._subtract(reservation)
+
+    def load(self, trades: Iterable[Tuple[float, Any, Any]], now: Optional[float] = None) -> int:
+        """Count past trades (timestamp, author, value) in time order, e.g. from the ledger after a restart
+
+        Returns:
+            Number of trades still within the window
+        """
+        now = now if now is not None else time.time()
+        loaded = 0
+        for ts, author, value in trades:
+            if ts > now - self.window and value:
+                self._add(author, _decimal(value), ts)
+                loaded += 1
+        self.reserved -= loaded
+        return loaded
+
+    def _reject(self, limit: str, message: str):
+        self.rejected[limit] = self.rejected.get(limit, 0) + 1
+        if self.metrics is not None:
+            self.metrics.inc("risk_rejections_total", {"limit": limit})
+        raise RiskLimitExceeded(message, limit)
+
+    def _window_text(self) -> str:
+        return f"{self.window / 3600:g}h" if self.window >= 3600 else f"{self.window:g}s"
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "window_notional": float(self.notional()),
+            "authors": len(self._by_author),
+            "trades_in_window": len(self._trades),
+            "reserved": self.reserved,
+            "released": self.released,
+            "rejected": dict(self.rejected),
+        }
+
+
+def _decimal(value: Any) -> Optional[Decimal]:
+    if value is None or isinstance(value, Decimal):
+        return value
+    return Decimal(str(value))
@@ -0,0 +1,218 @@
+#!/usr/bin/env python3
+import asyncio
+import logging
+import time
+from contextlib import asynccontextmanager
+from typing import Any, Callable, Awaitable, Optional, AsyncContextManager
+
+logger = logging.getLogger("session-pool")
+
+
+class AgentSession:
+    """A single long-lived agent session
+
+    The session is opened and closed by its own owner task, because the
+    MCP client context (and the server process behind it) must be exited
+    from the task that entered it.
+    """
+
+    def __init__(self, factory: Callable[[], AsyncContextManager[Any]], session_id: int):
+        self.factory = factory
+        self.session_id = session_id
+        self.agent = None
+        self.uses = 0
+        self.broken = False
+        self.last_check = 0.0
+        self._ready = asyncio.Event()
+        self._closing = asyncio.Event()
+        self._error: Optional[BaseException] = None
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def alive(self) -> bool:
+        return self._task is not None and not self._task.done() and self._error is None
+
+    async def open(self, timeout: Optional[float] = None):
+        """Start the owner task and wait until the agent is ready"""
+        self._task = asyncio.create_task(self._run(), name=f"agent-session-{self.session_id}")
+        await asyncio.wait_for(self._ready.wait(), timeout)
+        if self._error:
+            raise self._error
+        self.last_check = time.monotonic()
+
+    async def close(self):
+        """Ask the owner task to exit the agent context and wait for it"""
+        if self._task is None:
+            return
+        self._closing.set()
+        if not self._ready.is_set():
+            # Still starting up (e.g. open timed out)
+            self._task.cancel()
+        await asyncio.gather(self._task, return_exceptions=True)
+
+    async def _run(self):
+        try:
+            async with self.factory() as agent:
+                self.agent = agent
+                self._ready.set()
+                await self._closing.wait()
+        except Exception as e:
+            self._error = e
+        finally:
+            self.agent = None
+            self._ready.set()
+
+
+class SessionPool:
+    """Pool of pre-warmed agent sessions leased to events
+
+    Sessions are opened once at startup, handed out with `lease()`, and
+    recycled in the background after `max_uses` leases, after a failed
+    health check, or when a lease raises.
+    """
+
+    def __init__(self,
+                 factory: Callable[[], AsyncContextManager[Any]],
+                 size: int = 2,
+                 max_uses: int = 50,
+                 health_check: Optional[Callable[[Any], Awaitable[bool]]] = None,
+                 health_interval: float = 30.0,
+                 open_timeout: float = 60.0):
+        """Initialize the session pool
+
+        Args:
+            factory: Callable returning an async context manager that yields an agent. Every call
+                must open an independent session: the `run()` contexts of one FastAgent share its
+                MCP app and server connections, and closing one closes them for all
+            size: Number of warm sessions to keep
+            max_uses: Number of leases after which a session is recycled
+            health_check: Optional coroutine function returning False if the agent is unusable
+            health_interval: Minimum number of seconds between health checks of a session
+            open_timeout: Seconds to wait for a session to start
+        """
+        if size < 1:
+            raise ValueError("size must be at least 1")
+
+        self.factory = factory
+        self.size = size
+        self.max_uses = max_uses
+        self.health_check = health_check
+        self.health_interval = health_interval
+        self.open_timeout = open_timeout
+
+        self._idle: Optional[asyncio.Queue] = None
+        self._sessions = set()
+        self._background = set()
+        self._next_id = 0
+        self._closed = False
+
+        # Counters
+        self.leases = 0
+        self.recycled = 0
+        self.failures = 0
+
+    async def start(self):
+        """Open all sessions concurrently"""
+        self._idle = asyncio.Queue()
+        self._closed = False
+        await asyncio.gather(*(self._spawn() for _ in range(self.size)))
+
+    async def close(self):
+        """Close all sessions"""
+        self._closed = True
+        for task in list(self._background):
+            task.cancel()
+        await asyncio.gather(*self._background, return_exceptions=True)
+        await asyncio.gather(*(session.close() for session in list(self._sessions)))
+        self._sessions.clear()
+
+    @asynccontextmanager
+    async def lease(self):
+        """Borrow a warm agent for the duration of the block"""
+        if self._idle is None or self._closed:
+            raise RuntimeError("Session pool is not running")
+
+        session = await self._acquire()
+        self.leases += 1
+        session.uses += 1
+        try:
+            yield session.agent
+        except BaseException:
+            # The agent may be left in a bad state (e.g. MCP server crashed mid-call)
+            session.broken = True
+            raise
+        finally:
+            self._release(session)
+
+    async def _acquire(self) -> AgentSession:
+        while True:
+            session = await self._idle.get()
+            if await self._healthy(session):
+                return session
+            self._recycle(session)
+
+    def _release(self, session: AgentSession):
+        if session.broken or not session.alive or session.uses >= self.max_uses:
+            self._recycle(session)
+        else:
+            self._idle.put_nowait(session)
+
+    async def _healthy(self, session: AgentSession) -> bool:
+        if not session.alive:
+            return False
+        if self.health_check is None:
+            return True
+        now = time.monotonic()
+        if now - session.last_check < self.health_interval:
+            return True
+        try:
+            ok = await self.health_check(session.agent)
+        except Exception:
+            ok = False
+        session.last_check = now
+        return bool(ok)
+
+    def _recycle(self, session: AgentSession):
+        """Replace a session in the background so the caller isn't delayed"""
+        self.recycled += 1
+        task = asyncio.create_task(self._replace(session))
+        self._background.add(task)
+        task.add_done_callback(self._background.discard)
+
+    async def _replace(self, session: AgentSession):
+        self._sessions.discard(session)
+        await session.close()
+        if self._closed:
+            return
+        delay = 1.0
+        while not self._closed:
+            try:
+                await self._spawn()
+                return
+            except Exception as e:
+                logger.warning(f"Failed to start agent session: {str(e)}, retrying in {delay:.0f}s")
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, 30.0)
+
+    async def _spawn(self):
+        session = AgentSession(self.factory, self._next_id)
+        self._next_id += 1
+        try:
+            await session.open(timeout=self.open_timeout)
+        except BaseException:
+            self.failures += 1
+            await session.close()
+            raise
+        self._sessions.add(session)
+        self._idle.put_nowait(session)
+
+    def stats(self):
+        """Snapshot of pool counters"""
+        return {
+            "size": self.size,
+            "open": len(self._sessions),
+            "idle": self._idle.qsize() if self._idle else 0,
+            "leases": self.leases,
+            "recycled": self.recycled,
+            "failures": self.failures,
+        }
@@ -0,0 +1,6 @@
+import os
+import sys
+
+# The app and the SDK are flat modules, imported from the repo root and webhook-sdk/ like the benchmarks do
+ROOT = os.path.join(os.path.dirname(__file__), '..')
+sys.path[:0] = [ROOT, os.path.join(ROOT, 'webhook-sdk'), os.path.join(ROOT, 'benchmarks')]
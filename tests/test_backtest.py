@@ -0,0 +1,24 @@
+import pytest
+
+from backtest import extract_signals
+from intent_parser import IntentParser
+
+
+def cast(text):
+    return {"text": text, "timestamp": "2026-01-05T12:00:00Z", "author": {"username": "alice", "fid": 3}}
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("buy 0.5 USDC of ETH", [('buy', 0.5)]),
+    ("sell all my ETH", [('sell', 1.0)]),
+    # Rejected live: over the trade limit
+    ("buy 5 USDC of ETH", []),
+    # Left to the agent live: buys must be sized in USDC
+    ("buy 0.5 ETH", []),
+    # and sells in the token
+    ("sell $1 of ETH", []),
+])
+def test_signals_match_what_the_executor_trades(text, expected):
+    parser = IntentParser(dict.fromkeys(['WETH', 'USDC'], ''))
+    signals = extract_signals([cast(text)], parser, trade_limit=1.0, min_confidence=0.0)
+    assert [(signal.side, signal.notional) for signal in signals] == expected
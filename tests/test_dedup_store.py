@@ -0,0 +1,31 @@
+import itertools
+
+import pytest
+
+import dedup_store
+from dedup_store import MemoryDedupStore, SQLiteDedupStore
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    # One second per call, so every id gets its own expiry
+    ticks = itertools.count(1_000_000)
+    monkeypatch.setattr(dedup_store.time, "time", lambda: float(next(ticks)))
+
+
+def test_sqlite_store_forgets_the_oldest_ids_past_max_items(tmp_path, clock):
+    store = SQLiteDedupStore(str(tmp_path / "events.db"), purge_every=2, max_items=3)
+    for n in range(4):
+        assert store.add(f"cast.created:0x{n}")
+    assert len(store) == 3  # Purged on the 4th insert
+    assert "cast.created:0x0" not in store
+    assert all(f"cast.created:0x{n}" in store for n in (1, 2, 3))
+    store.close()
+
+
+def test_memory_store_evicts_first_seen_even_if_seen_again(clock):
+    store = MemoryDedupStore(max_items=2)
+    assert store.add("a") and store.add("b")
+    assert not store.add("a")  # A redelivery doesn't move "a" back
+    assert store.add("c")
+    assert "a" not in store and "b" in store and "c" in store
@@ -0,0 +1,51 @@
+import pytest
+
+from intent_cache import IntentCache, normalize_text
+from intent_parser import TradeIntent
+
+
+@pytest.mark.parametrize("a, b", [
+    ("Buy 1,000.50 USDC of $ETH 🚀🚀!!", "buy 1000.5 usdc of eth"),
+    ("buy .5 eth.", "buy 0.5 eth"),
+    ("buy \"eth\" now 👍🏽", "buy eth, now"),
+    ("@dwr buy 1 usdc of eth https://x.com/p/1", "buy 1 usdc of eth"),
+])
+def test_light_edits_share_a_key(a, b):
+    assert normalize_text(a) == normalize_text(b)
+
+
+@pytest.mark.parametrize("a, b", [
+    ("buy +1 eth", "buy 1 eth"),
+    ("buy <1 eth", "buy 1 eth"),
+    ("buy =1 eth", "buy 1 eth"),
+    ("buy $1 of eth", "buy 1 of eth"),
+    ("sell 50% of eth", "sell 50 of eth"),
+    ("buy -1 eth", "buy 1 eth"),
+    ("buy 1 usdc.e", "buy 1 usdc"),
+    ("buy 1.5 eth", "buy 15 eth"),
+    ("buy 1 usdc of eth now?", "buy 1 usdc of eth now"),
+    ("don't buy 1 usdc of eth now", "don t buy 1 usdc of eth now"),
+])
+def test_symbols_that_change_meaning_are_kept(a, b):
+    assert normalize_text(a) != normalize_text(b)
+
+
+def test_negation_spellings_share_a_key():
+    assert normalize_text("dont buy eth") == normalize_text("Don’t buy ETH") == normalize_text("don't buy eth")
+
+
+def test_question_or_negated_repost_misses():
+    cache = IntentCache()
+    cache.put("buy 1 usdc of eth now", TradeIntent('buy', 'WETH', 1.0, 'USDC', 0.9))
+    assert cache.get("buy 1 usdc of eth now?") is None
+    assert cache.get("don't buy 1 usdc of eth now") is None
+    assert cache.get("dont buy 1 usdc of eth now") is None
+
+
+def test_hit_for_repost():
+    cache = IntentCache()
+    intent = TradeIntent('buy', 'WETH', 0.5, 'USDC', 0.9)
+    cache.put("I'd buy 0.5 usdc of eth here", intent, cost=1.2)
+    assert cache.get("I'd buy 0.5 USDC of ETH here!! 🚀") == intent
+    assert cache.get("I'd buy 5 usdc of eth here") is None
+    assert cache.get_stats()["saved_seconds"] == 1.2
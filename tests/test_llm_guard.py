@@ -0,0 +1,33 @@
+import time
+import asyncio
+
+import pytest
+
+from llm_guard import LatencyGuard, CircuitBreaker, DeadlineExceeded
+
+
+def call(guard, delay, budget, slow_after=None):
+    async def model():
+        await asyncio.sleep(delay)
+        return "ok"
+    return asyncio.run(guard.call(model, deadline=time.time() + budget, slow_after=slow_after))
+
+
+def test_short_budget_expiries_leave_the_breaker_closed():
+    guard = LatencyGuard(CircuitBreaker(failures=3), slow_after=0.2)
+    for _ in range(5):
+        # Late casts: a few ms left, the model never got the chance to be slow
+        with pytest.raises(DeadlineExceeded):
+            call(guard, 1.0, 0.02)
+    assert guard.available()
+    assert guard.get_stats()["expired"] == 5 and guard.get_stats()["timeouts"] == 0
+    assert call(guard, 0.0, 1.0) == "ok"
+
+
+def test_slow_model_timeouts_open_the_breaker():
+    guard = LatencyGuard(CircuitBreaker(failures=3), slow_after=0.05)
+    for _ in range(3):
+        with pytest.raises(DeadlineExceeded):
+            call(guard, 1.0, 0.1)
+    assert not guard.available()
+    assert guard.get_stats()["timeouts"] == 3
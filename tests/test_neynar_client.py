@@ -0,0 +1,190 @@
+import time
+import asyncio
+from email.utils import formatdate
+from urllib.parse import urlparse, parse_qs
+
+import pytest
+import requests
+
+from neynar_client import NeynarClient, AsyncNeynarClient, retry_delay, should_retry
+from stub_neynar_api import StubNeynarAPI
+
+aiohttp = pytest.importorskip("aiohttp")  # AsyncNeynarClient's optional dependency
+
+SUBSCRIPTION = {"cast.created": {"author_fids": [3]}}
+
+
+@pytest.fixture
+def api():
+    with StubNeynarAPI() as stub:
+        yield stub
+
+
+def sync_client(api, **kwargs):
+    client = NeynarClient(api_key="stub", **{"backoff": 0.001, **kwargs})
+    client.BASE_URL = api.base_url
+    return client
+
+
+def async_call(api, method, *args, **kwargs):
+    """Call one AsyncNeynarClient method in a fresh event loop"""
+    async def call():
+        async with AsyncNeynarClient(api_key="stub", **{"backoff": 0.001, **kwargs}) as client:
+            client.BASE_URL = api.base_url
+            return await getattr(client, method)(*args)
+    return asyncio.run(call())
+
+
+def test_retry_after_seconds():
+    assert retry_delay(0, "2", backoff=0.5, max_backoff=30) == 2.0
+    assert retry_delay(3, "0", backoff=0.5, max_backoff=30) == 0.0
+    assert retry_delay(0, "-5", backoff=0.5, max_backoff=30) == 0.0
+
+
+def test_retry_after_is_capped():
+    assert retry_delay(0, "120", backoff=0.5, max_backoff=30) == 30.0
+
+
+def test_retry_after_http_date():
+    delay = retry_delay(0, formatdate(time.time() + 10, usegmt=True), backoff=0.5, max_backoff=30)
+    assert 8 <= delay <= 10
+    assert retry_delay(0, formatdate(time.time() - 60, usegmt=True), backoff=0.5, max_backoff=30) == 0.0
+
+
+def test_unparseable_retry_after_falls_back_to_backoff():
+    for attempt in range(4):
+        delay = retry_delay(attempt, "soon", backoff=0.5, max_backoff=30)
+        assert 0.5 * 2 ** attempt * 0.5 <= delay <= 0.5 * 2 ** attempt
+
+
+def test_should_retry():
+    assert should_retry("GET", None) and should_retry("GET", 429) and should_retry("GET", 503)
+    assert not should_retry("GET", 404)
+    assert should_retry("POST", 429)
+    assert not should_retry("POST", 503) and not should_retry("POST", None)
+
+
+@pytest.mark.parametrize("status, headers", [(429, {"Retry-After": "0"}), (503, {}), (502, {})])
+def test_get_is_retried_to_success(api, status, headers):
+    api.script(status, headers=headers)
+    api.script(status, headers=headers)
+    with sync_client(api) as client:
+        assert client.lookup_user_by_username("dwr")["user"]["username"] == "dwr"
+    assert len(api.requests) == 3
+
+
+def test_retries_give_up_after_max_retries(api):
+    for _ in range(3):
+        api.script(503)
+    with sync_client(api, max_retries=2) as client:
+        with pytest.raises(requests.HTTPError):
+            client.list_webhooks()
+    assert len(api.requests) == 3
+
+
+def test_client_errors_are_not_retried(api):
+    api.script(404, {"message": "not found"})
+    with sync_client(api) as client:
+        with pytest.raises(requests.HTTPError):
+            client.lookup_user_by_username("nobody")
+    assert len(api.requests) == 1
+
+
+def test_post_is_retried_only_on_429(api):
+    api.script(429, headers={"Retry-After": "0"})
+    with sync_client(api) as client:
+        assert client.publish_webhook("trader", "https://example.com/webhook", SUBSCRIPTION)["success"]
+    assert [method for method, _, _ in api.requests] == ["POST", "POST"]
+
+    api.reset()
+    api.script(503)
+    with sync_client(api) as client:
+        with pytest.raises(requests.HTTPError):
+            client.publish_webhook("trader", "https://example.com/webhook", SUBSCRIPTION)
+    assert len(api.requests) == 1
+
+
+def test_get_timeout_is_retried(api):
+    api.script(200, {"webhooks": []}, delay=0.5)
+    with sync_client(api, timeout=0.1) as client:
+        assert client.list_webhooks() == {"webhooks": []}
+    assert len(api.requests) == 2
+
+
+def test_post_timeout_is_not_retried(api):
+    api.script(200, {"success": True}, delay=0.5)
+    with sync_client(api, timeout=0.1) as client:
+        with pytest.raises(requests.Timeout):
+            client.publish_webhook("trader", "https://example.com/webhook", SUBSCRIPTION)
+    assert len(api.requests) == 1
+
+
+def test_timeouts_give_up_after_max_retries(api):
+    for _ in range(2):
+        api.script(200, {"webhooks": []}, delay=0.5)
+    with sync_client(api, timeout=0.1, max_retries=1) as client:
+        with pytest.raises(requests.Timeout):
+            client.list_webhooks()
+    assert len(api.requests) == 2
+
+
+def test_async_get_is_retried_to_success(api):
+    api.script(429, headers={"Retry-After": "0"})
+    api.script(503)
+    assert async_call(api, "lookup_user_by_username", "dwr")["user"]["username"] == "dwr"
+    assert len(api.requests) == 3
+
+
+def test_async_post_is_retried_only_on_429(api):
+    api.script(429, headers={"Retry-After": "0"})
+    assert async_call(api, "publish_webhook", "trader", "https://example.com/webhook", SUBSCRIPTION)["success"]
+    assert len(api.requests) == 2
+
+    api.reset()
+    api.script(503)
+    with pytest.raises(aiohttp.ClientResponseError) as error:
+        async_call(api, "publish_webhook", "trader", "https://example.com/webhook", SUBSCRIPTION)
+    assert error.value.status == 503
+    assert len(api.requests) == 1
+
+
+def test_async_timeouts(api):
+    api.script(200, {"webhooks": []}, delay=0.5)
+    assert async_call(api, "list_webhooks", timeout=0.1) == {"webhooks": []}
+    assert len(api.requests) == 2
+
+    api.reset()
+    api.script(200, {"success": True}, delay=0.5)
+    with pytest.raises(asyncio.TimeoutError):
+        async_call(api, "publish_webhook", "trader", "https://example.com/webhook", SUBSCRIPTION, timeout=0.1)
+    assert len(api.requests) == 1
+
+
+@pytest.mark.parametrize("method, args", [
+    ("lookup_user_by_username", ("dwr",)),
+    ("fetch_bulk_users", ([3, 5650],)),
+    ("fetch_user_casts", (3, 10, "cursor1")),
+    ("list_webhooks", ()),
+    ("get_webhook", ("wh_1",)),
+    ("publish_webhook", ("trader", "https://example.com/webhook", SUBSCRIPTION)),
+    ("update_webhook", ("wh_1", "trader", "https://example.com/webhook", SUBSCRIPTION)),
+    ("delete_webhook", ("wh_1",)),
+])
+def test_sync_and_async_clients_agree(api, method, args):
+    def last_request():
+        verb, path, body = api.requests[-1]
+        url = urlparse(path)
+        return verb, url.path, parse_qs(url.query), body
+
+    with sync_client(api) as client:
+        expected = getattr(client, method)(*args)
+    sync_request = last_request()
+    assert async_call(api, method, *args) == expected
+    assert last_request() == sync_request
+
+
+def test_sync_client_reuses_one_connection(api):
+    with sync_client(api) as client:
+        for i in range(20):
+            client.lookup_user_by_username(f"user{i}")
+    assert api.connections == 1
@@ -0,0 +1,55 @@
+import json
+import asyncio
+
+from identity_index import IdentityIndex
+from prefilter import EventPrefilter, REJECT_AUTHOR
+
+
+def cast(fid, username):
+    return json.dumps({"type": "cast.created", "data": {
+        "hash": "0xabc", "author": {"fid": fid, "username": username}, "text": "buy 1 usdc of eth"}}).encode()
+
+
+def test_update_replaces_the_allowlists():
+    prefilter = EventPrefilter(allowed_fids=[3], allowed_usernames=["newcomer"])
+    assert prefilter.check(cast(5650, "vitalik.eth")) == (None, REJECT_AUTHOR)
+
+    prefilter.update(allowed_fids=[3, 5650], allowed_usernames=None)
+    data, reason = prefilter.check(cast(5650, "vitalik.eth"))
+    assert reason is None and data["data"]["author"]["fid"] == 5650
+    # A username match no longer counts once every user is matched by fid
+    assert prefilter.check(cast(99, "newcomer")) == (None, REJECT_AUTHOR)
+
+
+class LateClient:
+    """Neynar stub whose username lookups fail until `online` is set"""
+
+    def __init__(self):
+        self.online = False
+
+    async def lookup_user_by_username(self, username):
+        if not self.online:
+            raise ConnectionError("offline")
+        return {"user": {"fid": 5650, "username": username}}
+
+    async def fetch_bulk_users(self, fids):
+        return {"users": []}
+
+
+def test_refresh_resolves_late_users_and_reports_them():
+    index = IdentityIndex()
+    client = LateClient()
+    changes = []
+
+    async def run():
+        task = asyncio.create_task(index.run_refresh(client, interval=0.01, usernames=["vitalik.eth"],
+                                                     on_change=lambda: changes.append(index.fid("vitalik.eth"))))
+        await asyncio.sleep(0.05)
+        assert changes == []
+        client.online = True
+        await asyncio.sleep(0.05)
+        task.cancel()
+
+    asyncio.run(run())
+    # Reported once, when the username was resolved
+    assert changes == [5650]
@@ -0,0 +1,38 @@
+from prompt_builder import PromptBuilder, estimate_tokens
+from token_registry import TokenRegistry
+from stubs import TOKEN_ADDRESSES
+
+DECIMALS = {'USDC': 6, 'WETH': 18, 'WBTC': 8, 'MATIC': 18, 'WMATIC': 18}
+
+
+def builder(**kwargs):
+    return PromptBuilder("Only trade on explicit instructions.", TokenRegistry.build(TOKEN_ADDRESSES, DECIMALS),
+                         trade_limit=1.0, **kwargs)
+
+
+def test_short_prefix_is_never_a_hit():
+    short = builder()
+    assert not short.cacheable()
+    for now in (0, 10, 20):
+        usage = short.record(short.analysis("buy 1 usdc of eth"), now=now)
+        assert not usage["cache_hit"] and usage["cache_read_tokens"] == usage["cache_write_tokens"] == 0
+    assert short.get_stats()["cache_hit_rate"] == 0.0
+
+
+def test_tool_definitions_count_toward_the_minimum():
+    tools = 1024 - estimate_tokens(builder().prefix())
+    cached = builder(tool_tokens=tools)
+    assert cached.cacheable()
+    message = cached.analysis("buy 1 usdc of eth")
+    assert cached.record(message, now=0)["cache_write_tokens"] == 1024
+    assert cached.record(message, now=100)["cache_hit"]
+    # Expired after cache_ttl without a call
+    assert not cached.record(message, now=500)["cache_hit"]
+
+
+def test_api_usage_wins_over_the_estimate():
+    short = builder()
+    usage = short.record("message", usage={"input_tokens": 20, "cache_read_input_tokens": 1500,
+                                           "cache_creation_input_tokens": 0})
+    assert usage["cache_hit"] and not usage["estimated"]
+    assert short.get_stats()["measured_calls"] == 1
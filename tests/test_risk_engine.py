@@ -0,0 +1,25 @@
+import time
+
+import pytest
+
+from risk_engine import RiskEngine, RiskLimitExceeded
+from trade_ledger import TradeLedger
+
+
+def test_trades_cut_off_count_after_restart(tmp_path):
+    now = time.time()
+    ledger = TradeLedger(str(tmp_path / "trades.db"))
+    ledger.record("executed", author="3", value_usdc=0.5, ts=now - 60)
+    # The agent may have swapped before its deadline passed: recorded at the trade limit
+    ledger.record("agent_unknown", author="3", value_usdc=1.0, ts=now - 30, sync=True)
+    # The swap call timed out after reserving: recorded at the trade's value
+    ledger.record("executed_unknown", author="3", value_usdc=0.25, ts=now - 25, sync=True)
+    ledger.record("rejected", author="3", value_usdc=1.0, ts=now - 20)
+    ledger.record("expired", author="3", ts=now - 10)
+
+    engine = RiskEngine(trade_limit=1.0, window_limit=10.0, author_limit=2.0)
+    assert engine.load(ledger.traded_since(now - 3600), now=now) == 3
+    assert engine.notional("3", now=now) == pytest.approx(1.75)
+    with pytest.raises(RiskLimitExceeded):
+        engine.check("3", 1.0, now=now)
+    ledger.close()
@@ -0,0 +1,109 @@
+import json
+import asyncio
+from decimal import Decimal
+from types import SimpleNamespace
+
+import pytest
+
+from intent_parser import TradeIntent
+from risk_engine import RiskEngine
+from trade_executor import TradeExecutor, SwapUnconfirmed, ToolError, _number
+
+TOKENS = {
+    'USDC': '0x3c499c542cEF5E3811e1192ce70d8cC03d5c3359',
+    'WETH': '0x7ceB23fD6bC0adD59E62ac25578270cFf1b9f619',
+}
+
+
+class ScriptedSession:
+    """MCP session answering each tool with fixed text (or raising) and recording the calls"""
+
+    def __init__(self, replies):
+        self.replies = replies
+        self.calls = []
+
+    async def call_tool(self, name, arguments):
+        self.calls.append(name)
+        reply = self.replies[name]
+        if isinstance(reply, BaseException):
+            raise reply
+        text = reply if isinstance(reply, str) else json.dumps(reply)
+        return SimpleNamespace(content=[SimpleNamespace(text=text)], isError=False)
+
+
+@pytest.mark.parametrize("result", [
+    "1inch quote: 0.4 USDC for 1000000000000000000 WETH",
+    "0x3c499c542cEF5E3811e1192ce70d8cC03d5c3359 balance 12.5",
+    "allowance for 0x111111125421cA6dc452d289314280a0f8842A65",
+    "12.5",
+    "",
+    None,
+    True,
+    [1],
+    {"toAmount": "n/a"},
+    {"toAmount": None},
+    {"toAmount": "NaN"},
+    {"amount": 5},
+])
+def test_number_rejects_unstructured_results(result):
+    with pytest.raises(ToolError):
+        _number(result, 'toAmount')
+
+
+@pytest.mark.parametrize("result, expected", [
+    (18, Decimal(18)),
+    (0.5, Decimal('0.5')),
+    ({"toAmount": "400000"}, Decimal(400000)),
+    ({"dstAmount": 7}, Decimal(7)),
+])
+def test_number_reads_json_numbers_and_named_fields(result, expected):
+    assert _number(result, 'toAmount', 'dstAmount') == expected
+
+
+def test_sell_with_text_quote_fails_before_swap():
+    # A prose quote used to be read as its first number, "1", valuing the sell below the limit
+    session = ScriptedSession({
+        'get_token_decimals': {'decimals': 18},
+        'inch_quote': "1inch quote: 1 WETH = 2500000000 USDC units",
+        'check_allowance': {'allowance': 0},
+        'approve_token': {'ok': True},
+        'inch_swap': {'txHash': '0x' + 'ab' * 32},
+    })
+    executor = TradeExecutor(session, TOKENS, trade_limit_usdc=1.0)
+    with pytest.raises(ToolError):
+        asyncio.run(executor.execute(TradeIntent('sell', 'WETH', 1.0, 'WETH', 1.0)))
+    assert 'inch_swap' not in session.calls
+    assert 'approve_token' not in session.calls
+
+
+def test_text_balance_is_not_read_as_an_amount():
+    session = ScriptedSession({'get_token_balance': "0x7ceB23fD6bC0adD59E62ac25578270cFf1b9f619 balance 12.5"})
+    executor = TradeExecutor(session, TOKENS, trade_limit_usdc=1.0)
+    with pytest.raises(ToolError):
+        asyncio.run(executor.balance('WETH'))
+
+
+BUY_REPLIES = {
+    'get_token_decimals': {'decimals': 6},
+    'check_allowance': {'allowance': 10 ** 9},
+}
+
+
+def test_swap_timeout_keeps_the_reservation():
+    # A timed-out swap may still have been sent: its notional keeps counting
+    session = ScriptedSession({**BUY_REPLIES, 'inch_swap': asyncio.TimeoutError()})
+    risk = RiskEngine(trade_limit=1.0, window_limit=10.0, author_limit=5.0)
+    executor = TradeExecutor(session, TOKENS, trade_limit_usdc=1.0, risk=risk, author="3")
+    with pytest.raises(SwapUnconfirmed) as info:
+        asyncio.run(executor.execute(TradeIntent('buy', 'WETH', 0.5, 'USDC', 1.0)))
+    assert info.value.value == Decimal('0.5')
+    assert risk.notional("3") == Decimal('0.5')
+
+
+def test_refused_swap_releases_the_reservation():
+    session = ScriptedSession({**BUY_REPLIES, 'inch_swap': ToolError("inch_swap failed: no route")})
+    risk = RiskEngine(trade_limit=1.0, window_limit=10.0, author_limit=5.0)
+    executor = TradeExecutor(session, TOKENS, trade_limit_usdc=1.0, risk=risk, author="3")
+    with pytest.raises(ToolError):
+        asyncio.run(executor.execute(TradeIntent('buy', 'WETH', 0.5, 'USDC', 1.0)))
+    assert risk.notional("3") == 0
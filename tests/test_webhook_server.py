@@ -0,0 +1,73 @@
+import asyncio
+
+from event_bus import EventBus
+from metrics import set_current_trace, reset_current_trace
+from signal_sources import WebhookSource
+from webhook_server import WebhookServer
+
+
+def cast(n):
+    return {"type": "cast.created", "data": {"hash": f"0x{n}", "author": {"fid": 3}, "text": "gm"}}
+
+
+def test_evicted_event_is_accepted_when_redelivered():
+    async def run():
+        release = asyncio.Event()
+        handled = []
+
+        async def handle(event):
+            await release.wait()
+            handled.append(event["data"]["hash"])
+
+        server = WebhookServer(callback=handle, workers=1, max_queue_size=1, overflow="drop_oldest")
+        await server.queue.start()
+
+        async def deliver(n):
+            trace = server.metrics.trace()
+            trace.event_id = f"cast.created:0x{n}"
+            return await server._accept(cast(n), b"", trace.event_id, trace)
+
+        await deliver(1)
+        await asyncio.sleep(0)  # The worker picks up 0x1 and waits
+        await deliver(2)
+        await deliver(3)  # Queue full: 0x2 is evicted
+        assert server.queue.dropped == 1
+
+        # Neynar's redelivery of the evicted cast is queued again, not deduplicated
+        await deliver(2)
+        assert server.queue.dropped == 2  # ...evicting 0x3 in turn
+        release.set()
+        await server.queue.stop()
+        return handled, server
+
+    handled, server = asyncio.run(run())
+    assert handled == ["0x1", "0x2"]
+    assert server.processed_events.add("cast.created:0x3")
+    assert not server.processed_events.add("cast.created:0x2")
+
+
+def test_cast_dropped_by_a_full_bus_is_accepted_when_redelivered():
+    async def run():
+        bus = EventBus(lambda event: asyncio.sleep(0), max_queue=1)
+        source = WebhookSource(bus)
+        server = WebhookServer(callback=source, workers=1)
+        source.on_drop = server.forget
+        await bus.start()  # Consumer not scheduled yet: the queue stays full while casts arrive
+        results = []
+        for n in (1, 2):
+            trace = server.metrics.trace()
+            trace.event_id = f"cast.created:0x{n}"
+            server.processed_events.add(trace.event_id)
+            token = set_current_trace(trace)
+            try:
+                await source(cast(n))
+            finally:
+                reset_current_trace(token)
+            results.append(trace.outcome)
+        await bus.stop(drain=False)
+        return results, server
+
+    outcomes, server = asyncio.run(run())
+    assert outcomes == ["published", "dropped"]
+    assert not server.processed_events.add("cast.created:0x1")
+    assert server.processed_events.add("cast.created:0x2")
@@ -0,0 +1,205 @@
+#!/usr/bin/env python3
+import os
+import re
+import json
+import time
+import hashlib
+import logging
+from typing import Awaitable, Callable, Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+from intent_parser import DEFAULT_ALIASES
+
+logger = logging.getLogger("token-registry")
+
+# Bump when the cache file layout changes; older caches are rebuilt
+REGISTRY_VERSION = 1
+
+# Address placeholder for tokens that must never be traded
+PROHIBITED_ADDRESS = 'DO_NOT_USE'
+
+# Words in a cast that could name a token ("$ETH", "usdc.e", "wbtc,")
+_WORD = re.compile(r"\$?([A-Za-z0-9][\w.]*)")
+
+
+class Token(NamedTuple):
+    """Metadata of one token
+
+    decimals is None until it has been resolved (see TokenRegistry.resolve_missing).
+    """
+    symbol: str
+    address: str
+    decimals: Optional[int]
+    aliases: Tuple[str, ...] = ()
+    prohibited: bool = False
+
+
+class TokenRegistry:
+    """Symbol, alias and address lookups for the tradable tokens
+
+    Built from a TOKEN_ADDRESSES-style mapping plus known decimals, cached
+    on disk with a version stamp and a fingerprint of its source, so
+    decimals are resolved once (not per trade) and every lookup is a dict
+    access. Batch classification prompts only get the entries relevant to
+    a cast (`relevant`); the agent gets the full table once, in its cached
+    system prompt prefix.
+    """
+
+    def __init__(self, tokens: Iterable[Token], fingerprint: str = ''):
+        self.tokens: Dict[str, Token] = {}
+        self._symbols: Dict[str, str] = {}
+        self._aliases: Dict[str, str] = {}
+        self._addresses: Dict[str, str] = {}
+        self.fingerprint = fingerprint
+        for token in tokens:
+            self.add(token)
+
+    def add(self, token: Token):
+        """Add or replace a token"""
+        self.tokens[token.symbol] = token
+        self._symbols[token.symbol.lower()] = token.symbol
+        for alias in token.aliases:
+            self._aliases[alias.lower()] = token.symbol
+        if not token.prohibited:
+            self._addresses[token.address.lower()] = token.symbol
+
+    @classmethod
+    def build(cls, addresses: Dict[str, str], decimals: Optional[Dict[str, int]] = None,
+              aliases: Optional[Dict[str, str]] = None) -> "TokenRegistry":
+        """Build a registry from a symbol -> address mapping
+
+        Args:
+            addresses: Token symbol to address mapping (e.g. TOKEN_ADDRESSES); 'DO_NOT_USE' marks prohibited tokens
+            decimals: Known decimals per symbol, the rest are resolved later
+            aliases: Alias -> symbol, merged over intent_parser.DEFAULT_ALIASES
+        """
+        decimals = decimals or {}
+        alias_map = {**DEFAULT_ALIASES, **(aliases or {})}
+        tokens = []
+        for symbol, address in addresses.items():
+            token_aliases = tuple(sorted(alias for alias, target in alias_map.items() if target == symbol))
+            tokens.append(Token(symbol, address, decimals.get(symbol), token_aliases,
+                                address == PROHIBITED_ADDRESS))
+        return cls(tokens, fingerprint(addresses, decimals, alias_map))
+
+    @classmethod
+    def load_or_build(cls, path: str, addresses: Dict[str, str], decimals: Optional[Dict[str, int]] = None,
+                      aliases: Optional[Dict[str, str]] = None) -> "TokenRegistry":
+        """Load the cached registry if it matches the current version and source, otherwise build it
+
+        Decimals resolved earlier and stored in the cache are kept.
+        """
+        source = fingerprint(addresses, decimals or {}, {**DEFAULT_ALIASES, **(aliases or {})})
+        if os.path.exists(path):
+            try:
+                registry = cls.load(path)
+                if registry.fingerprint == source:
+                    return registry
+                logger.info(f"Token registry {path} is outdated, rebuilding")
+                # Keep decimals resolved for tokens that are still listed at the same address
+                cached = {token.symbol: token.decimals for token in registry.tokens.values()
+                          if token.decimals is not None and addresses.get(token.symbol) == token.address}
+                decimals = {**cached, **(decimals or {})}
+            except (OSError, ValueError, KeyError) as e:
+                logger.warning(f"Ignoring unreadable token registry {path}: {e}")
+        registry = cls.build(addresses, decimals, aliases)
+        registry.fingerprint = source
+        registry.save(path)
+        return registry
+
+    @classmethod
+    def load(cls, path: str) -> "TokenRegistry":
+        with open(path) as f:
+            data = json.load(f)
+        if data.get("version") != REGISTRY_VERSION:
+            raise ValueError(f"Token registry version {data.get('version')}, expected {REGISTRY_VERSION}")
+        tokens = [Token(t["symbol"], t["address"], t["decimals"], tuple(t.get("aliases", ())), t.get("prohibited", False))
+                  for t in data["tokens"]]
+        return cls(tokens, data.get("fingerprint", ''))
+
+    def save(self, path: str):
+        """Write the registry (atomically) with its version stamp"""
+        data = {
+            "version": REGISTRY_VERSION,
+            "fingerprint": self.fingerprint,
+            "saved_at": time.time(),
+            "tokens": [token._asdict() for token in self.tokens.values()],
+        }
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(data, f, indent=2)
+        os.replace(tmp_path, path)
+
+    async def resolve_missing(self, fetch_decimals: Callable[[str], Awaitable[int]],
+                              path: Optional[str] = None) -> List[str]:
+        """Fetch decimals for tokens that don't have them yet and save the registry
+
+        Args:
+            fetch_decimals: Coroutine function returning a token's decimals by symbol (e.g. the MCP tool)
+            path: Cache file to update
+
+        Returns:
+            Symbols that were resolved
+        """
+        resolved = []
+        for token in list(self.tokens.values()):
+            if token.decimals is not None or token.prohibited:
+                continue
+            try:
+                self.add(token._replace(decimals=int(await fetch_decimals(token.symbol))))
+                resolved.append(token.symbol)
+            except Exception as e:
+                logger.warning(f"Could not resolve decimals of {token.symbol}: {e}")
+        if resolved and path:
+            self.save(path)
+        return resolved
+
+    def get(self, name: str) -> Optional[Token]:
+        """Token traded for a name, case-insensitive
+
+        Aliases win over symbols, as in IntentParser: "MATIC" resolves to
+        WMATIC, the token actually traded.
+        """
+        name = name.lower().lstrip('$')
+        symbol = self._aliases.get(name) or self._symbols.get(name)
+        return self.tokens.get(symbol) if symbol else None
+
+    def by_address(self, address: str) -> Optional[Token]:
+        symbol = self._addresses.get(address.lower())
+        return self.tokens.get(symbol) if symbol else None
+
+    def decimals(self, symbol: str) -> Optional[int]:
+        token = self.tokens.get(symbol)
+        return token.decimals if token else None
+
+    def addresses(self) -> Dict[str, str]:
+        """Symbol -> address mapping in the TOKEN_ADDRESSES format"""
+        return {symbol: token.address for symbol, token in self.tokens.items()}
+
+    def relevant(self, text: str, always: Iterable[str] = ('USDC',)) -> List[Token]:
+        """Tokens mentioned in a text (by symbol or alias), plus the `always` symbols"""
+        symbols = [symbol for symbol in always if symbol in self.tokens]
+        for match in _WORD.finditer(text):
+            name = match.group(1).lower().rstrip('.')
+            for symbol in (self._symbols.get(name), self._aliases.get(name)):
+                if symbol and symbol not in symbols:
+                    symbols.append(symbol)
+        return [self.tokens[symbol] for symbol in symbols]
+
+    def prompt_table(self, tokens: Iterable[Token]) -> str:
+        """Token lines for an LLM prompt"""
+        lines = []
+        for token in tokens:
+            if token.prohibited:
+                lines.append(f"- {token.symbol}: PROHIBITED, never use it for any transaction")
+                continue
+            aliases = f" (also written {', '.join(token.aliases)})" if token.aliases else ""
+            decimals = f"{token.decimals} decimals" if token.decimals is not None else "decimals unknown, use get_token_decimals"
+            lines.append(f"- {token.symbol}{aliases}: address {token.address}, {decimals}")
+        return "\n".join(lines)
+
+
+def fingerprint(addresses: Dict[str, str], decimals: Dict[str, int], aliases: Dict[str, str]) -> str:
+    """Digest of the registry source, stored in the cache to detect changes"""
+    source = json.dumps([REGISTRY_VERSION, sorted(addresses.items()), sorted(decimals.items()),
+                         sorted(aliases.items())])
+    return hashlib.sha256(source.encode()).hexdigest()[:16]
@@ -0,0 +1,336 @@
+#!/usr/bin/env python3
+import json
+import time
+from contextlib import asynccontextmanager
+from decimal import Decimal, InvalidOperation
+from typing import Any, Dict, List, Optional
+
+from intent_parser import TradeIntent
+
+# 1inch v6 aggregation router on Polygon, the spender for swap approvals
+ONEINCH_ROUTER = '0x111111125421cA6dc452d289314280a0f8842A65'
+
+# Polygon MCP tool names, keyed by what the executor uses them for
+DEFAULT_TOOLS = {
+    'decimals': 'get_token_decimals',
+    'balance': 'get_token_balance',
+    'allowance': 'check_allowance',
+    'approve': 'approve_token',
+    'quote': 'inch_quote',
+    'swap': 'inch_swap',
+}
+
+
+class TradeRejected(Exception):
+    """The trade breaks a trading rule and must not be executed"""
+
+
+class UnsupportedTrade(Exception):
+    """The executor can't carry out this intent deterministically (leave it to the agent)"""
+
+
+class ToolError(Exception):
+    """An MCP tool call returned an error"""
+
+
+class SwapUnconfirmed(Exception):
+    """The approve or swap call failed in a way that doesn't rule out a sent swap
+
+    The risk reservation is kept; `value` is the trade's notional in USDC.
+    """
+
+    def __init__(self, message: str, value: Decimal):
+        super().__init__(message)
+        self.value = value
+
+
+class TradeExecutor:
+    """Execute structured trade intents by calling Polygon MCP tools directly
+
+    The session can be anything with an async `call_tool(name, arguments)`
+    returning an MCP CallToolResult: an `mcp.ClientSession`, a Fast-Agent
+    agent (with tool_prefix="polygon-"), or a stub server session.
+    """
+
+    def __init__(self,
+                 session: Any,
+                 tokens: Dict[str, str],
+                 trade_limit_usdc: float,
+                 quote_token: str = 'USDC',
+                 spender: str = ONEINCH_ROUTER,
+                 slippage: float = 1.0,
+                 tool_prefix: str = '',
+                 tools: Optional[Dict[str, str]] = None,
+                 metrics: Any = None,
+                 trace: Any = None,
+                 registry: Any = None,
+                 market: Any = None,
+                 risk: Any = None,
+                 author: Any = None):
+        """Initialize the executor
+
+        Args:
+            session: MCP session used to call the Polygon tools
+            tokens: Token symbol to address mapping (e.g. TOKEN_ADDRESSES)
+            trade_limit_usdc: Maximum value of a single trade in USDC
+            quote_token: Symbol every trade is made against
+            spender: Address allowed to spend tokens for the swap
+            slippage: Swap slippage in percent
+            tool_prefix: Prefix for tool names (Fast-Agent namespaces tools as "<server>-<tool>")
+            tools: Overrides for DEFAULT_TOOLS
+            metrics: Optional Metrics registry timing each tool call (mcp_tool_seconds)
+            trace: Optional event Trace marked when the swap is submitted
+            registry: Optional TokenRegistry answering decimals locally instead of via the decimals tool
+            market: Optional QuotePrefetcher whose fresh quotes and allowances save tool calls
+            risk: Optional RiskEngine the trade's notional is reserved with before the swap
+            author: Author the trade is counted for by the risk engine
+        """
+        self.session = session
+        self.tokens = tokens
+        self.trade_limit_usdc = Decimal(str(trade_limit_usdc))
+        self.quote_token = quote_token
+        self.spender = spender
+        self.slippage = slippage
+        self.tool_prefix = tool_prefix
+        self.tools = {**DEFAULT_TOOLS, **(tools or {})}
+        self.metrics = metrics
+        self.trace = trace
+        self.registry = registry
+        self.market = market
+        self.risk = risk
+        self.author = author
+        self._decimals: Dict[str, int] = {}
+
+    async def execute(self, intent: TradeIntent) -> Dict[str, Any]:
+        """Check and execute a trade intent
+
+        Args:
+            intent: Parsed trade intent
+
+        Returns:
+            Summary of the executed trade including the swap tool result
+
+        Raises:
+            TradeRejected: The trade breaks the limit or uses a prohibited token
+            RiskLimitExceeded: The trade would break a risk limit (a TradeRejected)
+            UnsupportedTrade: The intent needs the agent (e.g. size not in USDC for a buy)
+            ToolError: An MCP tool failed
+            SwapUnconfirmed: Approve or swap failed other than with a tool error, the swap may have been sent
+        """
+        self.validate(intent)
+
+        token_address = self.tokens[intent.token]
+        quote_address = self.tokens[self.quote_token]
+
+        if intent.side == 'buy':
+            if intent.unit != self.quote_token:
+                raise UnsupportedTrade(f"Buy size must be given in {self.quote_token}")
+            from_address, to_address = quote_address, token_address
+            amount = await self.to_base_units(self.quote_token, intent.amount)
+            value = Decimal(str(intent.amount))
+        else:
+            from_address, to_address = token_address, quote_address
+            amount = await self._sell_amount(intent)
+            value = await self.quote_value(intent.token, amount)
+
+        if value > self.trade_limit_usdc:
+            raise TradeRejected(
+                f"Trade value {value} {self.quote_token} exceeds limit of {self.trade_limit_usdc} {self.quote_token}")
+        if amount <= 0:
+            raise TradeRejected("Trade amount must be positive")
+
+        reservation = self.risk.reserve(self.author, value) if self.risk is not None else None
+        if self.trace:
+            self.trace.mark("reserved")
+        try:
+            approved = await self.ensure_allowance(from_address, amount)
+            result = await self.call(self.tools['swap'], {
+                'fromTokenAddress': from_address,
+                'toTokenAddress': to_address,
+                'amount': str(amount),
+                'slippage': self.slippage,
+            })
+        except ToolError:
+            # The tool refused, no swap was sent
+            if reservation is not None:
+                self.risk.release(reservation)
+            raise
+        except Exception as e:
+            # Timeout, lost connection, ...: it may have been sent, keep counting it
+            raise SwapUnconfirmed(f"Swap outcome unknown ({str(e) or type(e).__name__})", value) from e
+        if self.trace:
+            self.trace.mark("tx_submitted")
+        if self.market is not None:
+            self.market.spent(from_address, self.spender, amount)
+
+        return {
+            'side': intent.side,
+            'token': intent.token,
+            'amount': str(amount),
+            'value_usdc': str(value),
+            'approved': approved,
+            'result': result,
+        }
+
+    def validate(self, intent: TradeIntent):
+        """Trading rules that don't need any tool calls"""
+        if intent.side not in ('buy', 'sell'):
+            raise TradeRejected("No trade side")
+        for symbol in (intent.token, intent.unit):
+            if symbol in self.tokens and self.tokens[symbol] == 'DO_NOT_USE':
+                raise TradeRejected(f"{symbol} is prohibited for any transactions")
+        if intent.token not in self.tokens:
+            raise TradeRejected(f"Unknown token: {intent.token}")
+        if intent.token == self.quote_token:
+            raise UnsupportedTrade(f"Can't trade {self.quote_token} against itself")
+        if intent.unit not in (intent.token, self.quote_token, 'all', '%'):
+            raise UnsupportedTrade(f"Unsupported amount unit: {intent.unit}")
+        if intent.unit in (intent.token, self.quote_token, '%') and not intent.amount:
+            raise UnsupportedTrade("No trade amount")
+        if intent.unit == '%' and not 0 < intent.amount <= 100:
+            raise TradeRejected(f"Invalid percentage: {intent.amount}")
+
+    async def _sell_amount(self, intent: TradeIntent) -> int:
+        if intent.unit == intent.token:
+            return await self.to_base_units(intent.token, intent.amount)
+        if intent.unit in ('all', '%'):
+            balance = await self.balance(intent.token)
+            if intent.unit == '%':
+                return int(balance * Decimal(str(intent.amount)) / 100)
+            return balance
+        raise UnsupportedTrade(f"Sell size must be given in {intent.token}")
+
+    async def decimals(self, symbol: str) -> int:
+        """Token decimals, from the registry or fetched once per token"""
+        if symbol not in self._decimals and self.registry is not None:
+            decimals = self.registry.decimals(symbol)
+            if decimals is not None:
+                self._decimals[symbol] = decimals
+        if symbol not in self._decimals:
+            result = await self.call(self.tools['decimals'], {'tokenAddress': self.tokens[symbol]})
+            self._decimals[symbol] = int(_number(result, 'decimals'))
+        return self._decimals[symbol]
+
+    async def to_base_units(self, symbol: str, amount: float) -> int:
+        """Convert a human amount to the token's smallest unit"""
+        decimals = await self.decimals(symbol)
+        return int(Decimal(str(amount)) * (Decimal(10) ** decimals))
+
+    async def balance(self, symbol: str) -> int:
+        """Wallet balance of a token in its smallest unit"""
+        result = await self.call(self.tools['balance'], {'tokenAddress': self.tokens[symbol]})
+        return int(_number(result, 'balance', 'rawBalance'))
+
+    async def quote(self, from_address: str, to_address: str, amount: int) -> int:
+        """1inch quote: how much of `to_address` (smallest unit) `amount` of `from_address` buys"""
+        result = await self.call(self.tools['quote'], {
+            'fromTokenAddress': from_address,
+            'toTokenAddress': to_address,
+            'amount': str(amount),
+        })
+        return int(_number(result, 'toAmount', 'dstAmount', 'toTokenAmount'))
+
+    async def quote_value(self, symbol: str, amount: int) -> Decimal:
+        """Value of `amount` (smallest unit) of a token in the quote token"""
+        if self.market is not None:
+            await self.market.wait(self.tokens[symbol])
+            value = self.market.quote_value(symbol, amount)
+            if value is not None:
+                return value
+        out = await self.quote(self.tokens[symbol], self.tokens[self.quote_token], amount)
+        decimals = await self.decimals(self.quote_token)
+        return Decimal(out) / (Decimal(10) ** decimals)
+
+    async def allowance(self, token_address: str) -> int:
+        """Amount the spender may move of a token"""
+        result = await self.call(self.tools['allowance'], {
+            'tokenAddress': token_address,
+            'spenderAddress': self.spender,
+        })
+        return int(_number(result, 'allowance'))
+
+    async def ensure_allowance(self, token_address: str, amount: int) -> bool:
+        """Approve the spender if the current allowance is too low
+
+        Returns:
+            True if an approval transaction was sent
+        """
+        if self.market is not None:
+            await self.market.wait(token_address)
+            if self.market.allowance_covers(token_address, self.spender, amount):
+                return False
+        allowance = await self.allowance(token_address)
+        if self.market is not None:
+            self.market.set_allowance(token_address, self.spender, allowance)
+        if allowance >= amount:
+            return False
+        await self.call(self.tools['approve'], {
+            'tokenAddress': token_address,
+            'spenderAddress': self.spender,
+            'amount': str(amount),
+        })
+        if self.market is not None:
+            self.market.set_allowance(token_address, self.spender, amount)
+        return True
+
+    async def call(self, tool: str, arguments: Dict[str, Any]) -> Any:
+        """Call a Polygon MCP tool and decode its text content (JSON if possible)"""
+        start = time.perf_counter()
+        result = await self.session.call_tool(self.tool_prefix + tool, arguments)
+        if self.metrics:
+            self.metrics.observe("mcp_tool_seconds", time.perf_counter() - start, {"tool": tool})
+        text = "".join(getattr(item, 'text', '') for item in getattr(result, 'content', []) or [])
+        if getattr(result, 'isError', False):
+            raise ToolError(f"{tool} failed: {text}")
+        try:
+            return json.loads(text)
+        except ValueError:
+            return text
+
+
+def _number(result: Any, *keys: str) -> Decimal:
+    """Pull a number out of a tool result: a JSON number or one of the named fields of a JSON object
+
+    Anything else (e.g. prose mentioning an address or another amount) is a
+    ToolError rather than a guess, since the number sizes or limits a trade.
+    """
+    if isinstance(result, dict):
+        for key in keys:
+            if key in result:
+                return _decimal(result[key], result)
+        raise ToolError(f"None of {keys} in tool result: {result}")
+    if isinstance(result, (int, float)) and not isinstance(result, bool):
+        return _decimal(result, result)
+    raise ToolError(f"Expected a JSON number or one of {keys}, got: {result}")
+
+
+def _decimal(value: Any, result: Any) -> Decimal:
+    """A finite number, or a string of one (token amounts are often sent as strings)"""
+    if isinstance(value, bool) or not isinstance(value, (int, float, str)):
+        raise ToolError(f"Not a number in tool result: {result}")
+    try:
+        number = Decimal(str(value).strip())
+    except InvalidOperation:
+        raise ToolError(f"Not a number in tool result: {result}")
+    if not number.is_finite():
+        raise ToolError(f"Not a number in tool result: {result}")
+    return number
+
+
+@asynccontextmanager
+async def open_mcp_session(command: str = "node", args: Optional[List[str]] = None, env: Optional[Dict[str, str]] = None):
+    """Open a direct MCP client session to a stdio server (the Polygon MCP server or a stub)
+
+    Args:
+        command: Server command
+        args: Server arguments, defaults to the Polygon MCP server from fastagent.config.yaml
+        env: Extra environment for the server process
+    """
+    from mcp import ClientSession, StdioServerParameters
+    from mcp.client.stdio import stdio_client
+
+    params = StdioServerParameters(command=command, args=args or ["./polygon-mcp/build/index.js"], env=env)
+    async with stdio_client(params) as (read, write):
+        async with ClientSession(read, write) as session:
+            await session.initialize()
+            yield session
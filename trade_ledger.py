@@ -0,0 +1,218 @@
+#!/usr/bin/env python3
+import re
+import json
+import time
+import sqlite3
+import asyncio
+import logging
+import argparse
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+
+logger = logging.getLogger("trade-ledger")
+
+# Decisions whose notional counts against the risk limits (*_unknown: the swap may have been sent)
+TRADED = ('executed', 'executed_unknown', 'agent_traded', 'agent_unknown')
+
+TX_HASH = re.compile(r"0x[0-9a-fA-F]{64}")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS trades (
+    id INTEGER PRIMARY KEY,
+    ts REAL NOT NULL,
+    event_id TEXT,
+    author TEXT,
+    decision TEXT NOT NULL,
+    source TEXT,
+    side TEXT,
+    token TEXT,
+    amount REAL,
+    unit TEXT,
+    value_usdc REAL,
+    reason TEXT,
+    tx_hash TEXT,
+    timings TEXT
+);
+CREATE INDEX IF NOT EXISTS trades_ts ON trades (ts);
+CREATE INDEX IF NOT EXISTS trades_author_ts ON trades (author, ts);
+"""
+
+COLUMNS = ('ts', 'event_id', 'author', 'decision', 'source', 'side', 'token', 'amount', 'unit',
+           'value_usdc', 'reason', 'tx_hash', 'timings')
+
+
+def tx_hash(result: Any) -> Optional[str]:
+    """Transaction hash in a swap tool result or an agent response, if any"""
+    if isinstance(result, dict):
+        for key in ('txHash', 'tx_hash', 'hash', 'transactionHash'):
+            if isinstance(result.get(key), str):
+                return result[key]
+    match = TX_HASH.search(result if isinstance(result, str) else json.dumps(result, default=str))
+    return match.group() if match else None
+
+
+class TradeLedger:
+    """Append-only record of trade decisions in SQLite (WAL)
+
+    One row per cast that got as far as a trade decision: the intent, the
+    decision (executed, rejected, expired, ...), the tx hash and the stage
+    timings. `record` only appends the row to a buffer; buffered rows are
+    written in one transaction by `flush`, which `run` calls every
+    `flush_interval` seconds (and `record` when `batch_size` rows are
+    waiting). Rows of submitted swaps should be recorded with `sync=True`,
+    since the risk limits are rebuilt from them after a restart.
+    """
+
+    def __init__(self, path: str = "trades.db", batch_size: int = 100, flush_interval: float = 1.0):
+        """Initialize the ledger
+
+        Args:
+            path: SQLite database file
+            batch_size: Buffered rows that trigger a flush
+            flush_interval: Seconds between flushes in `run`
+        """
+        self.path = path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._pending: List[Tuple[Any, ...]] = []
+        self._lock = threading.Lock()
+        self.recorded = 0
+        self.flushes = 0
+
+        self._db = sqlite3.connect(path, isolation_level=None, check_same_thread=False, timeout=5.0)
+        self._db.row_factory = sqlite3.Row
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.executescript(SCHEMA)
+
+    def record(self,
+               decision: str,
+               intent: Any = None,
+               event_id: Optional[str] = None,
+               author: Any = None,
+               source: Optional[str] = None,
+               value_usdc: Any = None,
+               reason: Optional[str] = None,
+               tx_hash: Optional[str] = None,
+               timings: Optional[Dict[str, float]] = None,
+               ts: Optional[float] = None,
+               sync: bool = False):
+        """Append a decision
+
+        Args:
+            decision: What happened (e.g. "executed", "rejected", "risk_rejected", "expired", "agent")
+            intent: TradeIntent the decision was made on, if any
+            event_id: Dedup id of the event
+            author: Author fid (or username) of the cast
+            source: Where the intent came from (fast path, cached, model classification, ...)
+            value_usdc: Notional of the trade in USDC
+            reason: Rejection or failure message
+            tx_hash: Hash of the swap transaction
+            timings: Seconds since the event arrived, by stage
+            ts: Epoch seconds of the decision (default: now)
+            sync: Write the row (and everything buffered) right away
+        """
+        self._pending.append((
+            ts if ts is not None else time.time(), event_id, str(author) if author is not None else None,
+            decision, source,
+            getattr(intent, 'side', None), getattr(intent, 'token', None), getattr(intent, 'amount', None),
+            getattr(intent, 'unit', None),
+            float(value_usdc) if value_usdc is not None else None, reason, tx_hash,
+            json.dumps({stage: round(seconds, 4) for stage, seconds in timings.items()}) if timings else None,
+        ))
+        self.recorded += 1
+        if sync or len(self._pending) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        """Write buffered rows in one transaction"""
+        if not self._pending:
+            return
+        rows, self._pending = self._pending, []
+        with self._lock:
+            self._db.execute("BEGIN")
+            try:
+                self._db.executemany(
+                    f"INSERT INTO trades ({', '.join(COLUMNS)}) VALUES ({', '.join('?' * len(COLUMNS))})", rows)
+                self._db.execute("COMMIT")
+            except Exception:
+                self._db.execute("ROLLBACK")
+                self._pending[:0] = rows
+                raise
+        self.flushes += 1
+
+    async def run(self):
+        """Flush every `flush_interval` seconds until cancelled"""
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            try:
+                self.flush()
+            except sqlite3.Error as e:
+                logger.warning(f"Trade ledger flush failed, retrying: {e}")
+
+    def recent(self, limit: int = 50, author: Any = None, decision: Optional[str] = None,
+               since: Optional[float] = None) -> List[Dict[str, Any]]:
+        """Latest decisions first, optionally of one author, one decision type or since a time"""
+        self.flush()
+        clauses, params = [], []
+        for column, value in (('author', author), ('decision', decision)):
+            if value is not None:
+                clauses.append(f"{column} = ?")
+                params.append(str(value) if column == 'author' else value)
+        if since is not None:
+            clauses.append("ts >= ?")
+            params.append(since)
+        where = f"WHERE {' AND '.join(clauses)} " if clauses else ""
+        with self._lock:
+            rows = self._db.execute(f"SELECT * FROM trades {where}ORDER BY ts DESC LIMIT ?",
+                                    (*params, limit)).fetchall()
+        return [dict(row) for row in rows]
+
+    def traded_since(self, since: float) -> List[Tuple[float, str, float]]:
+        """(timestamp, author, value) of trades since a time, oldest first (see RiskEngine.load)"""
+        self.flush()
+        with self._lock:
+            rows = self._db.execute(
+                f"SELECT ts, author, value_usdc FROM trades WHERE ts >= ? AND decision IN ({', '.join('?' * len(TRADED))}) "
+                "AND value_usdc IS NOT NULL ORDER BY ts", (since, *TRADED)).fetchall()
+        return [tuple(row) for row in rows]
+
+    def summary(self, since: float) -> Dict[str, Dict[str, float]]:
+        """Decision counts and notional since a time"""
+        self.flush()
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT decision, COUNT(*), COALESCE(SUM(value_usdc), 0) FROM trades WHERE ts >= ? GROUP BY decision",
+                (since,)).fetchall()
+        return {decision: {"count": count, "value_usdc": value} for decision, count, value in rows}
+
+    def close(self):
+        self.flush()
+        with self._lock:
+            self._db.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Show recent trade decisions")
+    parser.add_argument("--db", default="trades.db")
+    parser.add_argument("--limit", type=int, default=20)
+    parser.add_argument("--author", help="Only casts of this author (fid)")
+    parser.add_argument("--decision", help="Only this decision (e.g. executed, risk_rejected)")
+    parser.add_argument("--hours", type=float, default=24, help="Summary window")
+    args = parser.parse_args()
+
+    ledger = TradeLedger(args.db)
+    for row in ledger.recent(args.limit, author=args.author, decision=args.decision):
+        when = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(row['ts']))
+        trade = f"{row['side']} {row['token']} {row['amount']} {row['unit']}" if row['side'] else "-"
+        value = f"{row['value_usdc']:.4f} USDC" if row['value_usdc'] is not None else ""
+        print(f"{when}  {row['decision']:<14} {row['author'] or '-':<10} {trade:<28} {value:<14} "
+              f"{row['tx_hash'] or row['reason'] or ''}")
+    print(f"\nLast {args.hours:g}h:")
+    for decision, totals in sorted(ledger.summary(time.time() - args.hours * 3600).items()):
+        print(f"  {decision:<14} {totals['count']:>6}  {totals['value_usdc']:.4f} USDC")
+    ledger.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,165 @@
+import time
+import sqlite3
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Dict, Any, Optional
+
+
+def event_key(event_data: Dict[str, Any], body: Optional[bytes] = None) -> str:
+    """Stable identifier of a webhook event
+
+    Casts are identified by their hash, which Neynar keeps across redeliveries.
+    Events without a hash fall back to a digest of the raw body.
+
+    Args:
+        event_data: Parsed event data
+        body: Raw request body
+    """
+    data = event_data.get('data') or {}
+    event_id = data.get('hash') or event_data.get('id')
+    if event_id:
+        return f"{event_data.get('type')}:{event_id}"
+    if body is None:
+        body = repr(sorted(event_data.items())).encode('utf-8')
+    return f"{event_data.get('type')}:sha1:{hashlib.sha1(body).hexdigest()}"
+
+
+class MemoryDedupStore:
+    """In-process dedup store with TTL and size-bounded eviction
+
+    Keys are kept in insertion order, so with a single TTL the oldest entry
+    is always the first to expire and both eviction rules are O(1). Past
+    `max_items` the first-seen id goes (FIFO), deliberately not the least
+    recently seen: a redelivery neither extends an id's TTL nor its place.
+    """
+
+    def __init__(self, ttl: float = 24 * 3600, max_items: int = 1_000_000):
+        """Initialize the store
+
+        Args:
+            ttl: Seconds an event id is remembered
+            max_items: Maximum number of remembered ids (bounds memory, roughly 150 bytes per id)
+        """
+        self.ttl = ttl
+        self.max_items = max_items
+        self._expiry = OrderedDict()
+
+    def add(self, key: str) -> bool:
+        """Remember an event id
+
+        Returns:
+            True if the id is new, False if it was already seen
+        """
+        now = time.time()
+        self._evict(now)
+        if key in self._expiry:
+            return False
+        self._expiry[key] = now + self.ttl
+        if len(self._expiry) > self.max_items:
+            self._expiry.popitem(last=False)
+        return True
+
+    def discard(self, key: str):
+        """Forget an event id (e.g. when it couldn't be queued)"""
+        self._expiry.pop(key, None)
+
+    def __contains__(self, key: str) -> bool:
+        expires = self._expiry.get(key)
+        return expires is not None and expires > time.time()
+
+    def __len__(self) -> int:
+        return len(self._expiry)
+
+    def _evict(self, now: float):
+        expiry = self._expiry
+        while expiry:
+            key, expires = next(iter(expiry.items()))
+            if expires > now:
+                break
+            expiry.popitem(last=False)
+
+
+class SQLiteDedupStore:
+    """Persistent dedup store shared by processes through a SQLite file
+
+    Survives restarts, so Neynar redeliveries after a deploy are still
+    recognized. Uses WAL mode so several worker processes can use the
+    same file concurrently.
+    """
+
+    def __init__(self, path: str = "processed_events.db", ttl: float = 24 * 3600,
+                 purge_every: int = 1000, max_items: int = 1_000_000):
+        """Initialize the store
+
+        Args:
+            path: SQLite database file
+            ttl: Seconds an event id is remembered
+            purge_every: Delete expired ids, and the oldest ones past `max_items`, after this many inserts
+            max_items: Maximum number of remembered ids, exceeded by at most `purge_every` between purges
+        """
+        self.path = path
+        self.ttl = ttl
+        self.purge_every = purge_every
+        self.max_items = max_items
+        self._inserts = 0
+        self._lock = threading.Lock()
+
+        self._db = sqlite3.connect(path, isolation_level=None, check_same_thread=False, timeout=5.0)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS processed_events ("
+            "event_id TEXT PRIMARY KEY, expires REAL NOT NULL) WITHOUT ROWID"
+        )
+        # Purges walk the ids by age instead of scanning the table
+        self._db.execute("CREATE INDEX IF NOT EXISTS processed_events_expires ON processed_events (expires)")
+
+    def add(self, key: str) -> bool:
+        """Remember an event id (atomic across processes)
+
+        Returns:
+            True if the id is new or had expired, False if it was already seen
+        """
+        now = time.time()
+        with self._lock:
+            cursor = self._db.execute(
+                "INSERT INTO processed_events (event_id, expires) VALUES (?, ?) "
+                "ON CONFLICT(event_id) DO UPDATE SET expires = excluded.expires "
+                "WHERE processed_events.expires <= ?",
+                (key, now + self.ttl, now),
+            )
+            added = cursor.rowcount == 1
+            self._inserts += added
+            if added and self._inserts % self.purge_every == 0:
+                self._purge(now)
+        return added
+
+    def _purge(self, now: float):
+        self._db.execute("DELETE FROM processed_events WHERE expires <= ?", (now,))
+        # With a single TTL the earliest expiry is the oldest id, as in MemoryDedupStore
+        self._db.execute(
+            "DELETE FROM processed_events WHERE event_id IN ("
+            "SELECT event_id FROM processed_events ORDER BY expires DESC LIMIT -1 OFFSET ?)",
+            (self.max_items,),
+        )
+
+    def discard(self, key: str):
+        """Forget an event id (e.g. when it couldn't be queued)"""
+        with self._lock:
+            self._db.execute("DELETE FROM processed_events WHERE event_id = ?", (key,))
+
+    def __contains__(self, key: str) -> bool:
+        with self._lock:
+            row = self._db.execute(
+                "SELECT 1 FROM processed_events WHERE event_id = ? AND expires > ?",
+                (key, time.time()),
+            ).fetchone()
+        return row is not None
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._db.execute("SELECT COUNT(*) FROM processed_events").fetchone()[0]
+
+    def close(self):
+        self._db.close()
@@ -0,0 +1,337 @@
+"""Multi-source signal bus
+
+Source adapters (see signal_sources.py) turn whatever they ingest - Neynar
+webhooks, polled casts, news files, recordings - into SignalEvents and
+publish them concurrently; one consumer drops the ones already seen from
+another source and hands the rest to a handler with the webhook event
+shape ({"type": "cast.created", "data": {...}}), so existing callbacks
+such as a KeyedScheduler keep working unchanged.
+
+    bus = EventBus(KeyedScheduler(handle_event), max_in_flight=64)
+    webhook = WebhookSource(bus)
+    server = WebhookServer(callback=webhook)
+    webhook.on_drop = server.forget  # Acknowledged casts the full bus drops can be redelivered
+    await bus.start([webhook, PollingSource(bus, poller), NewsFileSource(bus, "news.jsonl")])
+    ...
+    await bus.stop()
+
+Per source, the bus counts published, duplicate, dropped, handled and
+failed events and measures lag from publication (when the cast was posted
+or the item published) to the consumer picking the event up.
+"""
+import re
+import time
+import asyncio
+import hashlib
+import logging
+from datetime import datetime, timezone
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, NamedTuple, Optional
+
+from dedup_store import MemoryDedupStore
+from event_priority import cast_time
+from metrics import METRICS, Metrics, set_current_trace, reset_current_trace
+
+logger = logging.getLogger("event-bus")
+
+# Event kinds
+CAST = "cast"
+NEWS = "news"
+
+_URL = re.compile(r"https?://\S+")
+_NON_WORD = re.compile(r"[\W_]+")
+
+
+def story_key(text: str) -> Optional[str]:
+    """Fingerprint of a story's text: lowercased words without URLs and punctuation
+
+    None for texts too short (under 4 words) to tell two stories apart.
+    """
+    words = _NON_WORD.sub(" ", _URL.sub(" ", text.lower())).split()
+    if len(words) < 4:
+        return None
+    return hashlib.sha1(" ".join(words).encode()).hexdigest()
+
+
+def canonical_url(url: str) -> str:
+    """URL without scheme, "www.", query string, fragment and trailing slash"""
+    url = re.sub(r"^https?://(www\.)?", "", url.strip().lower())
+    return re.split(r"[?#]", url, 1)[0].rstrip("/")
+
+
+class SignalEvent(NamedTuple):
+    """A normalized signal from any source
+
+    For casts, `id` is the cast hash and `data` the cast itself; for news,
+    `id` is the item's guid (or link) and `author` is {"source": name}.
+    """
+    source: str                     # Adapter that published it (e.g. "webhook", "poll", "news:coindesk")
+    kind: str                       # CAST or NEWS
+    id: str
+    text: str
+    author: Dict[str, Any]
+    published_at: Optional[float]   # Epoch seconds the cast was posted / the item published
+    received_at: float              # Epoch seconds the adapter got it
+    url: Optional[str] = None
+    data: Optional[Dict[str, Any]] = None
+    trace: Any = None               # Stage trace started by the adapter, continued by the bus
+
+    @classmethod
+    def from_cast_event(cls, event_data: Dict[str, Any], source: str, trace: Any = None) -> Optional["SignalEvent"]:
+        """SignalEvent of a webhook-shaped cast event, None for other event types"""
+        if event_data.get('type') != 'cast.created':
+            return None
+        cast = event_data.get('data') or {}
+        return cls(source, CAST, cast.get('hash') or '', cast.get('text') or '', cast.get('author') or {},
+                   cast_time(event_data), time.time(), data=cast, trace=trace)
+
+    def keys(self) -> List[str]:
+        """Dedup keys: the same key from two sources means the same signal
+
+        Casts are matched by hash only (an author may well post the same command
+        twice); news items by guid, URL and text, so a story carried by several
+        feeds is handled once.
+        """
+        if self.kind == CAST:
+            return [f"cast:{self.id}"] if self.id else []
+        keys = [f"{self.kind}:{self.source}:{self.id}"] if self.id else []
+        if self.url:
+            keys.append(f"url:{canonical_url(self.url)}")
+        story = story_key(self.text)
+        if story:
+            keys.append(f"story:{story}")
+        return keys
+
+    def to_event(self) -> Dict[str, Any]:
+        """Webhook-shaped event for handlers written for Neynar casts"""
+        if self.kind == CAST and self.data is not None:
+            data = self.data
+        else:
+            published = self.published_at if self.published_at is not None else self.received_at
+            data = {
+                'hash': self.id,
+                'text': self.text,
+                'timestamp': datetime.fromtimestamp(published, timezone.utc).isoformat().replace('+00:00', 'Z'),
+                'author': self.author,
+                'url': self.url,
+            }
+        return {'type': 'cast.created', 'created_at': int(self.received_at), 'source': self.source,
+                'kind': self.kind, 'data': data}
+
+
+class SourceStats:
+    """Counters of one source"""
+    __slots__ = ("published", "duplicates", "dropped", "handled", "failed", "lag_total", "lag_max", "first", "last")
+
+    def __init__(self):
+        self.published = self.duplicates = self.dropped = self.handled = self.failed = 0
+        self.lag_total = self.lag_max = 0.0
+        self.first = self.last = None
+
+    def to_dict(self) -> Dict[str, Any]:
+        seen = self.published - self.dropped
+        elapsed = (self.last - self.first) if self.first is not None and self.last > self.first else 0.0
+        return {
+            "published": self.published,
+            "duplicates": self.duplicates,
+            "dropped": self.dropped,
+            "handled": self.handled,
+            "failed": self.failed,
+            "events_per_second": self.published / elapsed if elapsed else 0.0,
+            "avg_lag_ms": self.lag_total / seen * 1000 if seen else 0.0,
+            "max_lag_ms": self.lag_max * 1000,
+        }
+
+
+class EventBus:
+    """Bounded queue of SignalEvents from many sources with a single deduplicating consumer"""
+
+    def __init__(self,
+                 handler: Callable[[Dict[str, Any]], Awaitable[None]],
+                 max_queue: int = 10000,
+                 max_in_flight: int = 64,
+                 dedup_store: Any = None,
+                 dedup_ttl: float = 24 * 3600,
+                 metrics: Optional[Metrics] = None):
+        """Initialize the bus
+
+        Args:
+            handler: Coroutine function called with the webhook-shaped event of every new signal
+            max_queue: Events waiting for the consumer; `publish` waits and `offer` drops beyond this
+            max_in_flight: Handler calls running at the same time (the consumer waits for a free one)
+            dedup_store: Store of seen signal keys (MemoryDedupStore or SQLiteDedupStore), defaults to
+                an in-memory store remembering keys for `dedup_ttl` seconds
+            dedup_ttl: Seconds a signal key is remembered by the default store
+            metrics: Registry for bus metrics, defaults to the process-wide METRICS
+        """
+        self.handler = handler
+        self.max_queue = max_queue
+        self.max_in_flight = max_in_flight
+        self.seen = dedup_store if dedup_store is not None else MemoryDedupStore(ttl=dedup_ttl)
+        self.metrics = metrics or METRICS
+        self.sources: Dict[str, SourceStats] = {}
+
+        self._queue: Optional[asyncio.Queue] = None
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._consumer: Optional[asyncio.Task] = None
+        self._source_tasks: List[asyncio.Task] = []
+        self._stoppable: List[Any] = []
+        self._handlers = set()
+
+        self.metrics.gauge("bus_queue_depth", self.depth, "Signals waiting for the bus consumer")
+        self.metrics.gauge("bus_in_flight", lambda: len(self._handlers), "Signals being handled")
+        self.metrics.describe("bus_events_total", "Signals by source and result (published, duplicate, dropped, "
+                                                  "handled, failed)")
+        self.metrics.describe("bus_lag_seconds", "Time from publication of a signal to the bus consumer, by source")
+
+    @property
+    def running(self) -> bool:
+        return self._consumer is not None
+
+    async def start(self, sources: Iterable[Any] = ()):
+        """Start the consumer and every source that has a `run()` coroutine"""
+        if not self.running:
+            self._queue = asyncio.Queue(maxsize=self.max_queue)
+            self._slots = asyncio.Semaphore(self.max_in_flight)
+            self._consumer = asyncio.create_task(self._consume(), name="event-bus")
+        for source in sources:
+            run = getattr(source, "run", None)
+            if run is not None:
+                self._source_tasks.append(asyncio.create_task(run(), name=f"source-{source.name}"))
+            if hasattr(source, "stop"):
+                self._stoppable.append(source)
+
+    async def stop(self, drain: bool = True, timeout: Optional[float] = None):
+        """Stop the sources, then the consumer
+
+        Args:
+            drain: Handle queued signals (and wait for running handlers) before stopping
+            timeout: Maximum seconds to wait for the drain, then cancel what's left
+        """
+        if not self.running:
+            return
+        for source in self._stoppable:
+            source.stop()
+        for task in self._source_tasks:
+            task.cancel()
+        await asyncio.gather(*self._source_tasks, return_exceptions=True)
+        self._source_tasks, self._stoppable = [], []
+        if drain:
+            try:
+                await asyncio.wait_for(self._drain(), timeout)
+            except asyncio.TimeoutError:
+                logger.warning(f"Bus drain timed out with {self.depth()} queued and {len(self._handlers)} "
+                               f"running signals")
+        self._consumer.cancel()
+        for task in list(self._handlers):
+            task.cancel()
+        await asyncio.gather(self._consumer, *self._handlers, return_exceptions=True)
+        self._consumer = None
+
+    async def _drain(self):
+        await self._queue.join()
+        while self._handlers:
+            await asyncio.gather(*list(self._handlers), return_exceptions=True)
+
+    def _stats(self, source: str) -> SourceStats:
+        stats = self.sources.get(source)
+        if stats is None:
+            stats = self.sources[source] = SourceStats()
+        return stats
+
+    def _published(self, event: SignalEvent) -> SourceStats:
+        stats = self._stats(event.source)
+        stats.published += 1
+        now = time.monotonic()
+        if stats.first is None:
+            stats.first = now
+        stats.last = now
+        self.metrics.inc("bus_events_total", {"source": event.source, "result": "published"})
+        return stats
+
+    async def publish(self, event: SignalEvent):
+        """Queue a signal, waiting while the queue is full (backpressure for pull-based sources)"""
+        if not self.running:
+            raise RuntimeError("Event bus is not running")
+        self._published(event)
+        await self._queue.put(event)
+
+    def offer(self, event: SignalEvent) -> bool:
+        """Queue a signal without waiting
+
+        Returns:
+            False if the queue was full and the signal was dropped
+        """
+        if not self.running:
+            raise RuntimeError("Event bus is not running")
+        stats = self._published(event)
+        try:
+            self._queue.put_nowait(event)
+            return True
+        except asyncio.QueueFull:
+            stats.dropped += 1
+            self.metrics.inc("bus_events_total", {"source": event.source, "result": "dropped"})
+            logger.warning(f"Event bus full, dropped signal {event.id} from {event.source}")
+            return False
+
+    def is_new(self, event: SignalEvent) -> bool:
+        """Remember a signal's keys; False if any of them was seen before (from any source)"""
+        keys = event.keys()
+        if any(key in self.seen for key in keys):
+            return False
+        new = True
+        for key in keys:
+            new = self.seen.add(key) and new
+        return new
+
+    async def _consume(self):
+        queue = self._queue
+        while True:
+            event = await queue.get()
+            try:
+                stats = self._stats(event.source)
+                if not self.is_new(event):
+                    stats.duplicates += 1
+                    self.metrics.inc("bus_events_total", {"source": event.source, "result": "duplicate"})
+                    continue
+                if event.published_at is not None:
+                    lag = max(0.0, time.time() - event.published_at)
+                    stats.lag_total += lag
+                    stats.lag_max = max(stats.lag_max, lag)
+                    self.metrics.observe("bus_lag_seconds", lag, {"source": event.source})
+                await self._slots.acquire()
+                task = asyncio.create_task(self._handle(event, stats))
+                self._handlers.add(task)
+                task.add_done_callback(self._handlers.discard)
+            finally:
+                queue.task_done()
+
+    async def _handle(self, event: SignalEvent, stats: SourceStats):
+        trace = event.trace if event.trace is not None else self.metrics.trace()
+        if trace.event_id is None:
+            trace.event_id = f"{event.kind}:{event.id}"
+        token = set_current_trace(trace)
+        trace.mark("bus")
+        try:
+            await self.handler(event.to_event())
+            stats.handled += 1
+            self.metrics.inc("bus_events_total", {"source": event.source, "result": "handled"})
+            trace.finish()
+        except Exception as e:
+            stats.failed += 1
+            self.metrics.inc("bus_events_total", {"source": event.source, "result": "failed"})
+            logger.error(f"Handler failed for signal {event.id} from {event.source}: {e}")
+            trace.finish("error")
+        finally:
+            reset_current_trace(token)
+            self._slots.release()
+
+    def depth(self) -> int:
+        """Signals waiting for the consumer"""
+        return self._queue.qsize() if self._queue else 0
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "depth": self.depth(),
+            "in_flight": len(self._handlers),
+            "sources": {name: stats.to_dict() for name, stats in self.sources.items()},
+        }
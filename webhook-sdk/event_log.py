@@ -0,0 +1,161 @@
+"""Non-blocking structured logging for the webhook hot path
+
+Log calls on the event loop only put the record on a queue; a
+QueueListener thread formats it as one JSON line and writes it to a size
+rotated file whose old segments are gzip-compressed.
+
+    listener = setup_logging("logs/webhook.jsonl", sample_rates={"rejected": 0.01})
+    log_event(logger, "Trade executed", stage="executed", category="trade", tx="0x...")
+    ...
+    listener.stop()  # flush on shutdown
+
+Every line carries the id of the event being handled (taken from the
+current trace) and its stage. Records with a `category` are sampled:
+rejected, unauthorized and duplicate events keep only a fraction of their
+lines (the same events for every line, chosen by event id), trade events
+and uncategorized lines are always kept.
+"""
+import os
+import gzip
+import json
+import queue
+import random
+import shutil
+import logging
+import zlib
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+from typing import Any, Dict, Optional
+
+from metrics import current_trace
+
+# Share of events kept per category; categories not listed are always kept
+DEFAULT_SAMPLE_RATES = {
+    "rejected": 0.01,
+    "unauthorized": 0.1,
+    "duplicate": 0.1,
+    "trade": 1.0,
+}
+
+# Standard LogRecord attributes, everything else on a record is an extra field
+_RECORD_ATTRS = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime"}
+
+
+def log_event(logger: logging.Logger, message: str, level: int = logging.INFO,
+              stage: Optional[str] = None, category: Optional[str] = None, **fields: Any):
+    """Log a structured line about the current event
+
+    Args:
+        logger: Logger to write to
+        message: Short human readable message
+        level: Logging level
+        stage: Processing stage of the event (e.g. "received", "executed")
+        category: Sampling category (e.g. "rejected", "trade")
+        **fields: Extra JSON fields
+    """
+    if logger.isEnabledFor(level):
+        logger.log(level, message, extra={"stage": stage, "category": category, **fields})
+
+
+class EventContextFilter(logging.Filter):
+    """Adds the current event id and samples records by category
+
+    Runs in the logging task (before the record is queued), so the event
+    id comes from the task's trace and dropped records cost no formatting.
+    """
+
+    def __init__(self, sample_rates: Optional[Dict[str, float]] = None):
+        super().__init__()
+        self.sample_rates = {**DEFAULT_SAMPLE_RATES, **(sample_rates or {})}
+        self.sampled_out = 0
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if getattr(record, "event_id", None) is None:
+            trace = current_trace()
+            record.event_id = getattr(trace, "event_id", None) if trace else None
+        rate = self.sample_rates.get(getattr(record, "category", None), 1.0)
+        if rate >= 1.0:
+            return True
+        if record.event_id is not None:
+            # Same decision for every line of an event
+            keep = zlib.crc32(str(record.event_id).encode()) % 10000 < rate * 10000
+        else:
+            keep = random.random() < rate
+        if not keep:
+            self.sampled_out += 1
+        return keep
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line: time, level, logger, message, event id, stage and extra fields"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        line = {
+            "ts": round(record.created, 6),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRS and value is not None:
+                line[key] = value
+        if record.exc_info:
+            line["exc"] = self.formatException(record.exc_info)
+        return json.dumps(line, ensure_ascii=False, default=str)
+
+
+def _gzip_rotator(source: str, dest: str):
+    with open(source, "rb") as f_in, gzip.open(dest, "wb") as f_out:
+        shutil.copyfileobj(f_in, f_out)
+    os.remove(source)
+
+
+def compressed_rotating_handler(path: str, max_bytes: int = 50 * 1024 * 1024, backups: int = 10) -> RotatingFileHandler:
+    """RotatingFileHandler whose rotated files are gzip-compressed (path.1.gz, path.2.gz, ...)"""
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    handler = RotatingFileHandler(path, maxBytes=max_bytes, backupCount=backups, encoding="utf-8")
+    handler.namer = lambda name: name + ".gz"
+    handler.rotator = _gzip_rotator
+    return handler
+
+
+def setup_logging(path: Optional[str] = None, level: int = logging.INFO,
+                  sample_rates: Optional[Dict[str, float]] = None, console: bool = True,
+                  max_bytes: int = 50 * 1024 * 1024, backups: int = 10) -> QueueListener:
+    """Route all logging through a queue to a background writer thread
+
+    Replaces the root logger's handlers. Call `stop()` on the returned
+    listener at shutdown to flush the remaining records.
+
+    Args:
+        path: JSON lines log file, rotated and compressed (None logs to the console only)
+        level: Root logging level
+        sample_rates: Share of events kept per category, merged over DEFAULT_SAMPLE_RATES
+        console: Also write human readable lines to stderr
+        max_bytes: Size at which the log file is rotated
+        backups: Rotated files kept
+    """
+    handlers = []
+    if path:
+        file_handler = compressed_rotating_handler(path, max_bytes, backups)
+        file_handler.setFormatter(JsonFormatter())
+        handlers.append(file_handler)
+    if console:
+        console_handler = logging.StreamHandler()
+        console_handler.setFormatter(logging.Formatter("%(asctime)s - %(name)s - %(levelname)s - %(message)s"))
+        handlers.append(console_handler)
+
+    log_queue = queue.SimpleQueue()
+    queue_handler = QueueHandler(log_queue)
+    queue_handler.addFilter(EventContextFilter(sample_rates))
+
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(queue_handler)
+    root.setLevel(level)
+
+    listener = QueueListener(log_queue, *handlers, respect_handler_level=True)
+    listener.start()
+    return listener
@@ -0,0 +1,86 @@
+import re
+import time
+from datetime import datetime
+from typing import Dict, Any, Optional, NamedTuple, Union
+
+
+class Urgency(NamedTuple):
+    """How much an event matters and until when it is worth handling"""
+    priority: float
+    created_at: Optional[float]  # Epoch seconds the cast was posted
+    deadline: Optional[float]    # Epoch seconds after which the event is dropped
+
+
+def cast_time(event_data: Dict[str, Any]) -> Optional[float]:
+    """Epoch seconds a cast was posted (`data.timestamp`, else the event's `created_at`)"""
+    timestamp = (event_data.get('data') or {}).get('timestamp')
+    if timestamp:
+        try:
+            return datetime.fromisoformat(timestamp.replace('Z', '+00:00')).timestamp()
+        except (TypeError, ValueError):
+            pass
+    created_at = event_data.get('created_at')
+    return float(created_at) if isinstance(created_at, (int, float)) else None
+
+
+class EventPriority:
+    """Priority and deadline of webhook events
+
+    Priority is the author's configured weight (looked up by fid, then
+    username) plus the boost of every keyword found in the cast text. The
+    deadline is `max_age` seconds after the cast was posted: a trading
+    signal older than that is dropped instead of traded on.
+
+        priority = EventPriority(authors={"0xhardman": 10}, keywords={"now": 2}, max_age=30)
+        scheduler = KeyedScheduler(handle_event, urgency=priority)
+    """
+
+    def __init__(self,
+                 authors: Optional[Dict[Union[int, str], float]] = None,
+                 keywords: Optional[Dict[str, float]] = None,
+                 default: float = 0.0,
+                 max_age: Optional[float] = 30.0):
+        """Initialize the priority rules
+
+        Args:
+            authors: Priority per author fid or username
+            keywords: Priority added when the cast contains the word (case-insensitive)
+            default: Priority of authors not listed
+            max_age: Seconds after posting an event stays worth handling (None = never expires)
+        """
+        self.authors = {}
+        for author, priority in (authors or {}).items():
+            self.authors[author.lower() if isinstance(author, str) else author] = priority
+        self.keywords = {word.lower(): boost for word, boost in (keywords or {}).items()}
+        self.default = default
+        self.max_age = max_age
+        self._keyword_re = re.compile(
+            r"(?<!\w)(" + "|".join(re.escape(word) for word in sorted(self.keywords, key=len, reverse=True)) + r")(?!\w)",
+            re.IGNORECASE) if self.keywords else None
+
+    def priority(self, event_data: Dict[str, Any]) -> float:
+        data = event_data.get('data') or {}
+        author = data.get('author') or {}
+        priority = self.authors.get(author.get('fid'))
+        if priority is None:
+            priority = self.authors.get(str(author.get('username') or '').lower(), self.default)
+        if self._keyword_re and data.get('text'):
+            found = {match.lower() for match in self._keyword_re.findall(data['text'])}
+            priority += sum(self.keywords[word] for word in found)
+        return priority
+
+    def deadline(self, event_data: Dict[str, Any]) -> Optional[float]:
+        created_at = cast_time(event_data)
+        if created_at is None or self.max_age is None:
+            return None
+        return created_at + self.max_age
+
+    def expired(self, event_data: Dict[str, Any], now: Optional[float] = None) -> bool:
+        """Whether the event is past its deadline"""
+        deadline = self.deadline(event_data)
+        return deadline is not None and (now if now is not None else time.time()) > deadline
+
+    def __call__(self, event_data: Dict[str, Any]) -> Urgency:
+        created_at = cast_time(event_data)
+        deadline = created_at + self.max_age if created_at is not None and self.max_age is not None else None
+        return Urgency(self.priority(event_data), created_at, deadline)
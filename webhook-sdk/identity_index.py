@@ -0,0 +1,272 @@
+import os
+import json
+import time
+import asyncio
+import logging
+from typing import Any, Callable, Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+logger = logging.getLogger("identity-index")
+
+INDEX_VERSION = 1
+
+# Fids per /user/bulk request (the API maximum)
+BULK_SIZE = 100
+
+
+class Identity(NamedTuple):
+    fid: int
+    username: str
+    display_name: str
+    custody_address: Optional[str]
+    verified_addresses: Tuple[str, ...]
+    updated_at: float
+
+    def as_user(self) -> Dict[str, Any]:
+        """The identity in the shape of a Neynar user object"""
+        return {
+            "fid": self.fid,
+            "username": self.username,
+            "display_name": self.display_name,
+            "custody_address": self.custody_address,
+            "verified_addresses": {"eth_addresses": list(self.verified_addresses)},
+        }
+
+
+class IdentityIndex:
+    """Local username <-> fid index with verified addresses, cached on disk
+
+    Resolving a known username or fid is a dictionary lookup. Unknown
+    usernames are looked up once (`resolve`); entries older than `max_age`
+    are refreshed in bulk, 100 fids per request (`refresh`, or `run_refresh`
+    in the background), which also picks up renamed accounts.
+
+    Usernames can change hands, fids can't: authorize by fid and use the
+    index to turn configured usernames into fids.
+
+    Methods taking a `client` work with NeynarClient (`resolve`, `refresh`)
+    or AsyncNeynarClient (`resolve_async`, `refresh_async`, `run_refresh`).
+    """
+
+    def __init__(self, path: Optional[str] = None, max_age: float = 24 * 3600):
+        """Initialize the index and load the cache file if there is one
+
+        Args:
+            path: JSON cache file (None keeps the index in memory only)
+            max_age: Seconds before an entry is refreshed
+        """
+        self.path = path
+        self.max_age = max_age
+        self._by_fid: Dict[int, Identity] = {}
+        self._by_username: Dict[str, int] = {}
+        self._by_address: Dict[str, int] = {}
+
+        # Counters
+        self.hits = 0
+        self.misses = 0
+        self.api_calls = 0
+
+        if path and os.path.exists(path):
+            self.load()
+
+    def __len__(self) -> int:
+        return len(self._by_fid)
+
+    def load(self):
+        """Read the cache file, ignoring it if it is unreadable or from another version"""
+        try:
+            with open(self.path) as f:
+                data = json.load(f)
+            if data.get("version") != INDEX_VERSION:
+                raise ValueError(f"version {data.get('version')}, expected {INDEX_VERSION}")
+            for item in data["identities"]:
+                self._add(Identity(item["fid"], item["username"], item.get("display_name", ""),
+                                   item.get("custody_address"), tuple(item.get("verified_addresses", ())),
+                                   item.get("updated_at", 0.0)))
+        except (OSError, ValueError, KeyError) as e:
+            logger.warning(f"Ignoring unreadable identity index {self.path}: {e}")
+
+    def save(self):
+        """Write the cache file (atomically)"""
+        if not self.path:
+            return
+        data = {
+            "version": INDEX_VERSION,
+            "saved_at": time.time(),
+            "identities": [identity._asdict() for identity in self._by_fid.values()],
+        }
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(data, f)
+        os.replace(tmp_path, self.path)
+
+    def get(self, fid: int) -> Optional[Identity]:
+        return self._by_fid.get(fid)
+
+    def by_username(self, username: str) -> Optional[Identity]:
+        fid = self._by_username.get(username.lstrip("@").lower())
+        if fid is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return self._by_fid[fid]
+
+    def by_address(self, address: str) -> Optional[Identity]:
+        """Identity with this custody or verified address"""
+        fid = self._by_address.get(address.lower())
+        return self._by_fid[fid] if fid is not None else None
+
+    def fid(self, username: str) -> Optional[int]:
+        identity = self.by_username(username)
+        return identity.fid if identity else None
+
+    def username(self, fid: int) -> Optional[str]:
+        identity = self._by_fid.get(fid)
+        return identity.username if identity else None
+
+    def update(self, users: Iterable[Dict[str, Any]]) -> int:
+        """Add or replace identities from Neynar user objects
+
+        Returns:
+            Number of identities that are new or changed
+        """
+        changed = 0
+        now = time.time()
+        for user in users:
+            verified = (user.get("verified_addresses") or {}).get("eth_addresses") or []
+            identity = Identity(int(user["fid"]), user.get("username", ""), user.get("display_name", ""),
+                                user.get("custody_address"), tuple(verified), now)
+            previous = self._by_fid.get(identity.fid)
+            if previous is None or previous[:-1] != identity[:-1]:
+                changed += 1
+            self._add(identity)
+        return changed
+
+    def _add(self, identity: Identity):
+        previous = self._by_fid.get(identity.fid)
+        if previous is not None:
+            # A renamed account frees its old username, which may now belong to someone else
+            if self._by_username.get(previous.username.lower()) == previous.fid:
+                del self._by_username[previous.username.lower()]
+            for address in (previous.custody_address, *previous.verified_addresses):
+                if address and self._by_address.get(address.lower()) == previous.fid:
+                    del self._by_address[address.lower()]
+        self._by_fid[identity.fid] = identity
+        if identity.username:
+            self._by_username[identity.username.lower()] = identity.fid
+        for address in (identity.custody_address, *identity.verified_addresses):
+            if address:
+                self._by_address[address.lower()] = identity.fid
+
+    def missing(self, usernames: Iterable[str]) -> List[str]:
+        """Usernames not in the index"""
+        return [name for name in usernames if name.lstrip("@").lower() not in self._by_username]
+
+    def stale(self, now: Optional[float] = None) -> List[int]:
+        """Fids whose entry is older than max_age"""
+        now = now if now is not None else time.time()
+        return [fid for fid, identity in self._by_fid.items() if now - identity.updated_at > self.max_age]
+
+    def resolve(self, client: Any, usernames: Iterable[str]) -> Dict[str, int]:
+        """Fids of usernames, looking up (and saving) only the ones not in the index
+
+        Unknown usernames are logged and left out.
+        """
+        looked_up = []
+        for name in self.missing(usernames):
+            try:
+                self.api_calls += 1
+                looked_up.append(client.lookup_user_by_username(name.lstrip("@"))["user"])
+            except Exception as e:
+                logger.warning(f"Couldn't resolve user {name}: {e}")
+        return self._resolved(usernames, looked_up)
+
+    async def resolve_async(self, client: Any, usernames: Iterable[str]) -> Dict[str, int]:
+        """Like resolve, with an AsyncNeynarClient and concurrent lookups"""
+        usernames = list(usernames)
+        missing = self.missing(usernames)
+        self.api_calls += len(missing)
+        results = await asyncio.gather(*(client.lookup_user_by_username(name.lstrip("@")) for name in missing),
+                                       return_exceptions=True)
+        looked_up = []
+        for name, result in zip(missing, results):
+            if isinstance(result, Exception):
+                logger.warning(f"Couldn't resolve user {name}: {result}")
+            else:
+                looked_up.append(result["user"])
+        return self._resolved(usernames, looked_up)
+
+    def _resolved(self, usernames: Iterable[str], looked_up: List[Dict[str, Any]]) -> Dict[str, int]:
+        if looked_up and self.update(looked_up):
+            self.save()
+        fids = {}
+        for name in usernames:
+            fid = self.fid(name)
+            if fid is not None:
+                fids[name] = fid
+        return fids
+
+    def refresh(self, client: Any, fids: Optional[Iterable[int]] = None) -> int:
+        """Re-fetch identities in bulk (default: the stale ones) and save if anything changed
+
+        Returns:
+            Number of identities that changed
+        """
+        fids = list(fids) if fids is not None else self.stale()
+        changed = 0
+        for i in range(0, len(fids), BULK_SIZE):
+            self.api_calls += 1
+            changed += self.update(client.fetch_bulk_users(fids[i:i + BULK_SIZE]).get("users", []))
+        self._refreshed(fids, changed)
+        return changed
+
+    async def refresh_async(self, client: Any, fids: Optional[Iterable[int]] = None) -> int:
+        """Like refresh, with an AsyncNeynarClient and concurrent bulk requests"""
+        fids = list(fids) if fids is not None else self.stale()
+        batches = [fids[i:i + BULK_SIZE] for i in range(0, len(fids), BULK_SIZE)]
+        self.api_calls += len(batches)
+        responses = await asyncio.gather(*(client.fetch_bulk_users(batch) for batch in batches))
+        changed = sum(self.update(response.get("users", [])) for response in responses)
+        self._refreshed(fids, changed)
+        return changed
+
+    def _refreshed(self, fids: List[int], changed: int):
+        # Entries the API didn't return (e.g. deleted accounts) count as fresh too, so they aren't retried every round
+        now = time.time()
+        for fid in fids:
+            identity = self._by_fid.get(fid)
+            if identity is not None and now - identity.updated_at > self.max_age:
+                self._by_fid[fid] = identity._replace(updated_at=now)
+        if fids:
+            self.save()
+            logger.info(f"Refreshed {len(fids)} identities, {changed} changed")
+
+    async def run_refresh(self, client: Any, interval: float = 600.0, usernames: Iterable[str] = (),
+                          on_change: Optional[Callable[[], None]] = None):
+        """Refresh stale identities every `interval` seconds until cancelled
+
+        Args:
+            client: AsyncNeynarClient
+            interval: Seconds between refreshes
+            usernames: Usernames to keep trying to resolve while they aren't in the index
+            on_change: Called after a round that resolved a username or changed an identity
+        """
+        usernames = list(usernames)
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                missing = self.missing(usernames)
+                resolved = len(await self.resolve_async(client, missing)) if missing else 0
+                changed = await self.refresh_async(client)
+            except Exception as e:
+                logger.warning(f"Identity refresh failed: {e}")
+                continue
+            if on_change is not None and (resolved or changed):
+                on_change()
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "identities": len(self._by_fid),
+            "hits": self.hits,
+            "misses": self.misses,
+            "api_calls": self.api_calls,
+        }
@@ -0,0 +1,168 @@
+import asyncio
+import logging
+import time
+from typing import Dict, Any, Optional, Callable, Awaitable
+
+from metrics import Trace, set_current_trace, reset_current_trace
+
+logger = logging.getLogger("webhook-server")
+
+# Overflow policies when the queue is full
+OVERFLOW_REJECT = "reject"            # Refuse the new event (webhook answers 429)
+OVERFLOW_DROP_OLDEST = "drop_oldest"  # Evict the oldest queued event to make room
+
+
+class IngestQueue:
+    """Bounded event queue drained by a pool of async worker tasks"""
+
+    def __init__(self,
+                 handler: Callable[[Dict[str, Any]], Awaitable[None]],
+                 workers: int = 4,
+                 max_size: int = 1000,
+                 overflow: str = OVERFLOW_REJECT,
+                 on_drop: Optional[Callable[[Dict[str, Any], Optional[Trace]], None]] = None):
+        """Initialize the ingest queue
+
+        Args:
+            handler: Coroutine function called for every queued event
+            workers: Number of consumer tasks draining the queue
+            max_size: Maximum number of events waiting in the queue
+            overflow: Policy when the queue is full ("reject" or "drop_oldest")
+            on_drop: Called with the event and trace evicted by "drop_oldest"
+        """
+        if overflow not in (OVERFLOW_REJECT, OVERFLOW_DROP_OLDEST):
+            raise ValueError(f"Unknown overflow policy: {overflow}")
+        if workers < 1:
+            raise ValueError("workers must be at least 1")
+
+        self.handler = handler
+        self.workers = workers
+        self.max_size = max_size
+        self.overflow = overflow
+        self.on_drop = on_drop
+
+        self._queue: Optional[asyncio.Queue] = None
+        self._tasks = []
+
+        # Counters
+        self.enqueued = 0
+        self.processed = 0
+        self.failed = 0
+        self.dropped = 0
+        self.in_flight = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+
+    @property
+    def running(self) -> bool:
+        return bool(self._tasks)
+
+    async def start(self):
+        """Start the worker tasks on the running event loop"""
+        if self.running:
+            return
+        self._queue = asyncio.Queue(maxsize=self.max_size)
+        self._tasks = [
+            asyncio.create_task(self._worker(i), name=f"ingest-worker-{i}")
+            for i in range(self.workers)
+        ]
+        logger.info(f"Ingest queue started with {self.workers} workers (max size {self.max_size})")
+
+    async def stop(self, drain: bool = True, timeout: Optional[float] = None):
+        """Stop the worker tasks
+
+        Args:
+            drain: Wait for queued events to be processed before stopping
+            timeout: Maximum seconds to wait for the drain, then cancel what's left
+        """
+        if not self.running:
+            return
+        if drain:
+            try:
+                await asyncio.wait_for(self._queue.join(), timeout)
+            except asyncio.TimeoutError:
+                logger.warning(f"Drain timed out with {self.depth()} queued and {self.in_flight} in-flight events")
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        logger.info("Ingest queue stopped")
+
+    def submit(self, event: Dict[str, Any], trace: Optional[Trace] = None) -> bool:
+        """Enqueue an event without blocking
+
+        Args:
+            event: Event data to hand to the handler
+            trace: Optional stage trace, available to the handler through current_trace()
+
+        Returns:
+            True if the event was accepted, False if it was rejected because the queue is full
+        """
+        if not self.running:
+            raise RuntimeError("Ingest queue is not running")
+
+        item = (time.monotonic(), event, trace)
+        try:
+            self._queue.put_nowait(item)
+        except asyncio.QueueFull:
+            self.dropped += 1
+            if self.overflow == OVERFLOW_REJECT:
+                logger.warning("Ingest queue full, rejecting event")
+                return False
+            # Drop the oldest waiting event and retry
+            _, dropped_event, dropped_trace = self._queue.get_nowait()
+            self._queue.task_done()
+            if dropped_trace:
+                dropped_trace.finish("dropped")
+            if self.on_drop:
+                self.on_drop(dropped_event, dropped_trace)
+            self._queue.put_nowait(item)
+            logger.warning("Ingest queue full, dropped oldest event")
+
+        self.enqueued += 1
+        return True
+
+    async def _worker(self, index: int):
+        while True:
+            enqueued_at, event, trace = await self._queue.get()
+            wait = time.monotonic() - enqueued_at
+            self.total_wait += wait
+            self.max_wait = max(self.max_wait, wait)
+            self.in_flight += 1
+            token = set_current_trace(trace)
+            if trace:
+                trace.mark("dequeued")
+            try:
+                await self.handler(event)
+                self.processed += 1
+                if trace:
+                    trace.finish()
+            except Exception as e:
+                self.failed += 1
+                logger.error(f"Error in ingest worker {index}: {str(e)}")
+                if trace:
+                    trace.finish("error")
+            finally:
+                reset_current_trace(token)
+                self.in_flight -= 1
+                self._queue.task_done()
+
+    def depth(self) -> int:
+        """Number of events currently waiting in the queue"""
+        return self._queue.qsize() if self._queue else 0
+
+    def stats(self) -> Dict[str, Any]:
+        """Snapshot of queue counters"""
+        started = self.processed + self.failed + self.in_flight
+        return {
+            "depth": self.depth(),
+            "max_size": self.max_size,
+            "workers": self.workers,
+            "in_flight": self.in_flight,
+            "enqueued": self.enqueued,
+            "processed": self.processed,
+            "failed": self.failed,
+            "dropped": self.dropped,
+            "avg_wait_ms": (self.total_wait / started * 1000) if started else 0.0,
+            "max_wait_ms": self.max_wait * 1000,
+        }
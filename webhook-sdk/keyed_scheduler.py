@@ -0,0 +1,202 @@
+import time
+import heapq
+import asyncio
+import logging
+import itertools
+from typing import Dict, Any, Optional, Callable, Awaitable, Hashable, List, Tuple
+
+from metrics import METRICS, Metrics, current_trace
+from event_priority import Urgency
+
+logger = logging.getLogger("webhook-server")
+
+
+class KeyQueueFull(Exception):
+    """Too many events are already waiting for the same key"""
+
+
+def author_key(event_data: Dict[str, Any]) -> Optional[Hashable]:
+    """Scheduling key of a webhook event: the cast author's fid (or username)
+
+    Events without an author get None and are not ordered against anything.
+    """
+    author = (event_data.get('data') or {}).get('author') or {}
+    fid = author.get('fid')
+    return fid if fid is not None else author.get('username')
+
+
+class KeyedScheduler:
+    """Run a callback in order per key and concurrently across keys
+
+    Wraps any WebhookServer callback. Events with the same key (by default
+    the author's fid) run one at a time in arrival order, so a "buy"
+    followed by a "sell" is never reordered; events with different keys
+    run concurrently, at most `max_concurrency` at a time.
+
+        server = WebhookServer(callback=KeyedScheduler(handle_event, max_concurrency=4), workers=32)
+
+    With an `urgency` function (e.g. an EventPriority), a free slot goes to
+    the highest-priority event waiting for one, and events past their
+    deadline are dropped when they reach the front instead of being handled.
+
+    Calls return when the event has been handled, so the WebhookServer
+    queue keeps counting and tracing events as before. An event waiting
+    for its key holds a queue worker, so give the server more workers
+    than `max_concurrency` (waiting workers are just idle coroutines).
+    """
+
+    def __init__(self,
+                 handler: Callable[[Dict[str, Any]], Awaitable[None]],
+                 key: Callable[[Dict[str, Any]], Optional[Hashable]] = author_key,
+                 max_concurrency: int = 8,
+                 max_per_key: int = 100,
+                 urgency: Optional[Callable[[Dict[str, Any]], Urgency]] = None,
+                 metrics: Optional[Metrics] = None):
+        """Initialize the scheduler
+
+        Args:
+            handler: Coroutine function handling one event
+            key: Maps an event to its ordering key (None = no ordering)
+            max_concurrency: Events handled at the same time, across all keys
+            max_per_key: Events allowed to wait or run per key; more raise KeyQueueFull
+            urgency: Maps an event to its priority and deadline (default: all equal, no deadline)
+            metrics: Registry for scheduler metrics, defaults to the process-wide METRICS
+        """
+        if max_concurrency < 1:
+            raise ValueError("max_concurrency must be at least 1")
+        self.handler = handler
+        self.key = key
+        self.max_concurrency = max_concurrency
+        self.max_per_key = max_per_key
+        self.urgency = urgency
+        self.metrics = metrics or METRICS
+
+        # key -> future completed when the key's latest event is done
+        self._tails: Dict[Hashable, asyncio.Future] = {}
+        # key -> events waiting or running
+        self._pending: Dict[Hashable, int] = {}
+        # Events waiting for a slot: (-priority, arrival, future granting the slot)
+        self._waiters: List[Tuple[float, int, asyncio.Future]] = []
+        self._arrivals = itertools.count()
+
+        # Counters
+        self.active = 0
+        self.waiting = 0
+        self.completed = 0
+        self.rejected = 0
+        self.expired = 0
+
+        self.metrics.gauge("scheduler_active", lambda: self.active, "Events being handled")
+        self.metrics.gauge("scheduler_waiting", lambda: self.waiting, "Events waiting for their key or a free slot")
+        self.metrics.gauge("scheduler_keys", lambda: len(self._pending), "Keys with waiting or running events")
+        self.metrics.describe("scheduler_wait_seconds", "Time an event waited for its key and a free slot")
+        self.metrics.describe("event_age_seconds", "Age of the cast when its handler started")
+        self.metrics.describe("events_expired_total", "Events dropped because they were past their deadline")
+
+    async def __call__(self, event_data: Dict[str, Any]):
+        """Handle an event once earlier events with the same key are done
+
+        Raises:
+            KeyQueueFull: max_per_key events are already pending for this key
+        """
+        urgency = self.urgency(event_data) if self.urgency else None
+        key = self.key(event_data)
+        if key is None:
+            await self._run(event_data, time.perf_counter(), urgency)
+            return
+
+        pending = self._pending.get(key, 0)
+        if pending >= self.max_per_key:
+            self.rejected += 1
+            self.metrics.inc("scheduler_rejected_total")
+            logger.warning(f"Rejected event for key {key}: {pending} events already pending")
+            raise KeyQueueFull(f"{pending} events already pending for key {key}")
+
+        # Chain behind the key's latest event before the first await, so arrival order is kept
+        previous = self._tails.get(key)
+        done = asyncio.get_running_loop().create_future()
+        self._tails[key] = done
+        self._pending[key] = pending + 1
+        queued = time.perf_counter()
+        try:
+            if previous is not None:
+                self.waiting += 1
+                try:
+                    await asyncio.shield(previous)
+                finally:
+                    self.waiting -= 1
+            await self._run(event_data, queued, urgency)
+        finally:
+            if previous is not None and not previous.done():
+                # Cancelled while waiting: the next event still has to wait for the previous one
+                previous.add_done_callback(lambda _: done.set_result(None))
+            else:
+                done.set_result(None)
+            self._pending[key] -= 1
+            if not self._pending[key]:
+                del self._pending[key]
+                del self._tails[key]
+
+    async def _run(self, event_data: Dict[str, Any], queued: float, urgency: Optional[Urgency]):
+        await self._acquire(urgency.priority if urgency else 0.0)
+        try:
+            self.metrics.observe("scheduler_wait_seconds", time.perf_counter() - queued)
+            trace = current_trace()
+            now = time.time()
+            if urgency and urgency.deadline is not None and now > urgency.deadline:
+                # Stale signal: drop it before any model call or transaction is spent on it
+                self.expired += 1
+                self.metrics.inc("events_expired_total", {"stage": "scheduled"})
+                logger.info(f"Dropped event {now - urgency.deadline:.1f}s past its deadline")
+                if trace:
+                    trace.outcome = "expired"
+                return
+            if urgency and urgency.created_at is not None:
+                self.metrics.observe("event_age_seconds", max(now - urgency.created_at, 0.0))
+            if trace:
+                trace.mark("scheduled")
+            await self.handler(event_data)
+        finally:
+            self.completed += 1
+            self._release()
+
+    async def _acquire(self, priority: float):
+        """Take a slot, or wait until one is handed over (highest priority, then arrival, first)"""
+        if self.active < self.max_concurrency and not self._waiters:
+            self.active += 1
+            return
+        future = asyncio.get_running_loop().create_future()
+        entry = (-priority, next(self._arrivals), future)
+        heapq.heappush(self._waiters, entry)
+        self.waiting += 1
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.cancelled():
+                self._waiters.remove(entry)
+                heapq.heapify(self._waiters)
+            else:
+                # The slot was handed over just before the cancel, pass it on
+                self._release()
+            raise
+        finally:
+            self.waiting -= 1
+
+    def _release(self):
+        if self._waiters:
+            # Hand the slot over directly, `active` stays the same
+            _, _, future = heapq.heappop(self._waiters)
+            future.set_result(None)
+        else:
+            self.active -= 1
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "active": self.active,
+            "waiting": self.waiting,
+            "keys": len(self._pending),
+            "completed": self.completed,
+            "rejected": self.rejected,
+            "expired": self.expired,
+            "max_concurrency": self.max_concurrency,
+        }
@@ -0,0 +1,188 @@
+import time
+import bisect
+import contextvars
+from contextlib import contextmanager
+from typing import Dict, Any, Optional, Callable, Tuple
+
+# Latency buckets in seconds, from sub-millisecond parsing to slow on-chain confirmations
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5,
+                   1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+# Trace of the event currently handled by this task
+_current_trace: contextvars.ContextVar = contextvars.ContextVar("current_trace", default=None)
+
+
+def _key(labels: Optional[Dict[str, Any]]) -> Tuple:
+    if not labels:
+        return ()
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def _format_labels(key: Tuple, extra: str = "") -> str:
+    parts = [f'{k}="{v}"' for k, v in key]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+class Histogram:
+    """Cumulative latency histogram"""
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def quantile(self, q: float) -> float:
+        """Approximate quantile (upper bound of the bucket holding it)"""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for bound, count in zip(self.buckets, self.counts):
+            seen += count
+            if seen >= rank:
+                return bound
+        return float("inf")
+
+
+class Metrics:
+    """Registry of counters, histograms and gauges rendered in Prometheus text format"""
+
+    def __init__(self, prefix: str = "quantar"):
+        self.prefix = prefix
+        self.counters: Dict[str, Dict[Tuple, float]] = {}
+        self.histograms: Dict[str, Dict[Tuple, Histogram]] = {}
+        self.gauges: Dict[str, Callable[[], float]] = {}
+        self.help: Dict[str, str] = {}
+
+    def inc(self, name: str, labels: Optional[Dict[str, Any]] = None, value: float = 1):
+        """Increment a counter"""
+        series = self.counters.setdefault(name, {})
+        key = _key(labels)
+        series[key] = series.get(key, 0) + value
+
+    def observe(self, name: str, seconds: float, labels: Optional[Dict[str, Any]] = None):
+        """Record a duration in a histogram"""
+        series = self.histograms.setdefault(name, {})
+        key = _key(labels)
+        histogram = series.get(key)
+        if histogram is None:
+            histogram = series[key] = Histogram()
+        histogram.observe(seconds)
+
+    def gauge(self, name: str, fn: Callable[[], float], help: str = ""):
+        """Register a gauge read at render time"""
+        self.gauges[name] = fn
+        if help:
+            self.help[name] = help
+
+    def describe(self, name: str, help: str):
+        """Set the HELP line of a metric"""
+        self.help[name] = help
+
+    @contextmanager
+    def timer(self, name: str, labels: Optional[Dict[str, Any]] = None):
+        """Time a block into a histogram"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start, labels)
+
+    def trace(self, start: Optional[float] = None) -> "Trace":
+        """Start tracing the stages of an event"""
+        return Trace(self, start)
+
+    def render(self) -> str:
+        """Prometheus text exposition format"""
+        lines = []
+        for name, series in self.counters.items():
+            full = f"{self.prefix}_{name}"
+            self._header(lines, name, full, "counter")
+            for key, value in series.items():
+                lines.append(f"{full}{_format_labels(key)} {value}")
+        for name, series in self.histograms.items():
+            full = f"{self.prefix}_{name}"
+            self._header(lines, name, full, "histogram")
+            for key, histogram in series.items():
+                cumulative = 0
+                for bound, count in zip(histogram.buckets, histogram.counts):
+                    cumulative += count
+                    le = _format_labels(key, 'le="%s"' % bound)
+                    lines.append(f"{full}_bucket{le} {cumulative}")
+                le = _format_labels(key, 'le="+Inf"')
+                lines.append(f"{full}_bucket{le} {histogram.count}")
+                lines.append(f"{full}_sum{_format_labels(key)} {histogram.sum}")
+                lines.append(f"{full}_count{_format_labels(key)} {histogram.count}")
+        for name, fn in self.gauges.items():
+            full = f"{self.prefix}_{name}"
+            self._header(lines, name, full, "gauge")
+            try:
+                lines.append(f"{full} {float(fn())}")
+            except Exception:
+                continue
+        return "\n".join(lines) + "\n"
+
+    def _header(self, lines, name, full, kind):
+        if name in self.help:
+            lines.append(f"# HELP {full} {self.help[name]}")
+        lines.append(f"# TYPE {full} {kind}")
+
+
+class Trace:
+    """Timestamps of the stages one event goes through
+
+    Each `mark` records the time since the previous mark into the
+    `event_stage_seconds{stage=...}` histogram, so slow stages stand out.
+    """
+
+    def __init__(self, metrics: Metrics, start: Optional[float] = None):
+        self.metrics = metrics
+        self.start = start if start is not None else time.perf_counter()
+        self.last = self.start
+        self.stages = []
+        # Set by the handler to label the end-to-end latency (e.g. "executed", "unauthorized")
+        self.outcome = None
+        # Dedup id of the event, added to its log lines
+        self.event_id = None
+
+    def mark(self, stage: str):
+        now = time.perf_counter()
+        self.stages.append((stage, now - self.start))
+        self.metrics.observe("event_stage_seconds", now - self.last, {"stage": stage})
+        self.last = now
+
+    def finish(self, outcome: Optional[str] = None):
+        """Record the end-to-end latency of the event"""
+        outcome = outcome or self.outcome or "done"
+        total = time.perf_counter() - self.start
+        self.metrics.observe("event_total_seconds", total, {"outcome": outcome})
+        self.metrics.inc("events_processed_total", {"outcome": outcome})
+
+    def elapsed(self) -> float:
+        return time.perf_counter() - self.start
+
+
+def current_trace() -> Optional[Trace]:
+    """Trace of the event handled by the current task, if any"""
+    return _current_trace.get()
+
+
+def set_current_trace(trace: Optional[Trace]):
+    """Attach a trace to the current task, returns a token for reset_current_trace"""
+    return _current_trace.set(trace)
+
+
+def reset_current_trace(token):
+    _current_trace.reset(token)
+
+
+# Process-wide registry
+METRICS = Metrics()
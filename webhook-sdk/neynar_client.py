@@ -1,96 +1,352 @@
 import os
+import time
+import random
+import asyncio
+import logging
 import requests
-from typing import Dict, Any, Optional
+from email.utils import parsedate_to_datetime
+from typing import Dict, Any, Iterable, Optional
+from requests.adapters import HTTPAdapter
 from dotenv import load_dotenv
 
+try:
+    import aiohttp
+except ImportError:
+    aiohttp = None
+
+logger = logging.getLogger("neynar-client")
+
+BASE_URL = "https://api.neynar.com/v2/farcaster"
+
+# Responses worth retrying: rate limited or a transient server error
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+def retry_delay(attempt: int, retry_after: Optional[str], backoff: float, max_backoff: float) -> float:
+    """Seconds to wait before retry number `attempt` (0-based)
+
+    Honors a Retry-After header (seconds or an HTTP date), otherwise
+    exponential backoff with jitter. Never longer than max_backoff.
+    """
+    if retry_after:
+        try:
+            return min(max(float(retry_after), 0.0), max_backoff)
+        except ValueError:
+            try:
+                return min(max(parsedate_to_datetime(retry_after).timestamp() - time.time(), 0.0), max_backoff)
+            except (TypeError, ValueError):
+                pass
+    return min(backoff * (2 ** attempt), max_backoff) * random.uniform(0.5, 1.0)
+
+
+def should_retry(method: str, status: Optional[int]) -> bool:
+    """Whether a failed request may be sent again
+
+    `status` is None for connection errors and timeouts. Webhook creation
+    (POST) is not idempotent, so it is only retried when it was rate
+    limited, i.e. certainly not processed.
+    """
+    if method == "POST":
+        return status == 429
+    return status is None or status in RETRY_STATUSES
+
+
+def _headers(api_key: str) -> Dict[str, str]:
+    return {
+        "accept": "application/json",
+        "content-type": "application/json",
+        "api_key": api_key
+    }
+
+
+def _api_key(api_key: Optional[str]) -> str:
+    load_dotenv()  # Load environment variables from .env file
+    api_key = api_key or os.environ.get("NEYNAR_API_KEY")
+    if not api_key:
+        raise ValueError("NEYNAR_API_KEY is not set in environment variables and not provided to constructor")
+    return api_key
+
+
 class NeynarClient:
-    """Python client for the Neynar API"""
-    
-    BASE_URL = "https://api.neynar.com/v2/farcaster"
-    
-    def __init__(self, api_key: Optional[str] = None):
+    """Python client for the Neynar API
+
+    All calls share one pooled keep-alive session, time out after `timeout`
+    seconds and are retried on 429/5xx and connection errors (honoring
+    Retry-After). HTTP errors that aren't retried, or still fail after
+    `max_retries`, raise `requests.HTTPError`.
+    """
+
+    BASE_URL = BASE_URL
+
+    def __init__(self, api_key: Optional[str] = None, timeout: float = 10.0, max_retries: int = 3,
+                 backoff: float = 0.5, max_backoff: float = 30.0, pool_size: int = 10):
         """Initialize the Neynar client with an API key
-        
+
         Args:
             api_key: Neynar API key. If not provided, will look for NEYNAR_API_KEY in environment variables
+            timeout: Connect/read timeout per request in seconds
+            max_retries: Retries after the first attempt for retryable failures
+            backoff: Base delay of the exponential backoff in seconds
+            max_backoff: Upper bound for a single wait, including Retry-After
+            pool_size: Keep-alive connections kept open to the API
         """
-        load_dotenv()  # Load environment variables from .env file
-        
-        self.api_key = api_key or os.environ.get("NEYNAR_API_KEY")
-        if not self.api_key:
-            raise ValueError("NEYNAR_API_KEY is not set in environment variables and not provided to constructor")
-        
-        self.headers = {
-            "accept": "application/json",
-            "content-type": "application/json",
-            "api_key": self.api_key
-        }
-    
+        self.api_key = _api_key(api_key)
+        self.headers = _headers(self.api_key)
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+
+        self.session = requests.Session()
+        self.session.headers.update(self.headers)
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        """Close the pooled connections"""
+        self.session.close()
+
+    def _request(self, method: str, path: str, params: Optional[Dict[str, Any]] = None,
+                 json: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """Send a request with retries and return the decoded JSON response"""
+        url = f"{self.BASE_URL}{path}"
+        attempt = 0
+        while True:
+            try:
+                response = self.session.request(method, url, params=params, json=json, timeout=self.timeout)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                if attempt >= self.max_retries or not should_retry(method, None):
+                    raise
+                delay = retry_delay(attempt, None, self.backoff, self.max_backoff)
+                logger.warning(f"{method} {path} failed ({e.__class__.__name__}), retrying in {delay:.2f}s")
+            else:
+                if response.status_code < 400 or attempt >= self.max_retries \
+                        or not should_retry(method, response.status_code):
+                    response.raise_for_status()  # Raise exception for HTTP errors
+                    return response.json()
+                delay = retry_delay(attempt, response.headers.get("Retry-After"), self.backoff, self.max_backoff)
+                logger.warning(f"{method} {path} returned {response.status_code}, retrying in {delay:.2f}s")
+            time.sleep(delay)
+            attempt += 1
+
     def publish_webhook(self, name: str, url: str, subscription: Dict[str, Any]) -> Dict[str, Any]:
         """Create a new webhook
-        
+
         Args:
             name: Name of the webhook
             url: URL to send webhook events to
             subscription: Subscription configuration for the webhook
-            
+
         Returns:
             Response from the Neynar API
         """
-        endpoint = f"{self.BASE_URL}/webhook"
-        
         payload = {
             "name": name,
             "url": url,
             "subscription": subscription
         }
-        
-        response = requests.post(endpoint, json=payload, headers=self.headers)
-        response.raise_for_status()  # Raise exception for HTTP errors
-        
-        return response.json()
-    
+        return self._request("POST", "/webhook", json=payload)
+
     def list_webhooks(self) -> Dict[str, Any]:
         """List all webhooks
-        
+
         Returns:
             Response from the Neynar API
         """
-        endpoint = f"{self.BASE_URL}/webhook"
-        
-        response = requests.get(endpoint, headers=self.headers)
-        response.raise_for_status()
-        
-        return response.json()
-    
+        return self._request("GET", "/webhook")
+
+    def update_webhook(self, webhook_id: str, name: str, url: str, subscription: Dict[str, Any]) -> Dict[str, Any]:
+        """Replace the name, URL and subscription of an existing webhook
+
+        Args:
+            webhook_id: ID of the webhook to update
+            name: Name of the webhook
+            url: URL to send webhook events to
+            subscription: Subscription configuration for the webhook
+
+        Returns:
+            Response from the Neynar API
+        """
+        payload = {
+            "webhook_id": webhook_id,
+            "name": name,
+            "url": url,
+            "subscription": subscription
+        }
+        return self._request("PUT", "/webhook", json=payload)
+
     def delete_webhook(self, webhook_id: str) -> Dict[str, Any]:
         """Delete a webhook
-        
+
         Args:
             webhook_id: ID of the webhook to delete
-            
+
         Returns:
             Response from the Neynar API
         """
-        endpoint = f"{self.BASE_URL}/webhook/{webhook_id}"
-        
-        response = requests.delete(endpoint, headers=self.headers)
-        response.raise_for_status()
-        
-        return response.json()
-    
+        return self._request("DELETE", f"/webhook/{webhook_id}")
+
     def get_webhook(self, webhook_id: str) -> Dict[str, Any]:
         """Get information about a webhook
-        
+
         Args:
             webhook_id: ID of the webhook
-            
+
         Returns:
             Response from the Neynar API
         """
-        endpoint = f"{self.BASE_URL}/webhook/{webhook_id}"
-        
-        response = requests.get(endpoint, headers=self.headers)
-        response.raise_for_status()
-        
-        return response.json()
+        return self._request("GET", f"/webhook/{webhook_id}")
+
+    def lookup_user_by_username(self, username: str) -> Dict[str, Any]:
+        """Get a user by exact username
+
+        Returns:
+            Response from the Neynar API ({"user": {...}})
+        """
+        return self._request("GET", "/user/by_username", params={"username": username})
+
+    def fetch_bulk_users(self, fids: Iterable[int]) -> Dict[str, Any]:
+        """Get up to 100 users by fid in one call
+
+        Returns:
+            Response from the Neynar API ({"users": [...]})
+        """
+        return self._request("GET", "/user/bulk", params={"fids": ",".join(str(fid) for fid in fids)})
+
+    def fetch_user_casts(self, fid: int, limit: int = 25, cursor: Optional[str] = None) -> Dict[str, Any]:
+        """Get a user's casts, newest first
+
+        Returns:
+            Response from the Neynar API ({"casts": [...], "next": {"cursor": ...}})
+        """
+        params = {"fid": fid, "limit": limit}
+        if cursor:
+            params["cursor"] = cursor
+        return self._request("GET", "/feed/user/casts", params=params)
+
+
+class AsyncNeynarClient:
+    """asyncio twin of NeynarClient built on aiohttp, with the same methods as coroutines
+
+    Many lookups can run concurrently over the client's connection pool.
+    HTTP errors raise `aiohttp.ClientResponseError`, timeouts `asyncio.TimeoutError`.
+
+        async with AsyncNeynarClient() as client:
+            users = await asyncio.gather(*(client.lookup_user_by_username(u) for u in usernames))
+    """
+
+    BASE_URL = BASE_URL
+
+    def __init__(self, api_key: Optional[str] = None, timeout: float = 10.0, max_retries: int = 3,
+                 backoff: float = 0.5, max_backoff: float = 30.0, pool_size: int = 10):
+        """Initialize the client, see NeynarClient for the arguments"""
+        if aiohttp is None:
+            raise ImportError("AsyncNeynarClient requires aiohttp (pip install aiohttp)")
+        self.api_key = _api_key(api_key)
+        self.headers = _headers(self.api_key)
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.pool_size = pool_size
+        self._session = None
+
+    @property
+    def session(self) -> "aiohttp.ClientSession":
+        """Pooled session, opened on first use (aiohttp sessions belong to a running event loop)"""
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(
+                headers=self.headers,
+                timeout=aiohttp.ClientTimeout(total=self.timeout),
+                connector=aiohttp.TCPConnector(limit=self.pool_size))
+        return self._session
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.close()
+
+    async def close(self):
+        """Close the pooled connections"""
+        if self._session is not None:
+            await self._session.close()
+
+    async def _request(self, method: str, path: str, params: Optional[Dict[str, Any]] = None,
+                       json: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """Send a request with retries and return the decoded JSON response"""
+        url = f"{self.BASE_URL}{path}"
+        params = {key: str(value) for key, value in params.items()} if params else None
+        attempt = 0
+        while True:
+            try:
+                async with self.session.request(method, url, params=params, json=json) as response:
+                    if response.status < 400 or attempt >= self.max_retries \
+                            or not should_retry(method, response.status):
+                        response.raise_for_status()
+                        return await response.json(content_type=None)
+                    retry_after = response.headers.get("Retry-After")
+                    status = response.status
+            except (aiohttp.ClientConnectionError, asyncio.TimeoutError) as e:
+                if attempt >= self.max_retries or not should_retry(method, None):
+                    raise
+                delay = retry_delay(attempt, None, self.backoff, self.max_backoff)
+                logger.warning(f"{method} {path} failed ({e.__class__.__name__}), retrying in {delay:.2f}s")
+            else:
+                delay = retry_delay(attempt, retry_after, self.backoff, self.max_backoff)
+                logger.warning(f"{method} {path} returned {status}, retrying in {delay:.2f}s")
+            await asyncio.sleep(delay)
+            attempt += 1
+
+    async def publish_webhook(self, name: str, url: str, subscription: Dict[str, Any]) -> Dict[str, Any]:
+        """Create a new webhook"""
+        payload = {
+            "name": name,
+            "url": url,
+            "subscription": subscription
+        }
+        return await self._request("POST", "/webhook", json=payload)
+
+    async def list_webhooks(self) -> Dict[str, Any]:
+        """List all webhooks"""
+        return await self._request("GET", "/webhook")
+
+    async def update_webhook(self, webhook_id: str, name: str, url: str, subscription: Dict[str, Any]) -> Dict[str, Any]:
+        """Replace the name, URL and subscription of an existing webhook"""
+        payload = {
+            "webhook_id": webhook_id,
+            "name": name,
+            "url": url,
+            "subscription": subscription
+        }
+        return await self._request("PUT", "/webhook", json=payload)
+
+    async def delete_webhook(self, webhook_id: str) -> Dict[str, Any]:
+        """Delete a webhook"""
+        return await self._request("DELETE", f"/webhook/{webhook_id}")
+
+    async def get_webhook(self, webhook_id: str) -> Dict[str, Any]:
+        """Get information about a webhook"""
+        return await self._request("GET", f"/webhook/{webhook_id}")
+
+    async def lookup_user_by_username(self, username: str) -> Dict[str, Any]:
+        """Get a user by exact username"""
+        return await self._request("GET", "/user/by_username", params={"username": username})
+
+    async def fetch_bulk_users(self, fids: Iterable[int]) -> Dict[str, Any]:
+        """Get up to 100 users by fid in one call"""
+        return await self._request("GET", "/user/bulk", params={"fids": ",".join(str(fid) for fid in fids)})
+
+    async def fetch_user_casts(self, fid: int, limit: int = 25, cursor: Optional[str] = None) -> Dict[str, Any]:
+        """Get a user's casts, newest first"""
+        params = {"fid": fid, "limit": limit}
+        if cursor:
+            params["cursor"] = cursor
+        return await self._request("GET", "/feed/user/casts", params=params)
@@ -0,0 +1,149 @@
+import re
+import hmac
+import json
+import hashlib
+from typing import Dict, Any, Optional, Iterable, Tuple
+
+try:
+    import orjson
+except ImportError:  # orjson is optional, fall back to the standard library
+    orjson = None
+
+# Neynar signs the raw body with HMAC-SHA512 using the webhook secret
+SIGNATURE_HEADER = "X-Neynar-Signature"
+
+# Leading scalar fields of the cast author object: Neynar serializes fid and
+# username before any nested object, so stopping at the first brace keeps the
+# scan out of quoted casts and profiles
+_AUTHOR_HEAD = re.compile(rb'"author"\s*:\s*\{([^{}]*)')
+_FID = re.compile(rb'"fid"\s*:\s*(\d+)')
+_USERNAME = re.compile(rb'"username"\s*:\s*"([^"\\]*)"')
+
+# Reasons for rejecting an event
+REJECT_SIGNATURE = "bad_signature"
+REJECT_JSON = "invalid_json"
+REJECT_TYPE = "event_type"
+REJECT_AUTHOR = "author"
+
+
+def loads(body: bytes) -> Any:
+    """Parse JSON with orjson when available"""
+    if orjson is not None:
+        return orjson.loads(body)
+    return json.loads(body)
+
+
+def verify_signature(body: bytes, signature: Optional[str], secret: str) -> bool:
+    """Check the Neynar HMAC-SHA512 signature of a raw request body"""
+    if not signature:
+        return False
+    expected = hmac.new(secret.encode("utf-8"), body, hashlib.sha512).hexdigest()
+    return hmac.compare_digest(expected, signature)
+
+
+class EventPrefilter:
+    """Cheap rejection stage run on raw webhook bytes
+
+    Order of checks, cheapest first: signature, author allowlist on a
+    byte-level peek, full JSON parse, then authoritative type and author
+    checks on the parsed event. Events rejected by the peek are never
+    decoded, parsed or logged.
+    """
+
+    def __init__(self,
+                 secret: Optional[str] = None,
+                 allowed_fids: Optional[Iterable[int]] = None,
+                 allowed_usernames: Optional[Iterable[str]] = None,
+                 event_types: Optional[Iterable[str]] = None):
+        """Initialize the prefilter
+
+        Args:
+            secret: Webhook secret for signature checks (None disables the check)
+            allowed_fids: Author fids to accept (None accepts any)
+            allowed_usernames: Author usernames to accept (None accepts any)
+            event_types: Event types to accept (None accepts any)
+        """
+        self.secret = secret
+        self.allowed_fids = set(allowed_fids) if allowed_fids is not None else None
+        self.allowed_usernames = set(allowed_usernames) if allowed_usernames is not None else None
+        self.event_types = set(event_types) if event_types is not None else None
+
+        self.accepted = 0
+        self.rejected = {}
+
+    def update(self, allowed_fids: Optional[Iterable[int]] = None, allowed_usernames: Optional[Iterable[str]] = None):
+        """Replace the author allowlists (e.g. when more authorized usernames were resolved to fids)
+
+        Args:
+            allowed_fids: Author fids to accept (None accepts any)
+            allowed_usernames: Author usernames to accept (None accepts any)
+        """
+        self.allowed_fids = set(allowed_fids) if allowed_fids is not None else None
+        self.allowed_usernames = set(allowed_usernames) if allowed_usernames is not None else None
+
+    @property
+    def filters_authors(self) -> bool:
+        return self.allowed_fids is not None or self.allowed_usernames is not None
+
+    def check(self, body: bytes, signature: Optional[str] = None) -> Tuple[Optional[Dict[str, Any]], Optional[str]]:
+        """Run all checks on a raw request body
+
+        Args:
+            body: Raw request body
+            signature: Value of the signature header
+
+        Returns:
+            (event data, None) if accepted, (None, reject reason) otherwise
+        """
+        if self.secret and not verify_signature(body, signature, self.secret):
+            return self._reject(REJECT_SIGNATURE)
+
+        if self.filters_authors:
+            head = _AUTHOR_HEAD.search(body)
+            if head is not None:
+                fid, username = self._peek_author(head.group(1))
+                # Only reject when every configured allowlist could be checked
+                decisive = ((self.allowed_fids is None or fid is not None) and
+                            (self.allowed_usernames is None or username is not None))
+                if decisive and not self.is_allowed(fid, username):
+                    return self._reject(REJECT_AUTHOR)
+
+        try:
+            data = loads(body)
+        except ValueError:
+            return self._reject(REJECT_JSON)
+        if not isinstance(data, dict):
+            return self._reject(REJECT_JSON)
+
+        if self.event_types is not None and data.get('type') not in self.event_types:
+            return self._reject(REJECT_TYPE)
+
+        if self.filters_authors:
+            author = (data.get('data') or {}).get('author') or {}
+            if not self.is_allowed(author.get('fid'), author.get('username')):
+                return self._reject(REJECT_AUTHOR)
+
+        self.accepted += 1
+        return data, None
+
+    def is_allowed(self, fid: Optional[int], username: Optional[str]) -> bool:
+        """Authorize an author by fid (fast path) or username"""
+        if self.allowed_fids is not None and fid in self.allowed_fids:
+            return True
+        if self.allowed_usernames is not None and username in self.allowed_usernames:
+            return True
+        return False
+
+    def _peek_author(self, head: bytes) -> Tuple[Optional[int], Optional[str]]:
+        fid = _FID.search(head)
+        username = _USERNAME.search(head)
+        return (int(fid.group(1)) if fid else None,
+                username.group(1).decode("utf-8", "replace") if username else None)
+
+    def _reject(self, reason: str) -> Tuple[None, str]:
+        self.rejected[reason] = self.rejected.get(reason, 0) + 1
+        return None, reason
+
+    def stats(self) -> Dict[str, Any]:
+        """Snapshot of accept/reject counters"""
+        return {"accepted": self.accepted, "rejected": dict(self.rejected)}
@@ -0,0 +1,57 @@
+import gzip
+import json
+import time
+import logging
+from typing import Dict, Any, Iterator, Optional
+
+logger = logging.getLogger("webhook-server")
+
+
+class WebhookRecorder:
+    """Append incoming webhook bodies to a gzip-compressed JSONL file
+
+    Each line is {"ts": unix time, "signature": header value or null, "body": raw body}.
+    Recordings can be replayed against a local server with benchmarks/load_replay.py.
+    """
+
+    def __init__(self, path: str, flush_every: int = 100):
+        """Initialize the recorder
+
+        Args:
+            path: Output file, appended to if it exists (e.g. recordings/webhooks.jsonl.gz)
+            flush_every: Flush the compressed stream after this many records
+        """
+        self.path = path
+        self.flush_every = flush_every
+        self.recorded = 0
+        self._file = gzip.open(path, "at", encoding="utf-8")
+
+    def record(self, body: bytes, signature: Optional[str] = None):
+        """Write one raw request body"""
+        line = json.dumps({
+            "ts": time.time(),
+            "signature": signature,
+            "body": body.decode("utf-8", "replace"),
+        })
+        self._file.write(line + "\n")
+        self.recorded += 1
+        if self.recorded % self.flush_every == 0:
+            self._file.flush()
+
+    def close(self):
+        self._file.close()
+        logger.info(f"Recorded {self.recorded} webhook events to {self.path}")
+
+
+def read_recording(path: str) -> Iterator[Dict[str, Any]]:
+    """Iterate over the records of a (possibly still growing) recording"""
+    opener = gzip.open if path.endswith(".gz") else open
+    with opener(path, "rt", encoding="utf-8") as f:
+        try:
+            for line in f:
+                line = line.strip()
+                if line:
+                    yield json.loads(line)
+        except (EOFError, ValueError):
+            # Truncated end of a recording that wasn't closed cleanly
+            return
@@ -0,0 +1,292 @@
+"""Source adapters publishing SignalEvents to an EventBus
+
+- WebhookSource: WebhookServer callback for Neynar webhook casts
+- PollingSource: casts found by a farcaster_monitor CastPoller
+- NewsFileSource: items of a local news file (JSON, JSON lines, RSS or Atom) as it changes
+- ReplaySource: webhook recordings or JSON lines of events, at recorded pace or faster
+"""
+import os
+import json
+import time
+import asyncio
+import hashlib
+import logging
+import xml.etree.ElementTree as ET
+from collections import OrderedDict
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+from event_bus import EventBus, SignalEvent, NEWS
+from metrics import current_trace
+from recorder import read_recording
+
+logger = logging.getLogger("event-bus")
+
+# Item ids a news source remembers (to publish only new items when the file changes)
+SEEN_ITEMS = 10000
+
+
+class WebhookSource:
+    """WebhookServer callback publishing each cast to the bus
+
+        server = WebhookServer(callback=WebhookSource(bus), dedup_store=...)
+
+    Returns as soon as the cast is queued on the bus, so the server's
+    workers are free right away; the server's trace is continued by the bus.
+    The server has already acknowledged a cast the full bus drops: set
+    `source.on_drop = server.forget` so Neynar's redelivery of it is accepted.
+    """
+
+    def __init__(self, bus: EventBus, name: str = "webhook",
+                 on_drop: Optional[Callable[[Dict[str, Any], Any], None]] = None):
+        self.bus = bus
+        self.name = name
+        self.on_drop = on_drop
+
+    async def __call__(self, event_data: Dict[str, Any]):
+        trace = current_trace()
+        continued = None
+        if trace is not None:
+            # The server finishes its trace when this returns; the bus follows the event from here
+            continued = self.bus.metrics.trace(trace.start)
+            continued.event_id = trace.event_id
+            continued.stages = list(trace.stages)
+            continued.last = trace.last
+            trace.outcome = "published"
+        event = SignalEvent.from_cast_event(event_data, self.name, continued)
+        if event is not None and not self.bus.offer(event):
+            if trace is not None:
+                trace.outcome = "dropped"
+                continued.finish("dropped")
+            if self.on_drop:
+                self.on_drop(event_data, trace)
+
+
+class PollingSource:
+    """Publishes the new casts a CastPoller finds (farcaster_monitor/poller.py)
+
+    The poller's callback is replaced by the bus; run and stop it through
+    the bus (`bus.start([source])`). With the webhook as another source, a
+    cast found both ways is handled once.
+    """
+
+    def __init__(self, bus: EventBus, poller: Any, name: str = "poll"):
+        self.bus = bus
+        self.poller = poller
+        self.name = name
+        poller.callback = self.publish
+
+    async def publish(self, event_data: Dict[str, Any]):
+        event = SignalEvent.from_cast_event(event_data, self.name)
+        if event is not None:
+            await self.bus.publish(event)
+
+    async def run(self):
+        await self.poller.run()
+
+    def stop(self):
+        self.poller.stop()
+
+
+def parse_time(value: Any) -> Optional[float]:
+    """Epoch seconds of an epoch number, ISO 8601 string or RFC 822 date (RSS pubDate)"""
+    if value is None or value == "":
+        return None
+    if isinstance(value, (int, float)):
+        return float(value) / 1000 if value > 1e12 else float(value)
+    text = str(value).strip()
+    try:
+        return datetime.fromisoformat(text.replace('Z', '+00:00')).timestamp()
+    except ValueError:
+        pass
+    try:
+        parsed = parsedate_to_datetime(text)
+        return (parsed if parsed.tzinfo else parsed.replace(tzinfo=timezone.utc)).timestamp()
+    except (TypeError, ValueError):
+        return None
+
+
+def _local(tag: str) -> str:
+    return tag.rsplit('}', 1)[-1]
+
+
+def _xml_items(root: ET.Element) -> Iterator[Dict[str, Any]]:
+    """RSS <item>s and Atom <entry>s as dicts of their child elements' text (Atom links by href)"""
+    for element in root.iter():
+        if _local(element.tag) not in ('item', 'entry'):
+            continue
+        item = {}
+        for child in element:
+            tag = _local(child.tag)
+            if tag == 'link' and child.get('href'):
+                item.setdefault('link', child.get('href'))
+            elif child.text and tag not in item:
+                item[tag] = child.text.strip()
+        yield item
+
+
+def read_news(path: str) -> List[Dict[str, Any]]:
+    """Items of a news file: a JSON list (or {"items": [...]}), JSON lines, or an RSS/Atom feed"""
+    with open(path, 'rb') as f:
+        raw = f.read()
+    head = raw.lstrip()[:1]
+    if head == b'<':
+        return list(_xml_items(ET.fromstring(raw)))
+    text = raw.decode('utf-8')
+    if head in (b'[', b'{'):
+        try:
+            data = json.loads(text)
+            if isinstance(data, dict):
+                data = data.get('items') or data.get('articles') or [data]
+            return [item for item in data if isinstance(item, dict)]
+        except ValueError:
+            pass  # JSON lines
+    items = []
+    for line in text.splitlines():
+        line = line.strip()
+        if line:
+            try:
+                items.append(json.loads(line))
+            except ValueError:
+                logger.warning(f"Skipping unreadable line in {path}")
+    return items
+
+
+class NewsFileSource:
+    """Publishes new items of a local news file whenever it changes
+
+    Items are identified by guid/id, else link, else title; fields read:
+    title, summary/description/text/content, link/url, and
+    published/pubDate/updated/timestamp. The item's `source` field (or the
+    file name) names the source. Without `backfill`, items already in the
+    file at startup only mark the starting point.
+    """
+
+    def __init__(self, bus: EventBus, path: str, name: Optional[str] = None, interval: float = 2.0,
+                 backfill: bool = False):
+        """Initialize the source
+
+        Args:
+            bus: Bus to publish to
+            path: News file, re-read when its size or modification time changes
+            name: Source name (default: "news:<file name>")
+            interval: Seconds between checks of the file
+            backfill: Publish the items already in the file on the first read
+        """
+        self.bus = bus
+        self.path = path
+        self.name = name or f"news:{os.path.splitext(os.path.basename(path))[0]}"
+        self.interval = interval
+        self.backfill = backfill
+        self._seen: OrderedDict = OrderedDict()
+        self._signature = None
+        self._running = False
+        self.reads = 0
+
+    def to_signal(self, item: Dict[str, Any], received_at: float) -> SignalEvent:
+        title = str(item.get('title') or '').strip()
+        body = next((str(item[key]).strip() for key in ('summary', 'description', 'text', 'content')
+                     if item.get(key)), '')
+        text = f"{title}. {body}" if title and body and not body.startswith(title) else (body or title)
+        url = item.get('link') or item.get('url')
+        item_id = str(item.get('guid') or item.get('id') or url or hashlib.sha1(text.encode()).hexdigest())
+        source = item.get('source') if isinstance(item.get('source'), str) else None
+        published = next((parse_time(item[key]) for key in ('published', 'pubDate', 'updated', 'timestamp', 'date')
+                          if item.get(key)), None)
+        return SignalEvent(self.name, NEWS, item_id, text, {'source': source or self.name},
+                           published, received_at, url=url, data=item)
+
+    async def poll(self) -> int:
+        """Read the file if it changed and publish its new items
+
+        Returns:
+            Number of items published
+        """
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            return 0
+        signature = (stat.st_mtime_ns, stat.st_size)
+        if signature == self._signature:
+            return 0
+        first_read = self._signature is None
+        self._signature = signature
+        self.reads += 1
+        try:
+            items = await asyncio.get_running_loop().run_in_executor(None, read_news, self.path)
+        except (OSError, ValueError, ET.ParseError) as e:
+            logger.warning(f"Couldn't read news file {self.path}: {e}")
+            return 0
+
+        now = time.time()
+        published = 0
+        for item in items:
+            event = self.to_signal(item, now)
+            if event.id in self._seen:
+                continue
+            self._seen[event.id] = None
+            if len(self._seen) > SEEN_ITEMS:
+                self._seen.popitem(last=False)
+            if first_read and not self.backfill:
+                continue
+            await self.bus.publish(event)
+            published += 1
+        return published
+
+    async def run(self):
+        """Check the file every `interval` seconds until stopped"""
+        self._running = True
+        while self._running:
+            await self.poll()
+            await asyncio.sleep(self.interval)
+
+    def stop(self):
+        self._running = False
+
+
+class ReplaySource:
+    """Publishes recorded events: WebhookRecorder recordings or JSON lines of webhook-shaped events
+
+    Events are published at their recorded pace divided by `speed` (0 = as
+    fast as the bus takes them). With `retime`, cast timestamps are moved to
+    the time of publication, so replayed signals aren't dropped as expired.
+    """
+
+    def __init__(self, bus: EventBus, path: str, speed: float = 1.0, retime: bool = True, name: str = "replay"):
+        self.bus = bus
+        self.path = path
+        self.speed = speed
+        self.retime = retime
+        self.name = name
+        self.replayed = 0
+
+    def events(self) -> Iterator[tuple]:
+        """(recorded time or None, webhook-shaped event) of every record"""
+        for record in read_recording(self.path):
+            if 'body' in record:
+                try:
+                    yield record.get('ts'), json.loads(record['body'])
+                except ValueError:
+                    continue
+            else:
+                yield record.get('ts') or record.get('created_at'), record
+
+    async def run(self):
+        """Publish every recorded event, then return"""
+        started = first = None
+        for ts, event_data in self.events():
+            if self.speed and ts is not None:
+                if first is None:
+                    started, first = time.monotonic(), ts
+                delay = (ts - first) / self.speed - (time.monotonic() - started)
+                if delay > 0:
+                    await asyncio.sleep(delay)
+            if self.retime and isinstance(event_data.get('data'), dict):
+                now = datetime.now(timezone.utc).isoformat().replace('+00:00', 'Z')
+                event_data = {**event_data, 'data': {**event_data['data'], 'timestamp': now}}
+            event = SignalEvent.from_cast_event(event_data, self.name)
+            if event is not None:
+                await self.bus.publish(event)
+                self.replayed += 1
+        logger.info(f"Replayed {self.replayed} events from {self.path}")
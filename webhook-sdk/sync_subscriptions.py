@@ -0,0 +1,210 @@
+"""Compile a watch config into Neynar webhook filters and apply them
+
+Subscribing to every cast and discarding almost all of them in the server
+costs a delivery, a parse and a log line per cast. This command turns the
+watch config into the narrowest server-side filters Neynar offers:
+
+- `authors` (usernames, resolved to fids) and `fids` -> `author_fids`
+- `keywords` and `tokens` -> one `text` regex matching any of them as a word
+- `text_patterns` -> extra regex alternatives, used verbatim
+- `channels` (ids or parent URLs) -> `root_parent_urls`
+
+Neynar delivers a cast only when it matches every filter given, so an
+author list combined with a keyword regex cuts the volume to the casts
+the trader could act on. The result is compared with the webhook of the
+same name from `list_webhooks` and the webhook is created or updated in
+place only when something changed.
+
+Usage:
+    python sync_subscriptions.py watch_config.json --url https://example.com/webhook
+    python sync_subscriptions.py watch_config.json --url https://example.com/webhook --dry-run
+"""
+import re
+import json
+import argparse
+from typing import Dict, Any, Callable, Iterable, List, Optional, Tuple
+
+import requests
+
+from neynar_client import NeynarClient
+
+EVENT_TYPE = "cast.created"
+CHANNEL_URL = "https://warpcast.com/~/channel/{}"
+
+
+def text_regex(words: Iterable[str], patterns: Iterable[str] = ()) -> Optional[str]:
+    """Regex matching any of the words (in lower, upper or capitalized form) or patterns
+
+    The filter is evaluated by Neynar, so it sticks to syntax every regex
+    engine shares: no inline flags, case variants are spelled out instead.
+    """
+    variants = set()
+    for word in words:
+        word = word.strip()
+        if word:
+            variants.update({word, word.lower(), word.upper(), word.capitalize()})
+    alternatives = [re.escape(word) for word in sorted(variants, key=lambda w: (-len(w), w))]
+    parts = []
+    if alternatives:
+        parts.append(r"\b(" + "|".join(alternatives) + r")\b")
+    parts.extend(pattern for pattern in patterns if pattern)
+    return "|".join(parts) or None
+
+
+def channel_url(channel: str) -> str:
+    return channel if "://" in channel else CHANNEL_URL.format(channel.lstrip("/"))
+
+
+def compile_subscription(config: Dict[str, Any], resolve_fid: Callable[[str], Optional[int]]) -> Dict[str, Any]:
+    """Neynar subscription for a watch config
+
+    Args:
+        config: Watch config (authors, fids, keywords, tokens, text_patterns, channels)
+        resolve_fid: Maps a username to its fid, or None if it doesn't exist
+
+    Raises:
+        ValueError: An author couldn't be resolved (subscribing without them would silently miss their casts)
+    """
+    fids = {int(fid) for fid in config.get("fids", [])}
+    for username in config.get("authors", []):
+        fid = resolve_fid(username.lstrip("@"))
+        if fid is None:
+            raise ValueError(f"Unknown Farcaster user: {username}")
+        fids.add(fid)
+
+    filters: Dict[str, Any] = {}
+    if fids:
+        filters["author_fids"] = sorted(fids)
+    text = text_regex(list(config.get("keywords", [])) + list(config.get("tokens", [])),
+                      config.get("text_patterns", []))
+    if text:
+        filters["text"] = text
+    channels = sorted({channel_url(channel) for channel in config.get("channels", [])})
+    if channels:
+        filters["root_parent_urls"] = channels
+    return {EVENT_TYPE: filters}
+
+
+def normalize_subscription(subscription: Dict[str, Any]) -> Dict[str, Dict[str, Any]]:
+    """Subscription in a comparable form: empty filters dropped, lists sorted
+
+    Accepts both the shape sent to the API and the one returned by it
+    (`{"filters": {...}}`).
+    """
+    subscription = subscription or {}
+    if isinstance(subscription.get("filters"), dict):
+        subscription = subscription["filters"]
+    normalized = {}
+    for event_type, filters in subscription.items():
+        if not isinstance(filters, dict):
+            continue
+        normalized[event_type] = {
+            key: sorted(value) if isinstance(value, list) else value
+            for key, value in filters.items() if value not in (None, "", [], {})
+        }
+    return normalized
+
+
+def diff_subscription(current: Dict[str, Any], desired: Dict[str, Any]) -> List[str]:
+    """Human readable differences between two subscriptions, empty if they are equivalent"""
+    current, desired = normalize_subscription(current), normalize_subscription(desired)
+    changes = []
+    for event_type in sorted(set(current) | set(desired)):
+        if event_type not in desired:
+            changes.append(f"- {event_type}")
+            continue
+        if event_type not in current:
+            changes.append(f"+ {event_type}")
+        old, new = current.get(event_type, {}), desired[event_type]
+        for key in sorted(set(old) | set(new)):
+            before, after = old.get(key), new.get(key)
+            if before == after:
+                continue
+            if isinstance(before, list) or isinstance(after, list):
+                added = [v for v in after or [] if v not in (before or [])]
+                removed = [v for v in before or [] if v not in (after or [])]
+                if added:
+                    changes.append(f"+ {event_type}.{key}: {added}")
+                if removed:
+                    changes.append(f"- {event_type}.{key}: {removed}")
+            else:
+                changes.append(f"~ {event_type}.{key}: {before!r} -> {after!r}")
+    return changes
+
+
+def _webhook_id(webhook: Dict[str, Any]) -> Optional[str]:
+    return webhook.get("webhook_id") or webhook.get("id")
+
+
+def _webhook_url(webhook: Dict[str, Any]) -> Optional[str]:
+    return webhook.get("target_url") or webhook.get("url")
+
+
+def sync_webhook(client: NeynarClient, name: str, url: str, subscription: Dict[str, Any],
+                 dry_run: bool = False) -> Tuple[str, List[str]]:
+    """Create or update the webhook called `name` so it matches the subscription
+
+    Returns:
+        (action, changes): action is "created", "updated" or "unchanged"
+        (prefixed with "would be " on a dry run)
+    """
+    webhooks = [webhook for webhook in client.list_webhooks().get("webhooks", [])
+                if webhook.get("name") == name]
+    prefix = "would be " if dry_run else ""
+
+    if not webhooks:
+        changes = diff_subscription({}, subscription)
+        if not dry_run:
+            client.publish_webhook(name=name, url=url, subscription=subscription)
+        return prefix + "created", changes
+
+    webhook = webhooks[0]
+    changes = diff_subscription(webhook.get("subscription"), subscription)
+    if _webhook_url(webhook) != url:
+        changes.insert(0, f"~ url: {_webhook_url(webhook)!r} -> {url!r}")
+    if not changes:
+        return "unchanged", changes
+    if not dry_run:
+        client.update_webhook(_webhook_id(webhook), name=name, url=url, subscription=subscription)
+    return prefix + "updated", changes
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compile a watch config into Neynar webhook filters and apply them")
+    parser.add_argument("config", help="Watch config JSON (see watch_config.example.json)")
+    parser.add_argument("--url", type=str, help="URL to send webhook events to (default: the config's url)")
+    parser.add_argument("--name", type=str, help="Name of the webhook (default: the config's name)")
+    parser.add_argument("--dry-run", action="store_true", help="Show the changes without applying them")
+    args = parser.parse_args()
+
+    with open(args.config) as f:
+        config = json.load(f)
+    name = args.name or config.get("name", "python-webhook")
+    url = args.url or config.get("url")
+    if not url:
+        parser.error("--url is required when the config has no url")
+
+    with NeynarClient() as client:
+        def resolve_fid(username):
+            try:
+                return client.lookup_user_by_username(username)["user"]["fid"]
+            except requests.HTTPError as e:
+                if e.response is not None and e.response.status_code == 404:
+                    return None
+                raise
+
+        try:
+            subscription = compile_subscription(config, resolve_fid)
+            action, changes = sync_webhook(client, name, url, subscription, dry_run=args.dry_run)
+        except Exception as e:
+            print(f"Error syncing webhook: {str(e)}")
+            return
+
+    print(f"Webhook '{name}' {action}")
+    for change in changes:
+        print(f"  {change}")
+    print(f"Subscription: {json.dumps(subscription)}")
+
+
+if __name__ == "__main__":
+    main()
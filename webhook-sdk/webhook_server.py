@@ -1,10 +1,23 @@
 import uvicorn
 from fastapi import FastAPI, Request, HTTPException
+from fastapi.responses import PlainTextResponse
 from pydantic import BaseModel
 from typing import Dict, Any, Optional, Callable, Awaitable
+import os
 import json
+import time
+import socket
 import logging
 import asyncio
+import argparse
+import multiprocessing
+
+from ingest_queue import IngestQueue, OVERFLOW_REJECT
+from dedup_store import MemoryDedupStore, event_key
+from prefilter import EventPrefilter, SIGNATURE_HEADER, REJECT_SIGNATURE, REJECT_JSON
+from metrics import METRICS, Metrics, Trace, set_current_trace, reset_current_trace
+from event_log import log_event
+from recorder import WebhookRecorder
 
 # Configure logging
 logging.basicConfig(
@@ -17,56 +30,152 @@ logger = logging.getLogger("webhook-server")
 class WebhookServer:
     """Neynar Webhook Receiver Service Class"""
     
-    def __init__(self, callback: Optional[Callable[[Dict[str, Any]], Awaitable[None]]] = None):
+    def __init__(self, callback: Optional[Callable[[Dict[str, Any]], Awaitable[None]]] = None,
+                 workers: int = 4, max_queue_size: int = 1000, overflow: str = OVERFLOW_REJECT,
+                 dedup_store=None, prefilter: Optional[EventPrefilter] = None,
+                 metrics: Optional[Metrics] = None, recorder: Optional[WebhookRecorder] = None,
+                 drain_timeout: Optional[float] = 30.0):
         """Initialize webhook receiver service
         
         Args:
             callback: Optional callback function to call when webhook events are received
+            workers: Number of worker tasks running the callback concurrently
+            max_queue_size: Maximum number of events waiting for a worker
+            overflow: Policy when the queue is full ("reject" answers 429, "drop_oldest" evicts)
+            dedup_store: Store of processed event ids (MemoryDedupStore or SQLiteDedupStore),
+                defaults to an in-memory store
+            prefilter: Signature/author/type checks run on the raw body, defaults to accepting
+                every well-formed event
+            metrics: Registry exposed on /metrics, defaults to the process-wide METRICS
+            recorder: Optional recorder capturing every raw request body for replay
+            drain_timeout: Seconds to let queued and in-flight events finish on shutdown (None waits forever)
         """
         self.app = FastAPI(title="Neynar Webhook Receiver")
         self.callback = callback
-        self.processed_events = set()
+        self.processed_events = dedup_store if dedup_store is not None else MemoryDedupStore()
+        self.prefilter = prefilter or EventPrefilter()
+        self.metrics = metrics or METRICS
+        self.recorder = recorder
+        self.drain_timeout = drain_timeout
+        self._server: Optional[uvicorn.Server] = None
+        
+        # Events are acknowledged immediately and processed by the worker pool
+        self.queue = IngestQueue(
+            self.callback, workers=workers, max_size=max_queue_size, overflow=overflow, on_drop=self.forget
+        ) if self.callback else None
+        if self.queue:
+            self.metrics.gauge("ingest_queue_depth", self.queue.depth, "Events waiting for a worker")
+            self.metrics.gauge("ingest_in_flight", lambda: self.queue.in_flight, "Events being processed")
+            self.metrics.gauge("ingest_dropped", lambda: self.queue.dropped, "Events dropped because the queue was full")
+        
+        @self.app.on_event("startup")
+        async def startup():
+            if self.queue:
+                await self.queue.start()
+        
+        @self.app.on_event("shutdown")
+        async def shutdown():
+            if self.queue:
+                # Let queued and in-flight trades finish before the process exits
+                await self.queue.stop(drain=True, timeout=self.drain_timeout)
+            if self.recorder:
+                self.recorder.close()
         
         # Register routes
         @self.app.get("/")
         async def root():
             return {"message": "Neynar Webhook Server is running"}
         
+        @self.app.get("/stats")
+        async def stats():
+            """Queue depth, wait time and drop counters"""
+            return {
+                "queue": self.queue.stats() if self.queue else None,
+                "prefilter": self.prefilter.stats(),
+            }
+        
+        @self.app.get("/metrics")
+        async def metrics():
+            """Prometheus metrics: per-stage latency histograms, counters and queue gauges"""
+            return PlainTextResponse(self.metrics.render(), media_type="text/plain; version=0.0.4")
+        
         @self.app.post("/webhook")
         async def webhook(request: Request):
             """Endpoint for receiving Neynar webhook events"""
             try:
                 # Get raw request body
+                received = time.perf_counter()
                 body = await request.body()
+                signature = request.headers.get(SIGNATURE_HEADER)
+                if self.recorder:
+                    self.recorder.record(body, signature)
                 
-                # Log received event
-                logger.info(f"Received webhook event: {body.decode('utf-8')}")
+                # Reject unsigned, malformed and unauthorized events before parsing or logging them
+                data, reason = self.prefilter.check(body, signature)
+                if data is None:
+                    self.metrics.inc("webhook_requests_total", {"result": reason})
+                    if reason == REJECT_SIGNATURE:
+                        logger.warning("Invalid webhook signature")
+                        raise HTTPException(status_code=401, detail="Invalid signature")
+                    if reason == REJECT_JSON:
+                        logger.error("Failed to parse JSON")
+                        raise HTTPException(status_code=400, detail="Invalid JSON")
+                    # Sampled, most rejected events leave no log line
+                    log_event(logger, "Ignored webhook event", stage="prefilter", category="rejected", reason=reason)
+                    # Acknowledge so Neynar doesn't redeliver
+                    return {"status": "ignored", "reason": reason}
                 
-                # Parse JSON
+                trace = self.metrics.trace(received)
+                trace.mark("parsed")
+                event_id = trace.event_id = event_key(data, body)
+                # Log lines of this request carry the event id
+                token = set_current_trace(trace)
                 try:
-                    data = json.loads(body)
-                    # Process event
-                    await self.process_event(data)
-                    
-                    # Call callback function if provided
-                    if self.callback:
-                        # Add event ID check
-                        event_id = f"{data.get('type')}_{data.get('created_at')}"
-                        if event_id not in self.processed_events:
-                            self.processed_events.add(event_id)
-                            logger.info(f"Processing new event: {event_id}")
-                            await self.callback(data)
-                        else:
-                            logger.info(f"Already processed event, skipping: {event_id}")
-                    
-                    return {"status": "success", "message": "Event received"}
-                except json.JSONDecodeError:
-                    logger.error("Failed to parse JSON")
-                    raise HTTPException(status_code=400, detail="Invalid JSON")
+                    return await self._accept(data, body, event_id, trace)
+                finally:
+                    reset_current_trace(token)
+            except HTTPException:
+                raise
             except Exception as e:
                 logger.error(f"Error processing webhook: {str(e)}")
                 raise HTTPException(status_code=500, detail=str(e))
+
+    async def _accept(self, data: Dict[str, Any], body: bytes, event_id: str, trace: Trace) -> Dict[str, Any]:
+        """Deduplicate, log and queue an event that passed the prefilter"""
+        if self.callback and not self.processed_events.add(event_id):
+            log_event(logger, "Already processed event, skipping", stage="deduped", category="duplicate")
+            self.metrics.inc("webhook_requests_total", {"result": "duplicate"})
+            return {"status": "success", "message": "Event received"}
+
+        # The full body is only logged at DEBUG level
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(f"Received webhook event: {body.decode('utf-8')}")
+        
+        # Process event
+        await self.process_event(data)
+        
+        # Queue event for the callback if provided
+        if self.callback:
+            trace.mark("deduped")
+            if not self.queue.submit(data, trace):
+                # Forget the event so Neynar's retry is accepted later
+                self.processed_events.discard(event_id)
+                self.metrics.inc("webhook_requests_total", {"result": "queue_full"})
+                raise HTTPException(status_code=429, detail="Event queue full")
+            log_event(logger, "Queued new event", stage="queued")
+            self.metrics.inc("webhook_requests_total", {"result": "queued"})
+        else:
+            self.metrics.inc("webhook_requests_total", {"result": "accepted"})
+        
+        return {"status": "success", "message": "Event received"}
     
+    def forget(self, event_data: Dict[str, Any], trace: Optional[Trace] = None):
+        """Forget the id of an acknowledged event that was dropped, so Neynar's redelivery is accepted
+
+        Called for events evicted from the full queue, and by a WebhookSource whose bus is full.
+        """
+        self.processed_events.discard(trace.event_id if trace and trace.event_id else event_key(event_data))
+
     async def process_event(self, event_data: Dict[str, Any]):
         """Process received events
         
@@ -76,7 +185,6 @@ class WebhookServer:
         try:
             # Check event type
             event_type = event_data.get('type')
-            logger.info(f"Processing event type: {event_type}")
             
             if event_type == 'cast.created':
                 # Get cast data from data field
@@ -90,22 +198,123 @@ class WebhookServer:
                 # Get cast text
                 text = cast_data.get('text', '')
                 
-                logger.info(f"New cast from {display_name} (@{username}): {text}")
+                log_event(logger, f"New cast from {display_name} (@{username}): {text}", stage="received",
+                          fid=author.get('fid'))
+            else:
+                log_event(logger, f"Received {event_type} event", stage="received")
         except Exception as e:
             logger.error(f"Error processing event: {str(e)}")
-            logger.error(f"Event data: {event_data}")
+    
+    async def serve(self, host: str = "0.0.0.0", port: int = 8000, sock: Optional[socket.socket] = None,
+                    install_signal_handlers: bool = True):
+        """Run the service in the caller's event loop until shutdown() or SIGINT/SIGTERM
+        
+        The callback runs on this same loop, so it can share state (agents,
+        sessions) with the rest of the application. On shutdown the server
+        stops accepting requests, finishes open ones and drains the queue.
+        
+        Args:
+            host: Service host address
+            port: Service port
+            sock: Already bound socket to serve on instead of host/port
+            install_signal_handlers: Let uvicorn handle SIGINT/SIGTERM as a graceful shutdown
+        """
+        config = uvicorn.Config(self.app, host=host, port=port)
+        self._server = uvicorn.Server(config)
+        if not install_signal_handlers:
+            self._server.install_signal_handlers = lambda: None
+        await self._server.serve(sockets=[sock] if sock else None)
+    
+    @property
+    def started(self) -> bool:
+        """Whether serve() is accepting requests"""
+        return bool(self._server and self._server.started)
+    
+    def shutdown(self):
+        """Ask serve() to stop gracefully"""
+        if self._server:
+            self._server.should_exit = True
     
     def run(self, host: str = "0.0.0.0", port: int = 8000):
-        """Start webhook receiver service
+        """Start webhook receiver service (blocking)
         
         Args:
             host: Service host address
             port: Service port
         """
-        uvicorn.run(self.app, host=host, port=port)
+        asyncio.run(self.serve(host, port))
+
+
+def bind_socket(host: str, port: int, reuse_port: bool = False) -> socket.socket:
+    """Listening socket for a worker process, optionally with SO_REUSEPORT"""
+    sock = socket.socket(socket.AF_INET6 if ":" in host else socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    if reuse_port:
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+    sock.bind((host, port))
+    sock.listen(2048)
+    sock.set_inheritable(True)
+    return sock
+
+
+def _worker_main(factory: Callable[[], "WebhookServer"], host: str, port: int, sock: Optional[socket.socket]):
+    if sock is None:
+        sock = bind_socket(host, port, reuse_port=True)
+    server = factory()
+    if isinstance(server.processed_events, MemoryDedupStore) and server.callback:
+        logger.warning("Worker uses an in-memory dedup store, duplicates across workers won't be caught "
+                       "(use a SQLiteDedupStore on a shared file)")
+    logger.info(f"Webhook worker {os.getpid()} serving on {host}:{port}")
+    asyncio.run(server.serve(sock=sock))
+
+
+def serve_workers(factory: Callable[[], "WebhookServer"], processes: int, host: str = "0.0.0.0", port: int = 8000):
+    """Run several WebhookServer processes behind one port
+    
+    Each process builds its own server with `factory` (a module-level
+    function, as it is passed to spawned processes). Where SO_REUSEPORT is
+    available every process binds the port itself and the kernel spreads
+    connections evenly; elsewhere they accept from one shared socket. Give
+    the servers a SQLiteDedupStore on the same file so an event delivered
+    to two processes is only processed once. Metrics are per process.
+    
+    Args:
+        factory: Creates the WebhookServer of a worker process
+        processes: Number of worker processes
+        host: Service host address
+        port: Service port
+    """
+    shared = None if hasattr(socket, "SO_REUSEPORT") else bind_socket(host, port)
+    context = multiprocessing.get_context("spawn")
+    workers = [context.Process(target=_worker_main, args=(factory, host, port, shared),
+                               name=f"webhook-worker-{i}") for i in range(processes)]
+    for worker in workers:
+        worker.start()
+    try:
+        for worker in workers:
+            worker.join()
+    except KeyboardInterrupt:
+        # Workers got the same SIGINT and shut down gracefully
+        for worker in workers:
+            worker.join()
+    finally:
+        if shared:
+            shared.close()
+
+
+def default_server() -> "WebhookServer":
+    """Server used when this file is run directly"""
+    return WebhookServer()
 
 
 # If this file is run directly, start the service
 if __name__ == "__main__":
-    server = WebhookServer()
-    server.run()
+    parser = argparse.ArgumentParser(description="Neynar webhook receiver")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--processes", type=int, default=1, help="Worker processes sharing the port")
+    args = parser.parse_args()
+    if args.processes > 1:
+        serve_workers(default_server, args.processes, args.host, args.port)
+    else:
+        default_server().run(args.host, args.port)